@@ -10,6 +10,12 @@ a = Analysis(
         'gui_clean_defined_names_desktop_date',
         'excel_image_slimmer_gui_v3',
         'excel_slimmer_precision_plus',
+        'excel_xml_stream',
+        'excel_refs',
+        'excel_image_codecs',
+        'excel_jpeg_lossless',
+        'excel_png_lossless',
+        'excel_vba_compact',
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+이미지 내용 분석/인코딩 도우미 (이미지 슬리머 · 정밀 슬리머 공용)
+- NumPy 로 픽셀 배열을 한 번 훑어 고유 색 수, 알파 채널 실사용 여부, 평탄/경계 비율, 밝기 엔트로피를 구한다.
+- 결과에 따라 무손실 팔레트 PNG / 트루컬러 PNG / JPEG 중 하나로 보낸다.
+- NumPy 가 없으면 NUMPY_OK 가 False 이고 classify_image 는 None 을 반환한다 (호출 측은 기존 방식 사용).
+- ssim_psnr / ssim_reference: 밝기 배열 두 개의 SSIM(Wang et al. 2004: 11x11 가우시안 창 σ=1.5, 분리형 필터로 벡터화)과 PSNR (파라미터 스윕 품질 점수).
+"""
+import io
+from dataclasses import dataclass
+
+try:
+    import numpy as np
+    NUMPY_OK = True
+except Exception:
+    np = None
+    NUMPY_OK = False
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+ROUTE_PALETTE = "palette"      # 고유 색 256개 이하: 색을 그대로 보존하는 팔레트 PNG
+ROUTE_TRUECOLOR = "truecolor"  # 스크린샷/도표/투명 이미지: 무손실 RGB(A) PNG
+ROUTE_JPEG = "jpeg"            # 사진처럼 색이 많고 평탄한 영역이 적은 불투명 이미지
+
+EDGE_THRESHOLD = 48            # 이웃 픽셀 밝기 차이가 이 값보다 크면 "경계"
+PHOTO_MAX_FLAT_RATIO = 0.35    # 밝기 차이 0 인 이웃 비율이 이보다 높으면 스크린샷류
+PHOTO_MIN_ENTROPY = 5.0        # 밝기 히스토그램 엔트로피(bit)가 이보다 낮으면 단순 그래픽
+SSIM_WINDOW = 11                # SSIM 가우시안 창 크기와 표준편차 (Wang et al. 2004)
+SSIM_SIGMA = 1.5
+
+
+@dataclass
+class ImageProfile:
+    unique_colors: int
+    opaque: bool
+    flat_ratio: float
+    edge_ratio: float
+    entropy: float
+    route: str
+
+
+def _rgba_array(im):
+    return np.ascontiguousarray(np.asarray(im.convert("RGBA"), dtype=np.uint8))
+
+
+def classify_image(im) -> ImageProfile | None:
+    """픽셀 배열을 분석해 ImageProfile 을 돌려준다. NumPy 가 없으면 None."""
+    if not NUMPY_OK:
+        return None
+    rgba = _rgba_array(im)
+    packed = rgba.view(np.uint32).reshape(-1)
+    unique_colors = int(np.unique(packed).size)
+    opaque = bool(rgba[..., 3].min() == 255)
+
+    lum = (rgba[..., 0].astype(np.uint16) * 77 + rgba[..., 1].astype(np.uint16) * 150
+           + rgba[..., 2].astype(np.uint16) * 29) >> 8
+    lum = lum.astype(np.int16)
+    gx = np.abs(np.diff(lum, axis=1))
+    gy = np.abs(np.diff(lum, axis=0))
+    pairs = gx.size + gy.size
+    if pairs:
+        flat_ratio = float((np.count_nonzero(gx == 0) + np.count_nonzero(gy == 0)) / pairs)
+        edge_ratio = float((np.count_nonzero(gx > EDGE_THRESHOLD) + np.count_nonzero(gy > EDGE_THRESHOLD)) / pairs)
+    else:
+        flat_ratio, edge_ratio = 1.0, 0.0
+    hist = np.bincount(lum.reshape(-1), minlength=256).astype(np.float64)
+    p = hist[hist > 0] / lum.size
+    entropy = float(-(p * np.log2(p)).sum())
+
+    if unique_colors <= 256:
+        route = ROUTE_PALETTE
+    elif not opaque or flat_ratio > PHOTO_MAX_FLAT_RATIO or entropy < PHOTO_MIN_ENTROPY:
+        route = ROUTE_TRUECOLOR
+    else:
+        route = ROUTE_JPEG
+    return ImageProfile(unique_colors, opaque, flat_ratio, edge_ratio, entropy, route)
+
+
+def encode_palette_png(im) -> bytes:
+    """고유 색이 256개 이하인 이미지를 색 손실 없이 팔레트(P) PNG 로 저장한다."""
+    rgba = _rgba_array(im)
+    h, w = rgba.shape[:2]
+    colors, inverse = np.unique(rgba.view(np.uint32).reshape(-1), return_inverse=True)
+    if colors.size > 256:
+        raise ValueError("팔레트로 표현할 수 없는 색 수입니다.")
+    entries = colors.view(np.uint8).reshape(-1, 4)
+    pal = Image.fromarray(inverse.reshape(h, w).astype(np.uint8), mode="P")
+    pal.putpalette(entries[:, :3].tobytes())
+    out = io.BytesIO()
+    params = dict(optimize=True, compress_level=9)
+    if entries[:, 3].min() < 255:
+        params["transparency"] = entries[:, 3].tobytes()
+    pal.save(out, format="PNG", **params)
+    return out.getvalue()
+
+
+def encode_png(im, profile: ImageProfile) -> bytes:
+    """분석 결과에 맞는 무손실 PNG (팔레트 또는 트루컬러)."""
+    if profile.route == ROUTE_PALETTE:
+        return encode_palette_png(im)
+    out = io.BytesIO()
+    im.convert("RGB" if profile.opaque else "RGBA").save(out, format="PNG", optimize=True, compress_level=9)
+    return out.getvalue()
+
+
+def encode_jpeg(im, quality: int, progressive: bool = True) -> bytes:
+    out = io.BytesIO()
+    im.convert("RGB").save(out, format="JPEG", quality=quality, optimize=True, progressive=progressive)
+    return out.getvalue()
+
+
+def encode_for_route(im, profile: ImageProfile, jpeg_quality: int, progressive: bool = True) -> tuple[str, bytes]:
+    """분석 결과대로 인코딩한다. 반환값: (확장자 ".png"/".jpeg", 바이트)"""
+    if profile.route == ROUTE_JPEG:
+        return ".jpeg", encode_jpeg(im, jpeg_quality, progressive)
+    return ".png", encode_png(im, profile)
+
+
+def luminance(im):
+    """Pillow 이미지를 float32 밝기 배열로 (알파는 무시)."""
+    return np.asarray(im.convert("L"), dtype=np.float32)
+
+
+def _gaussian_weights():
+    x = np.arange(SSIM_WINDOW, dtype=np.float64) - SSIM_WINDOW // 2
+    g = np.exp(-(x * x) / (2 * SSIM_SIGMA ** 2))
+    return (g / g.sum()).astype(np.float32)
+
+
+def _gaussian_filter(a, g):
+    """창이 이미지 안에 다 들어가는 위치('valid')만 가우시안 가중 평균. 가로/세로 1차원 필터 두 번."""
+    k = len(g)
+    h, w = a.shape
+    rows = g[0] * a[:, :w - k + 1]
+    for i in range(1, k):
+        rows += g[i] * a[:, i:w - k + 1 + i]
+    out = g[0] * rows[:h - k + 1]
+    for i in range(1, k):
+        out += g[i] * rows[i:h - k + 1 + i]
+    return out
+
+
+def ssim_reference(ref) -> tuple:
+    """기준 밝기 배열의 가우시안 평균/분산을 미리 계산한다 (같은 기준으로 여러 번 비교할 때 ssim_psnr 에 전달)."""
+    ref = np.asarray(ref, dtype=np.float32)
+    if min(ref.shape) < SSIM_WINDOW:
+        return ref, None, None
+    g = _gaussian_weights()
+    mu_x = _gaussian_filter(ref, g)
+    return ref, mu_x, _gaussian_filter(ref * ref, g) - mu_x ** 2
+
+
+def ssim_psnr(ref, img, ref_stats: tuple | None = None) -> tuple[float, float]:
+    """같은 크기 밝기 배열의 (평균 SSIM, PSNR dB). 완전히 같으면 PSNR 은 inf."""
+    ref, mu_x, var_x = ref_stats if ref_stats is not None else ssim_reference(ref)
+    img = np.asarray(img, dtype=np.float32)
+    mse = float(np.mean((ref.astype(np.float64) - img) ** 2))
+    psnr = float("inf") if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+    if mu_x is None:
+        return (1.0 if mse == 0 else 0.0), psnr
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    g = _gaussian_weights()
+    mu_y = _gaussian_filter(img, g)
+    var_y = _gaussian_filter(img * img, g) - mu_y ** 2
+    cov = _gaussian_filter(ref * img, g) - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x ** 2 + mu_y ** 2 + c1) * (var_x + var_y + c2))
+    return float(ssim_map.mean(dtype=np.float64)), psnr
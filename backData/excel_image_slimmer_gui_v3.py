@@ -7,6 +7,11 @@ import tempfile
 import zipfile
 import subprocess
 import time
+import posixpath
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
 # GUI
@@ -24,8 +29,48 @@ except Exception as e:
     print("[ERROR] Pillow is not installed. Install with: pip install pillow", file=sys.stderr)
     sys.exit(1)
 
+try:
+    from lxml import etree
+    LXML_OK = True
+except Exception:
+    etree = None
+    LXML_OK = False
+
+try:
+    from excel_image_codecs import NUMPY_OK, ROUTE_JPEG, classify_image, encode_for_route, encode_png, luminance, ssim_psnr, ssim_reference
+except Exception:
+    NUMPY_OK = False
+
+try:
+    from excel_jpeg_lossless import optimize_jpeg_lossless
+    from excel_png_lossless import optimize_png_lossless
+except Exception:
+    optimize_jpeg_lossless = None
+    optimize_png_lossless = None
+
 SUPPORTED_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
 
+EMU_PER_INCH = 914400
+NS_XDR = "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+XDR_ANCHORS = {f"{{{NS_XDR}}}{n}" for n in ("twoCellAnchor", "oneCellAnchor", "absoluteAnchor")}
+MEDIA_CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg"}
+
+# Target-size mode: candidate long edges / JPEG qualities, tried largest first.
+TARGET_EDGES = (2400, 2048, 1600, 1400, 1200, 1024, 800, 640, 480, 320)
+TARGET_QUALITIES = (85, 75, 65, 55, 45, 35, 25)
+TARGET_MAX_PASSES = 3
+ZIP_ENTRY_OVERHEAD = 100  # local + central directory headers per entry, excluding the name
+TARGET_DECODE_CACHE_BYTES = 512 * 1024 * 1024  # decoded/resized pixels kept across search passes
+
+# Parameter sweep: grid of (max_edge, jpeg_quality) compared on the same decoded images.
+SWEEP_EDGES = (2048, 1600, 1400, 1200, 1024, 800)
+SWEEP_QUALITIES = (90, 80, 70, 60, 50)
+SWEEP_EVAL_EDGE = 2048  # quality scores are computed at most at this long edge
+SWEEP_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
 def human_size(num_bytes: int) -> str:
     for unit in ["B", "KB", "MB", "GB"]:
         if num_bytes < 1024.0:
@@ -50,6 +95,182 @@ def downscale_image(im, max_long_edge: int):
     new_h = max(1, int(h * scale))
     return im.resize((new_w, new_h), Image.LANCZOS)
 
+def _rels_targets(rels_path: Path, root_dir: Path) -> dict:
+    """Map relationship Id -> resolved internal target path for one .rels file."""
+    src_dir = rels_path.parent.parent.relative_to(root_dir).as_posix()
+    targets = {}
+    for rel in etree.parse(str(rels_path)).getroot().iterchildren(f"{{{NS_PKG_REL}}}Relationship"):
+        target = rel.get("Target", "")
+        if rel.get("TargetMode") == "External" or not target:
+            continue
+        path = target.lstrip("/") if target.startswith("/") else posixpath.join(src_dir, target)
+        targets[rel.get("Id")] = root_dir / posixpath.normpath(path)
+    return targets
+
+def _ext_emu(ext):
+    if ext is None:
+        return None
+    try:
+        return int(ext.get("cx")), int(ext.get("cy"))
+    except (TypeError, ValueError):
+        return None
+
+def _pic_extent_emu(pic):
+    """On-sheet (cx, cy) of a picture in EMU, or None when it cannot be determined."""
+    ext = pic.find(f"{{{NS_XDR}}}spPr/{{{NS_A}}}xfrm/{{{NS_A}}}ext")
+    size = _ext_emu(ext)
+    if size is None:
+        for anc in pic.iterancestors():
+            if anc.tag in XDR_ANCHORS:
+                size = _ext_emu(anc.find(f"{{{NS_XDR}}}ext"))
+                break
+        return size
+    cx, cy = size
+    # Pictures inside groups use the group's child coordinate space.
+    for grp in pic.iterancestors(f"{{{NS_XDR}}}grpSp"):
+        xfrm = grp.find(f"{{{NS_XDR}}}grpSpPr/{{{NS_A}}}xfrm")
+        if xfrm is None:
+            continue
+        g_ext, ch_ext = _ext_emu(xfrm.find(f"{{{NS_A}}}ext")), _ext_emu(xfrm.find(f"{{{NS_A}}}chExt"))
+        if g_ext and ch_ext and ch_ext[0] > 0 and ch_ext[1] > 0:
+            cx, cy = cx * g_ext[0] / ch_ext[0], cy * g_ext[1] / ch_ext[1]
+    return cx, cy
+
+def _crop_fractions(pic):
+    """Visible (width, height) fraction after an a:srcRect crop (values are 1/1000 percent)."""
+    rect = pic.find(f"{{{NS_XDR}}}blipFill/{{{NS_A}}}srcRect")
+    if rect is None:
+        return 1.0, 1.0
+    def _v(name):
+        try:
+            return int(rect.get(name, "0")) / 100000.0
+        except ValueError:
+            return 0.0
+    return 1.0 - _v("l") - _v("r"), 1.0 - _v("t") - _v("b")
+
+def scan_drawing_pictures(root_dir: Path):
+    """Find every drawing picture and the media part it shows.
+
+    Returns (pictures, other_refs): pictures is a list of (drawing_path, drawing_tree, pic, media_path);
+    other_refs holds media that is also referenced from anywhere else (VML, charts, sheet backgrounds,
+    shape fills, ...) and therefore must not be treated as owned by the pictures.
+    """
+    pictures, other_refs = [], set()
+    for rels_path in root_dir.rglob("*.rels"):
+        try:
+            targets = _rels_targets(rels_path, root_dir)
+        except Exception:
+            continue
+        part = rels_path.parent.parent / rels_path.name[:-len(".rels")]
+        is_drawing = part.parent.name == "drawings" and part.name.startswith("drawing") and part.suffix == ".xml"
+        tree = None
+        if is_drawing:
+            try:
+                tree = etree.parse(str(part))
+            except Exception:
+                tree = None
+        if tree is None:
+            other_refs.update(t for t in targets.values() if t.parent.name == "media")
+            continue
+        pic_ids = set()
+        for pic in tree.getroot().iter(f"{{{NS_XDR}}}pic"):
+            blip = pic.find(f"{{{NS_XDR}}}blipFill/{{{NS_A}}}blip")
+            rid = blip.get(f"{{{NS_R}}}embed") if blip is not None else None
+            if rid in targets:
+                pic_ids.add(rid)
+                pictures.append((part, tree, pic, targets[rid]))
+        for el in tree.getroot().iter():
+            if not isinstance(el.tag, str):
+                continue
+            for k, v in el.attrib.items():
+                if k.startswith(f"{{{NS_R}}}") and v not in pic_ids and v in targets:
+                    other_refs.add(targets[v])
+    return pictures, other_refs
+
+def collect_display_sizes(root_dir: Path, target_dpi: int) -> dict:
+    """Largest on-sheet display size (px at target_dpi) of each media part used by drawing pictures.
+
+    Media that is also referenced from anywhere else or by a picture whose extent cannot be
+    determined is left out, so it is only limited by max_edge.
+    """
+    if not LXML_OK or target_dpi <= 0:
+        return {}
+    pictures, unbounded = scan_drawing_pictures(root_dir)
+    sizes = {}
+    for _, _, pic, media in pictures:
+        extent = _pic_extent_emu(pic)
+        fx, fy = _crop_fractions(pic)
+        if extent is None or fx <= 0 or fy <= 0:
+            unbounded.add(media)
+            continue
+        w = extent[0] / fx / EMU_PER_INCH * target_dpi
+        h = extent[1] / fy / EMU_PER_INCH * target_dpi
+        prev = sizes.get(media, (0, 0))
+        sizes[media] = (max(prev[0], w), max(prev[1], h))
+    return {p: (max(1, int(round(w))), max(1, int(round(h))))
+            for p, (w, h) in sizes.items() if p not in unbounded}
+
+def plan_picture_crops(root_dir: Path, log_path: Path) -> dict:
+    """Find a:srcRect crops that can be applied to media shown by exactly one picture.
+
+    Nothing is written here: returns {media_path: (box, full_size, drawing_path, drawing_tree, srcRect)}.
+    The image stage crops the decoded image in memory and encodes it once (see process_media_file);
+    the srcRect is removed only when that result is kept (remove_baked_crops).
+    """
+    if not LXML_OK:
+        return {}
+    pictures, other_refs = scan_drawing_pictures(root_dir)
+    uses = {}
+    for entry in pictures:
+        uses.setdefault(entry[3], []).append(entry)
+    plans = {}
+    for media, entries in uses.items():
+        if len(entries) != 1 or media in other_refs or not media.exists():
+            continue
+        part, tree, pic, _ = entries[0]
+        rect = pic.find(f"{{{NS_XDR}}}blipFill/{{{NS_A}}}srcRect")
+        if rect is None or media.suffix.lower() not in SUPPORTED_IMAGE_EXTS:
+            continue
+        try:
+            l, t, r, b = (int(rect.get(k, "0")) / 100000.0 for k in ("l", "t", "r", "b"))
+        except ValueError:
+            continue
+        if min(l, t, r, b) < 0 or (l, t, r, b) == (0, 0, 0, 0):
+            continue  # negative values pad the picture instead of cropping it
+        try:
+            with Image.open(media) as im:
+                if im.getexif().get(0x0112, 1) != 1:
+                    continue  # EXIF-rotated: the crop rectangle refers to the displayed orientation
+                w, h = im.size
+        except Exception as e:
+            log_write(log_path, f"[WARN] {media.name}: crop not applied ({e})")
+            continue
+        box = (int(round(w * l)), int(round(h * t)), w - int(round(w * r)), h - int(round(h * b)))
+        if box[2] <= box[0] or box[3] <= box[1]:
+            continue
+        plans[media] = (box, (w, h), part, tree, rect)
+    return plans
+
+def remove_baked_crops(plans: dict, baked) -> None:
+    """Drop the srcRect of every media in baked (its bytes now hold the cropped image) and save the drawings."""
+    changed_trees = {}
+    for media in baked:
+        _, _, part, tree, rect = plans[media]
+        rect.getparent().remove(rect)
+        changed_trees[part] = tree
+    for part, tree in changed_trees.items():
+        tree.write(str(part), encoding="UTF-8", xml_declaration=True, standalone=True)
+
+def fit_display_size(im, display_size):
+    """Shrink so that the image still covers display_size (w, h) in both directions."""
+    w, h = im.size
+    scale = max(display_size[0] / float(w), display_size[1] / float(h))
+    if scale >= 1.0:
+        return im
+    new_w = max(1, int(round(w * scale)))
+    new_h = max(1, int(round(h * scale)))
+    return im.resize((new_w, new_h), Image.LANCZOS)
+
 def optimize_png(im, has_alpha: bool):
     out = io.BytesIO()
     save_params = dict(optimize=True, compress_level=9)
@@ -70,7 +291,79 @@ def optimize_jpeg(im, jpeg_quality: int, progressive: bool):
     im_rgb.save(out, format="JPEG", quality=jpeg_quality, optimize=True, progressive=progressive)
     return out.getvalue()
 
-def process_media_file(path: Path, max_long_edge: int, jpeg_quality: int, progressive_jpeg: bool, log_path: Path) -> int:
+def _free_media_name(path: Path, ext: str) -> Path:
+    candidate = path.with_suffix(ext)
+    i = 1
+    while candidate.exists():
+        candidate = path.with_name(f"{path.stem}_{i}{ext}")
+        i += 1
+    return candidate
+
+def sync_renamed_media(root_dir: Path, rename_map: dict) -> None:
+    """Point .rels targets, VML sources and [Content_Types].xml at renamed media parts in one pass."""
+    if not rename_map:
+        return
+    for rels_path in root_dir.rglob("*.rels"):
+        tree = etree.parse(str(rels_path))
+        src_dir = rels_path.parent.parent.relative_to(root_dir).as_posix()
+        changed = False
+        for rel in tree.getroot().iterchildren(f"{{{NS_PKG_REL}}}Relationship"):
+            target = rel.get("Target", "")
+            if rel.get("TargetMode") == "External" or not target:
+                continue
+            path = target.lstrip("/") if target.startswith("/") else posixpath.join(src_dir, target)
+            new = rename_map.get(root_dir / posixpath.normpath(path))
+            if new is not None:
+                rel.set("Target", posixpath.join(posixpath.dirname(target), new.name))
+                changed = True
+        if changed:
+            tree.write(str(rels_path), encoding="UTF-8", xml_declaration=True, standalone=True)
+
+    for vml in root_dir.rglob("*.vml"):
+        text = vml.read_text(encoding="utf-8", errors="ignore")
+        new_text = text
+        for old, new in rename_map.items():
+            new_text = new_text.replace(f"media/{old.name}", f"media/{new.name}")
+        if new_text != text:
+            vml.write_text(new_text, encoding="utf-8")
+
+    ct_path = root_dir / "[Content_Types].xml"
+    if not ct_path.exists():
+        return
+    ns_ct = "http://schemas.openxmlformats.org/package/2006/content-types"
+    tree = etree.parse(str(ct_path))
+    root = tree.getroot()
+    old_names = {"/" + old.relative_to(root_dir).as_posix() for old in rename_map}
+    for ov in list(root.iterchildren(f"{{{ns_ct}}}Override")):
+        if ov.get("PartName") in old_names:
+            root.remove(ov)
+    defaults = {d.get("Extension", "").lower(): d for d in root.iterchildren(f"{{{ns_ct}}}Default")}
+    for new in rename_map.values():
+        ext = new.suffix.lower().lstrip(".")
+        if ext not in defaults:
+            d = etree.Element(f"{{{ns_ct}}}Default", nsmap={None: ns_ct})
+            d.set("Extension", ext)
+            d.set("ContentType", MEDIA_CONTENT_TYPES[ext])
+            root.insert(0, d)
+            defaults[ext] = d
+    # Drop Default entries for extensions no part uses any more.
+    in_use = {p.suffix.lower().lstrip(".") for p in root_dir.rglob("*") if p.is_file()}
+    for old in rename_map:
+        ext = old.suffix.lower().lstrip(".")
+        if ext in defaults and ext not in in_use:
+            root.remove(defaults.pop(ext))
+    tree.write(str(ct_path), encoding="UTF-8", xml_declaration=True, standalone=True)
+
+def _encode_converted(im, has_alpha: bool, jpeg_quality: int, progressive_jpeg: bool):
+    """Smaller of PNG and (for opaque images) JPEG for a BMP/TIFF source. Returns (ext, bytes)."""
+    candidates = [(".png", optimize_png(im, has_alpha))]
+    if not has_alpha:
+        candidates.append((".jpeg", optimize_jpeg(im, jpeg_quality=jpeg_quality, progressive=progressive_jpeg)))
+    return min(candidates, key=lambda c: len(c[1]))
+
+def process_media_file(path: Path, max_long_edge: int, jpeg_quality: int, progressive_jpeg: bool, log_path: Path, display_size=None, rename_map=None, crop_box=None) -> int:
+    """Re-encode one media file in place. With crop_box the decoded image is cropped first and the result
+    is written only if it is smaller than the original part (one lossy generation, no intermediate save)."""
     ext = path.suffix.lower()
     if ext not in SUPPORTED_IMAGE_EXTS:
         return 0
@@ -81,11 +374,36 @@ def process_media_file(path: Path, max_long_edge: int, jpeg_quality: int, progre
             except Exception:
                 pass
             has_alpha = (im.mode in ("RGBA", "LA")) or (("transparency" in im.info) if hasattr(im, "info") else False)
+            if crop_box is not None:
+                im = im.crop(crop_box)
             im2 = downscale_image(im, max_long_edge)
+            if display_size is not None:
+                im2 = fit_display_size(im2, display_size)
+            # Lossless rewrites keep the original pixels, so they only apply to uncropped, unresized images.
+            same_pixels = crop_box is None and im2.size == im.size
 
             original_bytes = path.read_bytes()
-            if ext in (".jpg", ".jpeg"):
+            new_ext = ext
+            profile = None
+            if NUMPY_OK and ext in (".png", ".bmp", ".tif", ".tiff") and (ext == ".png" or rename_map is not None):
+                profile = classify_image(im2)
+            if profile is not None:
+                # Content decides the format: exact palette PNG, truecolor PNG or JPEG.
+                if profile.route == ROUTE_JPEG and rename_map is None:
+                    new_bytes = encode_png(im2, profile)
+                else:
+                    new_ext, new_bytes = encode_for_route(im2, profile, jpeg_quality, progressive_jpeg)
+                log_write(log_path, f"[ROUTE] {path.name}: {profile.route} ({profile.unique_colors} colors, "
+                                    f"flat {profile.flat_ratio:.2f}, entropy {profile.entropy:.1f})")
+            elif ext in (".bmp", ".tif", ".tiff") and rename_map is not None:
+                new_ext, new_bytes = _encode_converted(im2, has_alpha, jpeg_quality, progressive_jpeg)
+            elif ext in (".jpg", ".jpeg"):
                 new_bytes = optimize_jpeg(im2, jpeg_quality=jpeg_quality, progressive=progressive_jpeg)
+                # Not resized: rewriting markers/Huffman tables keeps the exact pixels; prefer it unless lossy is smaller.
+                lossless = optimize_jpeg_lossless(original_bytes, target=len(new_bytes)) if optimize_jpeg_lossless and same_pixels else None
+                if lossless is not None and len(lossless) <= len(new_bytes):
+                    new_bytes = lossless
+                    log_write(log_path, f"[LOSSLESS] {path.name}: metadata/Huffman tables rewritten without re-encoding")
             elif ext == ".png":
                 new_bytes = optimize_png(im2, has_alpha)
             elif ext in (".bmp", ".tif", ".tiff"):
@@ -101,11 +419,27 @@ def process_media_file(path: Path, max_long_edge: int, jpeg_quality: int, progre
             else:
                 new_bytes = original_bytes
 
+            if ext == ".png" and optimize_png_lossless and same_pixels:
+                # Chunk cleanup + IDAT re-deflate keeps the exact pixels and the .png name.
+                lossless = optimize_png_lossless(original_bytes)
+                if lossless is not None and len(lossless) <= len(new_bytes):
+                    new_bytes, new_ext = lossless, ext
+                    log_write(log_path, f"[LOSSLESS] {path.name}: ancillary chunks stripped, IDAT re-deflated")
+
             if len(new_bytes) < len(original_bytes):
-                path.write_bytes(new_bytes)
+                target = path
+                if new_ext != ext:
+                    target = _free_media_name(path, new_ext)
+                    rename_map[path] = target
+                target.write_bytes(new_bytes)
+                if target != path:
+                    path.unlink()
                 saved = len(original_bytes) - len(new_bytes)
-                log_write(log_path, f"[OK] {path.name}: {human_size(len(original_bytes))} -> {human_size(len(new_bytes))} (saved {human_size(saved)})")
+                log_write(log_path, f"[OK] {target.name if target == path else path.name + ' -> ' + target.name}: {human_size(len(original_bytes))} -> {human_size(len(new_bytes))} (saved {human_size(saved)})")
                 return saved
+            elif crop_box is not None:
+                log_write(log_path, f"[SKIP] {path.name}: cropped encoding not smaller; crop left in the drawing")
+                return 0
             else:
                 log_write(log_path, f"[SKIP] {path.name}: no smaller encoding found")
                 return 0
@@ -113,7 +447,7 @@ def process_media_file(path: Path, max_long_edge: int, jpeg_quality: int, progre
         log_write(log_path, f"[WARN] {path.name}: {e}")
         return 0
 
-def slim_xlsx(input_path: Path, output_path: Path, max_long_edge: int, jpeg_quality: int, progressive_jpeg: bool, log_path: Path, ui=None) -> tuple[int, int, int]:
+def slim_xlsx(input_path: Path, output_path: Path, max_long_edge: int, jpeg_quality: int, progressive_jpeg: bool, log_path: Path, ui=None, target_dpi: int = 0) -> tuple[int, int, int]:
     tmpdir = Path(tempfile.mkdtemp(prefix="xlsx_slim_"))
     total_saved = 0
     image_count = 0
@@ -125,10 +459,40 @@ def slim_xlsx(input_path: Path, output_path: Path, max_long_edge: int, jpeg_qual
         if media_dir.exists():
             files = [p for p in media_dir.iterdir() if p.is_file()]
             image_count = len(files)
+            display_sizes, crops = {}, {}
+            if LXML_OK:
+                crops = plan_picture_crops(tmpdir, log_path)
+                display_sizes = collect_display_sizes(tmpdir, target_dpi)
+            else:
+                log_write(log_path, "[INFO] lxml not installed; crop baking and display-size downscaling skipped.")
+            # BMP/TIFF are converted (and renamed) only when the references can be updated.
+            rename_map = {} if LXML_OK else None
+            baked = []
             for i, p in enumerate(files, 1):
                 if ui:
                     ui.update_status(f"Processing images... {i}/{image_count}")
-                total_saved += process_media_file(p, max_long_edge, jpeg_quality, progressive_jpeg, log_path)
+                display_size = display_sizes.get(p)
+                if display_size is not None:
+                    log_write(log_path, f"[SIZE] {p.name}: displayed at most {display_size[0]}x{display_size[1]}px @ {target_dpi} DPI")
+                if p in crops:
+                    box, (w, h), *_ = crops[p]
+                    cw, ch = box[2] - box[0], box[3] - box[1]
+                    # Display sizes cover the whole (uncropped) image; the cropped image needs only its share.
+                    crop_display = None
+                    if display_size is not None:
+                        crop_display = (max(1, round(display_size[0] * cw / w)), max(1, round(display_size[1] * ch / h)))
+                    saved = process_media_file(p, max_long_edge, jpeg_quality, progressive_jpeg, log_path,
+                                               display_size=crop_display, rename_map=rename_map, crop_box=box)
+                    if saved:
+                        baked.append(p)
+                        total_saved += saved
+                        log_write(log_path, f"[CROP] {p.name}: {w}x{h} -> {cw}x{ch}")
+                        continue
+                total_saved += process_media_file(p, max_long_edge, jpeg_quality, progressive_jpeg, log_path, display_size=display_size, rename_map=rename_map)
+            remove_baked_crops(crops, baked)
+            if rename_map:
+                sync_renamed_media(tmpdir, rename_map)
+                log_write(log_path, f"[INFO] Renamed {len(rename_map)} image(s) after format change; references updated.")
         else:
             log_write(log_path, "[INFO] No xl/media directory found.")
 
@@ -145,6 +509,326 @@ def slim_xlsx(input_path: Path, output_path: Path, max_long_edge: int, jpeg_qual
     finally:
         shutil.rmtree(tmpdir, ignore_errors=True)
 
+def _decode_image(data: bytes):
+    with Image.open(io.BytesIO(data)) as src:
+        try:
+            im = ImageOps.exif_transpose(src)
+        except Exception:
+            im = src.copy()
+        im.load()
+    return im
+
+class DecodedImageCache:
+    """Decoded sources and resized copies shared by every pass of a size search, capped at max_bytes.
+
+    Over budget, resized copies are dropped before decoded sources (least recently used first).
+    """
+
+    def __init__(self, max_bytes: int = TARGET_DECODE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # (path, edge) -> Image; edge None = decoded source
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(im) -> int:
+        return im.width * im.height * max(1, len(im.getbands()))
+
+    def get(self, key):
+        with self._lock:
+            im = self._items.get(key)
+            if im is not None:
+                self._items.move_to_end(key)
+            return im
+
+    def put(self, key, im) -> None:
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = im
+            self._bytes += self._cost(im)
+            while self._bytes > self.max_bytes:
+                others = [k for k in self._items if k != key]
+                if not others:
+                    break
+                victim = next((k for k in others if k[1] is not None), others[0])
+                self._bytes -= self._cost(self._items.pop(victim))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+class TrialImage:
+    """One media file for the target-size search. Pixels live in a DecodedImageCache; trial encodes are cached."""
+
+    def __init__(self, path: Path, progressive: bool, cache: DecodedImageCache | None = None):
+        self.path = path
+        self.progressive = progressive
+        self.original = path.read_bytes()
+        self.ext = path.suffix.lower()
+        self.choice = None  # (edge, quality, ext, bytes); quality None = PNG, "keep" = original bytes
+        self.cache = cache if cache is not None else DecodedImageCache()
+        self._encoded = {}
+
+    @property
+    def image(self):
+        im = self.cache.get((self.path, None))
+        if im is None:
+            im = _decode_image(self.original)
+            self.cache.put((self.path, None), im)
+        return im
+
+    def resized(self, edge: int):
+        im = self.cache.get((self.path, edge))
+        if im is None:
+            source = self.image
+            im = downscale_image(source, edge)
+            if im is not source:
+                self.cache.put((self.path, edge), im)
+        return im
+
+    @property
+    def size(self) -> int:
+        return len(self.choice[3]) if self.choice else len(self.original)
+
+    def edges(self) -> list:
+        long_edge = max(self.image.size)
+        return [long_edge] + [e for e in TARGET_EDGES if e < long_edge]
+
+    def qualities(self, allow_rename: bool) -> tuple:
+        im = self.image
+        has_alpha = im.mode in ("RGBA", "LA") or "transparency" in im.info
+        if has_alpha or (self.ext not in (".jpg", ".jpeg") and not allow_rename):
+            return (None,)
+        return TARGET_QUALITIES
+
+    def encode(self, edge: int, quality) -> bytes:
+        key = (edge, quality)
+        if key not in self._encoded:
+            im = self.resized(edge)
+            if quality is None:
+                has_alpha = im.mode in ("RGBA", "LA") or "transparency" in im.info
+                self._encoded[key] = optimize_png(im, has_alpha)
+            else:
+                self._encoded[key] = optimize_jpeg(im, jpeg_quality=quality, progressive=self.progressive)
+        return self._encoded[key]
+
+    def choose(self, share: int, allow_rename: bool):
+        """Largest edge, then highest quality, whose encode fits in share bytes (smallest trial if none fits)."""
+        if len(self.original) <= share:
+            return (None, "keep", self.ext, self.original)
+        qualities = self.qualities(allow_rename)
+        ext = ".png" if qualities == (None,) else (self.ext if self.ext in (".jpg", ".jpeg") else ".jpeg")
+        edges = self.edges()
+        for edge in edges:
+            # Lowest quality first: if even that misses, this edge is too large.
+            if len(self.encode(edge, qualities[-1])) > share:
+                continue
+            lo, hi = 0, len(qualities) - 1
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if len(self.encode(edge, qualities[mid])) <= share:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            return (edge, qualities[lo], ext, self.encode(edge, qualities[lo]))
+        return (edges[-1], qualities[-1], ext, self.encode(edges[-1], qualities[-1]))
+
+@dataclass
+class SweepResult:
+    max_edge: int
+    quality: int
+    size: int          # estimated workbook bytes
+    ssim: float        # pixel-weighted mean over images
+    min_ssim: float
+    psnr: float        # pixel-weighted mean, capped at 99 dB for identical images
+    pareto: bool = False
+
+def _sweep_image(im, ext: str, original: bytes, ref_stats, edge: int, qualities, progressive: bool) -> list:
+    """(quality, bytes, ssim, psnr) for one decoded image at one edge. Runs in a worker thread; encodes are not kept."""
+    resized = downscale_image(im, edge)
+    has_alpha = resized.mode in ("RGBA", "LA") or "transparency" in resized.info
+    ref_h, ref_w = ref_stats[0].shape
+    scored = {}  # PNG sources ignore quality: score each distinct encode once
+    rows = []
+    for quality in qualities:
+        key = quality if ext in (".jpg", ".jpeg") else None
+        if key not in scored:
+            data = optimize_png(resized, has_alpha) if key is None else optimize_jpeg(resized, jpeg_quality=key, progressive=progressive)
+            if len(data) >= len(original):
+                data = original  # the image stage keeps the original when nothing smaller is found
+            decoded = _decode_image(data).resize((ref_w, ref_h), Image.BILINEAR)
+            scored[key] = (len(data),) + ssim_psnr(ref_stats[0], luminance(decoded), ref_stats)
+        size, score, psnr = scored[key]
+        rows.append((quality, size, score, min(psnr, 99.0)))
+    return rows
+
+def sweep_image_settings(input_path: Path, log_path: Path, edges=SWEEP_EDGES, qualities=SWEEP_QUALITIES,
+                         progressive_jpeg: bool = True, max_workers: int = SWEEP_MAX_WORKERS) -> list:
+    """Estimate output size and SSIM/PSNR for every (max_edge, quality) pair. Returns SweepResult list sorted by size.
+
+    Images are handled one at a time: decoded once, the edges are encoded and scored in a thread pool,
+    and only per-pair totals are kept. SSIM is the mean Gaussian-window SSIM (11x11, sigma 1.5) on
+    luminance. Display-size, crop and content-route steps are not simulated.
+    """
+    if not NUMPY_OK:
+        raise RuntimeError("numpy is required for the parameter sweep (pip install numpy)")
+    with zipfile.ZipFile(input_path) as zf:
+        names = [n for n in zf.namelist() if n.startswith("xl/media/") and Path(n).suffix.lower() in SUPPORTED_IMAGE_EXTS]
+    overhead = _zip_overhead(input_path, set(names))
+
+    totals = {}  # (edge, quality) -> [bytes, weighted ssim, weighted psnr, min ssim]
+    total_weight, scored_images = 0, 0
+    with zipfile.ZipFile(input_path) as zf, ThreadPoolExecutor(max_workers=max_workers) as ex:
+        for name in names:
+            original = zf.read(name)
+            try:
+                im = _decode_image(original)
+                ref = downscale_image(im, SWEEP_EVAL_EDGE)
+                ref_stats = ssim_reference(luminance(ref))
+                ext = Path(name).suffix.lower()
+                rows = list(ex.map(lambda edge: _sweep_image(im, ext, original, ref_stats, edge, qualities, progressive_jpeg), edges))
+            except Exception as e:
+                # Left as is by the image stage too: counts toward size only.
+                log_write(log_path, f"[WARN] {Path(name).name}: not scored ({e})")
+                overhead += len(original)
+                continue
+            weight = ref.size[0] * ref.size[1]
+            for edge, image_rows in zip(edges, rows):
+                for quality, size, score, psnr in image_rows:
+                    t = totals.setdefault((edge, quality), [0, 0.0, 0.0, 1.0])
+                    t[0] += size
+                    t[1] += weight * score
+                    t[2] += weight * psnr
+                    t[3] = min(t[3], score)
+            total_weight += weight
+            scored_images += 1
+            del im, ref, ref_stats, rows
+
+    total_weight = total_weight or 1
+    results = [SweepResult(max_edge=edge, quality=quality, size=overhead + size,
+                           ssim=wssim / total_weight, min_ssim=min_ssim, psnr=wpsnr / total_weight)
+               for (edge, quality), (size, wssim, wpsnr, min_ssim) in totals.items()]
+    if not results:
+        return results
+    results.sort(key=lambda r: (r.size, -r.ssim))
+    best_ssim = -1.0
+    for r in results:
+        if r.ssim > best_ssim:
+            r.pareto = True
+            best_ssim = r.ssim
+
+    log_write(log_path, f"[SWEEP] {scored_images} image(s), {len(results)} parameter set(s); "
+                        f"SSIM = mean 11x11 Gaussian-window SSIM (sigma 1.5) on luminance at <= {SWEEP_EVAL_EDGE}px")
+    log_write(log_path, "[SWEEP] max_edge quality      size    SSIM  minSSIM   PSNR  pareto")
+    for r in results:
+        log_write(log_path, f"[SWEEP] {r.max_edge:>8} {r.quality:>7} {human_size(r.size):>9} {r.ssim:7.4f} {r.min_ssim:8.4f} {r.psnr:6.1f}  {'*' if r.pareto else ''}")
+    return results
+
+def pick_sweep_result(results, min_ssim: float):
+    """Smallest estimated size whose mean SSIM is at least min_ssim (None if no set qualifies)."""
+    ok = [r for r in results if r.ssim >= min_ssim]
+    return min(ok, key=lambda r: (r.size, -r.ssim)) if ok else None
+
+def _zip_overhead(input_path: Path, media: set) -> int:
+    """Compressed bytes of every part except the given media entries, plus ZIP headers."""
+    with zipfile.ZipFile(input_path) as zf:
+        total = 22
+        for info in zf.infolist():
+            total += ZIP_ENTRY_OVERHEAD + 2 * len(info.filename.encode("utf-8"))
+            if info.filename not in media:
+                total += info.compress_size
+        return total
+
+def slim_xlsx_to_size(input_path: Path, output_path: Path, target_bytes: int, progressive_jpeg: bool, log_path: Path, ui=None):
+    """Shrink images until the workbook fits in target_bytes. Returns (before, after, choices).
+
+    Bigger images get a proportionally larger share of the image budget. Images are visited largest
+    first and the search stops as soon as the projected size reaches the target.
+    """
+    tmpdir = Path(tempfile.mkdtemp(prefix="xlsx_fit_"))
+    try:
+        with zipfile.ZipFile(input_path, 'r') as zf:
+            zf.extractall(tmpdir)
+        media_dir = tmpdir / "xl" / "media"
+        # Without lxml references cannot be renamed, so only formats that keep their extension are touched.
+        exts = SUPPORTED_IMAGE_EXTS if LXML_OK else {".jpg", ".jpeg", ".png"}
+        files = [p for p in media_dir.iterdir() if p.is_file() and p.suffix.lower() in exts] if media_dir.exists() else []
+        # One cache for the whole search: later passes reuse the decoded and resized pixels.
+        cache = DecodedImageCache()
+        trials = sorted((TrialImage(p, progressive_jpeg, cache) for p in files), key=lambda t: len(t.original), reverse=True)
+        media_names = {"xl/media/" + t.path.name for t in trials}
+        overhead = _zip_overhead(input_path, media_names)
+        allow_rename = LXML_OK
+        log_write(log_path, f"[TARGET] {human_size(target_bytes)} target, {len(trials)} image(s), {human_size(overhead)} non-image parts")
+
+        goal = target_bytes
+        shutil.copyfile(input_path, output_path)
+        for attempt in range(1, TARGET_MAX_PASSES + 1):
+            projected = overhead + sum(t.size for t in trials)
+            if projected <= goal:
+                break
+            budget = goal - overhead
+            weight = sum(len(t.original) for t in trials)
+            for i, t in enumerate(trials, 1):
+                if ui:
+                    ui.update_status(f"Fitting images... {i}/{len(trials)} (pass {attempt})")
+                share = max(1, int(budget * len(t.original) / weight)) if weight else 1
+                try:
+                    before = t.size
+                    t.choice = t.choose(share, allow_rename)
+                except Exception as e:
+                    log_write(log_path, f"[WARN] {t.path.name}: {e}")
+                    continue
+                budget -= t.size
+                weight -= len(t.original)
+                projected += t.size - before
+                if projected <= goal:
+                    break
+
+            # Write this pass to a fresh copy so earlier renames never stack.
+            pass_dir = Path(tempfile.mkdtemp(prefix="xlsx_fit_pass_"))
+            try:
+                shutil.copytree(tmpdir, pass_dir, dirs_exist_ok=True)
+                rename_map = {}
+                for t in trials:
+                    if not t.choice or t.choice[1] == "keep":
+                        continue
+                    src = pass_dir / t.path.relative_to(tmpdir)
+                    dst = src if t.choice[2] == t.ext else _free_media_name(src, t.choice[2])
+                    dst.write_bytes(t.choice[3])
+                    if dst != src:
+                        src.unlink()
+                        rename_map[src] = dst
+                if rename_map:
+                    sync_renamed_media(pass_dir, rename_map)
+                with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf_out:
+                    for folder, _, names in os.walk(pass_dir):
+                        for name in names:
+                            full_path = Path(folder) / name
+                            zf_out.write(full_path, arcname=full_path.relative_to(pass_dir).as_posix())
+            finally:
+                shutil.rmtree(pass_dir, ignore_errors=True)
+            actual = output_path.stat().st_size
+            log_write(log_path, f"[TARGET] pass {attempt}: {human_size(actual)}")
+            if actual <= target_bytes:
+                break
+            # Estimate was off (ZIP headers, XML recompression): tighten by the overshoot and retry.
+            goal -= actual - target_bytes
+
+        choices = []
+        for t in trials:
+            if t.choice and t.choice[1] != "keep":
+                edge, quality, _, data = t.choice
+                choices.append((t.path.name, edge, quality, len(data)))
+                label = "PNG" if quality is None else f"JPEG q{quality}"
+                log_write(log_path, f"[TARGET] {t.path.name}: edge {edge}px, {label} -> {human_size(len(data))} (was {human_size(len(t.original))})")
+        cache.clear()
+        return input_path.stat().st_size, output_path.stat().st_size, choices
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
 class ProgressUI:
     def __init__(self):
         self.root = tk.Tk()
@@ -255,6 +939,10 @@ def main():
     parser.add_argument("--max-edge", type=int, default=1400)
     parser.add_argument("--jpeg-quality", type=int, default=80)
     parser.add_argument("--no-progressive", action="store_true")
+    parser.add_argument("--target-dpi", type=int, default=0, help="Downscale images to their on-sheet display size at this DPI (0 = off)")
+    parser.add_argument("--target-mb", type=float, default=0, help="Instead of fixed settings, shrink images until the file is under this many MB")
+    parser.add_argument("--sweep", action="store_true", help="Compare max-edge/quality pairs (size, SSIM, PSNR) and print a Pareto table")
+    parser.add_argument("--min-ssim", type=float, default=0, help="With --sweep: slim with the smallest pair whose mean SSIM (11x11 Gaussian window) reaches this value")
     args = parser.parse_args()
 
     progressive = not args.no_progressive
@@ -269,7 +957,25 @@ def main():
         print(f"[ERROR] Input not found: {in_path}", file=sys.stderr)
         sys.exit(2)
     out_path = in_path.with_stem(in_path.stem + "_slim")
-    before, after, count = slim_xlsx(in_path, out_path, args.max_edge, args.jpeg_quality, progressive, in_path.with_suffix(".log"))
+    if args.sweep:
+        log_path = in_path.with_suffix(".log")
+        results = sweep_image_settings(in_path, log_path, progressive_jpeg=progressive)
+        if not results:
+            print("[SKIP] No images to sweep.")
+            return
+        print(log_path.read_text(encoding="utf-8"))
+        best = pick_sweep_result(results, args.min_ssim) if args.min_ssim > 0 else None
+        if best is None:
+            if args.min_ssim > 0:
+                print(f"[WARN] No parameter set reaches SSIM {args.min_ssim}; nothing written.")
+            return
+        args.max_edge, args.jpeg_quality = best.max_edge, best.quality
+        print(f"Applying max_edge={best.max_edge}, jpeg_quality={best.quality} (SSIM {best.ssim:.4f})")
+    if args.target_mb > 0:
+        before, after, choices = slim_xlsx_to_size(in_path, out_path, int(args.target_mb * 1024 * 1024), progressive, in_path.with_suffix(".log"))
+        print(f"Done. Images changed: {len(choices)}, Before: {before}, After: {after}")
+        return
+    before, after, count = slim_xlsx(in_path, out_path, args.max_edge, args.jpeg_quality, progressive, in_path.with_suffix(".log"), target_dpi=args.target_dpi)
     print(f"Done. Images: {count}, Before: {before}, After: {after}")
 
 if __name__ == "__main__":
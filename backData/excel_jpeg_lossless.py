@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JPEG 무손실 최적화 (이미지 슬리머 · 정밀 슬리머 공용)
+- 픽셀을 다시 인코딩하지 않고 JPEG 마커만 다시 쓴다.
+  · EXIF/XMP/주석/썸네일/MPF 등 표시와 무관한 APPn·COM 세그먼트 제거
+    (EXIF 회전 값이 있으면 그 값만 담은 최소 EXIF 로 교체, Adobe APP14 는 색 변환 정보라 유지)
+  · ICC 프로파일이 sRGB 이면 제거 (프로파일이 없으면 sRGB 로 보므로 표시 결과가 같다)
+  · 기본 순차(baseline) 단일 스캔 JPEG 이 모든 AC 심볼을 정의한 일반 테이블(표준 부록 K 테이블 등)을 쓰면
+    허프만 부호를 풀어 실제 빈도로 최적 허프만 테이블을 만들고 다시 부호화 (이미 최적화된 테이블은 건너뜀)
+  · 허프만 재부호화는 순수 파이썬이라 Pillow 재인코딩보다 훨씬 느리므로 HUFFMAN_MAX_PIXELS 이하에서만 하고,
+    비교할 손실 인코딩 크기(target)가 주어지면 마커 정리만으로 이기거나 재부호화로도 못 이기는 경우 생략
+- 양자화 계수는 그대로이므로 디코딩한 픽셀이 원본과 완전히 같다.
+- 해석할 수 없는 구조(산술 부호화, 계층형, 손상된 스트림 등)는 None 을 돌려준다.
+- jpeg_source_info: DQT 휘도 테이블과 표준 테이블의 비율로 원본 저장 품질(IJG 기준)을, SOF 로 크로마 서브샘플링을 추정.
+"""
+import re
+from array import array
+
+HUFFMAN_MAX_PIXELS = 2_000_000  # 이보다 큰 이미지는 허프만 재부호화 없이 마커만 정리 (순수 파이썬이라 느림)
+HUFFMAN_MAX_GAIN = 0.15  # 허프만 재부호화로 줄 수 있는 비율의 상한 (target 에 닿을 수 없으면 생략)
+_GENERIC_AC_SYMBOLS = 162  # 가능한 AC 심볼 전부 (run 0..15 × size 1..10 + EOB + ZRL)
+
+_SOI = b"\xff\xd8"
+_EOI = b"\xff\xd9"
+_M_SOF0, _M_SOF1, _M_DHT, _M_DQT, _M_SOS, _M_DRI, _M_EOI = 0xC0, 0xC1, 0xC4, 0xDB, 0xDA, 0xDD, 0xD9
+_M_APP0, _M_APP1, _M_APP2, _M_APP14, _M_COM = 0xE0, 0xE1, 0xE2, 0xEE, 0xFE
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# ITU T.81 부록 K 휘도 양자화 테이블 (행 순서). DQT 는 지그재그 순서로 저장된다.
+_STD_LUMA_QT = (
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+)
+_ZIGZAG = sorted(range(64), key=lambda i: (i // 8 + i % 8, i // 8 if (i // 8 + i % 8) % 2 else i % 8))
+
+# 엔트로피 데이터 끝: 0xFF 뒤에 0x00(바이트 스터핑), RSTn, 0xFF(채움) 이외의 바이트
+_MARKER_RE = re.compile(rb"\xff[^\x00\xd0-\xd7\xff]")
+_RST_RE = re.compile(rb"\xff[\xd0-\xd7]")
+
+
+class JpegError(ValueError):
+    pass
+
+
+def _parse(data: bytes) -> list:
+    """JPEG 을 [(마커, 페이로드, 엔트로피 데이터)] 로 나눈다. EOI 뒤에 붙은 데이터는 버린다."""
+    if data[:2] != _SOI:
+        raise JpegError("JPEG 이 아닙니다.")
+    segs = []
+    pos, n = 2, len(data)
+    while pos < n:
+        if data[pos] != 0xFF:
+            raise JpegError("마커 위치가 올바르지 않습니다.")
+        while pos < n and data[pos] == 0xFF:
+            pos += 1
+        if pos >= n:
+            break
+        marker = data[pos]
+        pos += 1
+        if marker == _M_EOI:
+            return segs
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            raise JpegError("스캔 밖에 RST/TEM 마커가 있습니다.")
+        length = int.from_bytes(data[pos:pos + 2], "big")
+        payload = data[pos + 2:pos + length]
+        if length < 2 or len(payload) != length - 2:
+            raise JpegError("세그먼트 길이가 올바르지 않습니다.")
+        pos += length
+        entropy = b""
+        if marker == _M_SOS:
+            m = _MARKER_RE.search(data, pos)
+            if m is None:
+                raise JpegError("스캔 데이터가 잘렸습니다.")
+            entropy = data[pos:m.start()]
+            pos = m.start()
+        segs.append((marker, payload, entropy))
+    raise JpegError("EOI 가 없습니다.")
+
+
+def _build(segs) -> bytes:
+    out = [_SOI]
+    for marker, payload, entropy in segs:
+        out.append(bytes((0xFF, marker)) + (len(payload) + 2).to_bytes(2, "big") + payload)
+        out.append(entropy)
+    out.append(_EOI)
+    return b"".join(out)
+
+
+# ---- 메타데이터 정리 ----
+def _exif_orientation(tiff: bytes) -> int | None:
+    order = {b"MM": "big", b"II": "little"}.get(tiff[:2])
+    if order is None or len(tiff) < 8:
+        return None
+    ifd = int.from_bytes(tiff[4:8], order)
+    if ifd + 2 > len(tiff):
+        return None
+    for i in range(int.from_bytes(tiff[ifd:ifd + 2], order)):
+        e = ifd + 2 + 12 * i
+        if e + 12 > len(tiff):
+            break
+        if int.from_bytes(tiff[e:e + 2], order) == 0x0112:
+            return int.from_bytes(tiff[e + 8:e + 10], order)
+    return None
+
+
+def _orientation_exif(orientation: int) -> bytes:
+    """회전 태그 하나만 담은 EXIF(APP1) 페이로드."""
+    return (b"Exif\x00\x00MM\x00\x2a\x00\x00\x00\x08\x00\x01"
+            + b"\x01\x12\x00\x03\x00\x00\x00\x01" + orientation.to_bytes(2, "big") + b"\x00\x00"
+            + b"\x00\x00\x00\x00")
+
+
+def is_srgb_profile(profile: bytes) -> bool:
+    """ICC 프로파일의 설명(desc) 태그가 sRGB 인지 확인한다."""
+    if len(profile) < 132 or profile[16:20] != b"RGB ":
+        return False
+    count = int.from_bytes(profile[128:132], "big")
+    for i in range(min(count, 256)):
+        e = 132 + 12 * i
+        if e + 12 > len(profile):
+            break
+        if profile[e:e + 4] == b"desc":
+            off = int.from_bytes(profile[e + 4:e + 8], "big")
+            size = int.from_bytes(profile[e + 8:e + 12], "big")
+            desc = profile[off:off + size]
+            return b"sRGB" in desc or b"s\x00R\x00G\x00B" in desc
+    return False
+
+
+def _strip_metadata(segs) -> list:
+    icc_chunks = [p for m, p, _ in segs if m == _M_APP2 and p[:12] == b"ICC_PROFILE\x00"]
+    icc = b"".join(p[14:] for p in sorted(icc_chunks, key=lambda p: p[12]))
+    keep_icc = bool(icc_chunks) and not is_srgb_profile(icc)
+
+    kept = []
+    for marker, payload, entropy in segs:
+        if marker == _M_APP0:
+            if payload[:5] != b"JFIF\x00" or len(payload) < 12:
+                continue
+            payload = payload[:12] + b"\x00\x00"  # JFIF 썸네일 제거
+        elif marker == _M_APP1:
+            orientation = _exif_orientation(payload[6:]) if payload[:6] == b"Exif\x00\x00" else None
+            if orientation in (None, 1):
+                continue
+            payload = _orientation_exif(orientation)
+        elif marker == _M_APP2:
+            if not (keep_icc and payload[:12] == b"ICC_PROFILE\x00"):
+                continue
+        elif (0xE3 <= marker <= 0xEF and marker != _M_APP14) or marker == _M_COM:
+            continue
+        kept.append((marker, payload, entropy))
+    return kept
+
+
+# ---- 허프만 재부호화 ----
+def _parse_dht(payload: bytes, tables: dict) -> None:
+    pos = 0
+    while pos < len(payload):
+        tc_th = payload[pos]
+        counts = payload[pos + 1:pos + 17]
+        total = sum(counts)
+        symbols = payload[pos + 17:pos + 17 + total]
+        if len(counts) != 16 or len(symbols) != total or tc_th >> 4 > 1 or tc_th & 15 > 3:
+            raise JpegError("DHT 세그먼트가 올바르지 않습니다.")
+        tables[(tc_th >> 4) * 4 + (tc_th & 15)] = (bytes(counts), bytes(symbols))
+        pos += 17 + total
+
+
+def _decode_lut(counts: bytes, symbols: bytes) -> list:
+    """16비트를 미리 읽어 (부호 길이 << 8 | 심볼) 을 바로 찾는 표. 0 은 잘못된 부호."""
+    lut = [0] * 65536
+    code = k = 0
+    for length in range(1, 17):
+        for _ in range(counts[length - 1]):
+            span = 1 << (16 - length)
+            start = code << (16 - length)
+            if start + span > 65536:
+                raise JpegError("허프만 테이블이 올바르지 않습니다.")
+            lut[start:start + span] = [(length << 8) | symbols[k]] * span
+            code += 1
+            k += 1
+        code <<= 1
+    return lut
+
+
+def _decode_interval(buf: bytes, mcus: int, blocks, tokens: array) -> None:
+    """MCU mcus 개를 풀어 (슬롯 << 24 | 심볼 << 16 | 추가 비트) 토큰으로 tokens 에 쌓는다."""
+    acc = nacc = pos = 0
+    n = len(buf)
+    append = tokens.append
+    for _ in range(mcus):
+        for dc_lut, ac_lut, dc_tag, ac_tag, dc_freq, ac_freq in blocks:
+            while nacc < 32:
+                acc = ((acc & ((1 << nacc) - 1)) << 8) | (buf[pos] if pos < n else 0xFF)
+                pos += 1
+                nacc += 8
+            e = dc_lut[(acc >> (nacc - 16)) & 0xFFFF]
+            if not e:
+                raise JpegError("허프만 부호를 해석할 수 없습니다.")
+            nacc -= e >> 8
+            s = e & 0xFF
+            dc_freq[s] += 1
+            nacc -= s
+            append(dc_tag | (s << 16) | ((acc >> nacc) & ((1 << s) - 1)))
+            k = 1
+            while k < 64:
+                while nacc < 32:
+                    acc = ((acc & ((1 << nacc) - 1)) << 8) | (buf[pos] if pos < n else 0xFF)
+                    pos += 1
+                    nacc += 8
+                e = ac_lut[(acc >> (nacc - 16)) & 0xFFFF]
+                if not e:
+                    raise JpegError("허프만 부호를 해석할 수 없습니다.")
+                nacc -= e >> 8
+                rs = e & 0xFF
+                ac_freq[rs] += 1
+                s = rs & 15
+                nacc -= s
+                append(ac_tag | (rs << 16) | ((acc >> nacc) & ((1 << s) - 1)))
+                if s:
+                    k += (rs >> 4) + 1
+                elif rs == 0xF0:
+                    k += 16
+                else:
+                    break
+            if k > 64:
+                raise JpegError("블록 계수 개수가 64를 넘습니다.")
+    if pos * 8 - nacc > n * 8:
+        raise JpegError("스캔 데이터가 부족합니다.")
+
+
+def _optimal_table(freq: list) -> tuple[bytes, bytes]:
+    """빈도로 최대 16비트 길이의 허프만 테이블(counts, symbols)을 만든다 (ITU T.81 K.2)."""
+    freq = list(freq) + [1]  # 256번: 모든 비트가 1 인 부호를 예약
+    codesize = [0] * 257
+    others = [-1] * 257
+    while True:
+        c1 = c2 = -1
+        v1 = v2 = 1 << 62
+        for i, f in enumerate(freq):
+            if f and f <= v1:
+                v2, c2 = v1, c1
+                v1, c1 = f, i
+            elif f and f <= v2:
+                v2, c2 = f, i
+        if c2 < 0:
+            break
+        freq[c1] += freq[c2]
+        freq[c2] = 0
+        codesize[c1] += 1
+        while others[c1] >= 0:
+            c1 = others[c1]
+            codesize[c1] += 1
+        others[c1] = c2
+        codesize[c2] += 1
+        while others[c2] >= 0:
+            c2 = others[c2]
+            codesize[c2] += 1
+
+    bits = [0] * 33
+    for size in codesize:
+        if size:
+            bits[size] += 1
+    for i in range(32, 16, -1):
+        while bits[i] > 0:
+            j = i - 2
+            while bits[j] == 0:
+                j -= 1
+            bits[i] -= 2
+            bits[i - 1] += 1
+            bits[j + 1] += 2
+            bits[j] -= 1
+    i = 16
+    while bits[i] == 0:
+        i -= 1
+    bits[i] -= 1
+    symbols = bytes(s for size in range(1, 33) for s in range(256) if codesize[s] == size)
+    return bytes(bits[1:17]), symbols
+
+
+def _encode_codes(counts: bytes, symbols: bytes) -> list:
+    codes = [None] * 256
+    code = k = 0
+    for length in range(1, 17):
+        for _ in range(counts[length - 1]):
+            codes[symbols[k]] = (code, length)
+            code += 1
+            k += 1
+        code <<= 1
+    return codes
+
+
+def _encode_interval(tokens: array, start: int, end: int, codes: list) -> bytes:
+    out = bytearray()
+    acc = nacc = 0
+    for i in range(start, end):
+        t = tokens[i]
+        slot = t >> 24
+        sym = (t >> 16) & 0xFF
+        code, length = codes[slot][sym]
+        s = sym if slot < 4 else sym & 15
+        acc = (((acc << length) | code) << s) | (t & 0xFFFF)
+        nacc += length + s
+        if nacc >= 1024:
+            nbytes = nacc >> 3
+            nacc -= nbytes * 8
+            out += (acc >> nacc).to_bytes(nbytes, "big")
+            acc &= (1 << nacc) - 1
+    if nacc % 8:
+        pad = 8 - nacc % 8
+        acc = (acc << pad) | ((1 << pad) - 1)
+        nacc += pad
+    if nacc:
+        out += acc.to_bytes(nacc >> 3, "big")
+    return bytes(out).replace(b"\xff", b"\xff\x00")
+
+
+def _rehuffman(segs) -> list | None:
+    """단일 스캔 기본 순차 JPEG 의 허프만 테이블을 최적 테이블로 바꾼 세그먼트 목록. 대상이 아니면 None."""
+    sofs = [(m, p) for m, p, _ in segs if m in _SOF_MARKERS]
+    scans = [(p, e) for m, p, e in segs if m == _M_SOS]
+    if len(sofs) != 1 or sofs[0][0] not in (_M_SOF0, _M_SOF1) or len(scans) != 1:
+        return None
+    sof = sofs[0][1]
+    height, width, nf = int.from_bytes(sof[1:3], "big"), int.from_bytes(sof[3:5], "big"), sof[5]
+    if not height or not width or width * height > HUFFMAN_MAX_PIXELS:
+        return None
+    comps = {}
+    for i in range(nf):
+        c = sof[6 + 3 * i:9 + 3 * i]
+        comps[c[0]] = (c[1] >> 4, c[1] & 15)
+    hmax = max(h for h, _ in comps.values())
+    vmax = max(v for _, v in comps.values())
+
+    tables = {}
+    restart = 0
+    for m, p, _ in segs:
+        if m == _M_DHT:
+            _parse_dht(p, tables)
+        elif m == _M_DRI:
+            restart = int.from_bytes(p[:2], "big")
+
+    sos, entropy = scans[0]
+    ns = sos[0]
+    if sos[1 + 2 * ns:4 + 2 * ns] != b"\x00\x3f\x00":
+        return None
+    luts, freqs, blocks = {}, {}, []
+    generic = False
+    for i in range(ns):
+        cid, td_ta = sos[1 + 2 * i], sos[2 + 2 * i]
+        if cid not in comps:
+            raise JpegError("스캔 성분이 프레임에 없습니다.")
+        slots = (td_ta >> 4, 4 + (td_ta & 15))
+        for slot in slots:
+            if slot not in tables:
+                raise JpegError("스캔이 쓰는 허프만 테이블이 없습니다.")
+            if slot not in luts:
+                luts[slot] = _decode_lut(*tables[slot])
+                freqs[slot] = [0] * 256
+        dc, ac = slots
+        generic = generic or len(tables[ac][1]) >= _GENERIC_AC_SYMBOLS
+        block = (luts[dc], luts[ac], dc << 24, ac << 24, freqs[dc], freqs[ac])
+        h, v = comps[cid]
+        blocks.extend([block] * (h * v if ns > 1 else 1))
+    if not generic:
+        return None
+    if ns > 1:
+        mcus = -(-width // (8 * hmax)) * -(-height // (8 * vmax))
+    else:
+        h, v = comps[sos[1]]
+        mcus = -(-(-(-width * h // hmax)) // 8) * -(-(-(-height * v // vmax)) // 8)
+
+    parts = _RST_RE.split(entropy) if restart else [entropy]
+    intervals = -(-mcus // restart) if restart else 1
+    if len(parts) != intervals:
+        return None
+    tokens = array("I")
+    bounds = [0]
+    for i, part in enumerate(parts):
+        count = min(restart, mcus - i * restart) if restart else mcus
+        _decode_interval(part.replace(b"\xff\x00", b"\xff"), count, blocks, tokens)
+        bounds.append(len(tokens))
+
+    new_tables = {slot: _optimal_table(freqs[slot]) for slot in sorted(freqs)}
+    codes = [None] * 8
+    for slot, table in new_tables.items():
+        codes[slot] = _encode_codes(*table)
+    coded = []
+    for i in range(len(parts)):
+        if i:
+            coded.append(bytes((0xFF, 0xD0 + (i - 1) % 8)))
+        coded.append(_encode_interval(tokens, bounds[i], bounds[i + 1], codes))
+    dht = b"".join(bytes(((slot >> 2) << 4 | (slot & 3),)) + counts + symbols
+                   for slot, (counts, symbols) in new_tables.items())
+
+    out = []
+    for m, p, e in segs:
+        if m == _M_DHT:
+            continue
+        if m == _M_SOS:
+            out.append((_M_DHT, dht, b""))
+            e = b"".join(coded)
+        out.append((m, p, e))
+    return out
+
+
+# ---- 원본 품질 추정 ----
+def _estimate_quality(qt) -> int:
+    """지그재그 순서 휘도 테이블 → IJG 품질(1~100). libjpeg 의 품질→배율 공식을 거꾸로 적용한다."""
+    scale = sum(q * 100 / _STD_LUMA_QT[n] for q, n in zip(qt, _ZIGZAG)) / 64
+    quality = 5000 / scale if scale > 100 else (200 - scale) / 2
+    return max(1, min(100, round(quality)))
+
+
+def jpeg_source_info(data: bytes) -> tuple[int, str] | None:
+    """(추정 품질, 서브샘플링 "4:2:0"/"4:2:2"/"4:4:4"/"gray"/"other"). 해석할 수 없으면 None."""
+    try:
+        segs = _parse(data)
+        tables = {}
+        for m, p, _ in segs:
+            if m != _M_DQT:
+                continue
+            pos = 0
+            while pos < len(p):
+                precision, tq = p[pos] >> 4, p[pos] & 15
+                size = 128 if precision else 64
+                raw = p[pos + 1:pos + 1 + size]
+                if len(raw) != size:
+                    raise JpegError("DQT 세그먼트가 올바르지 않습니다.")
+                tables[tq] = [int.from_bytes(raw[i:i + 2], "big") for i in range(0, 128, 2)] if precision else list(raw)
+                pos += 1 + size
+        sof = next(p for m, p, _ in segs if m in _SOF_MARKERS)
+        nf = sof[5]
+        luma_h, luma_v, luma_tq = sof[7] >> 4, sof[7] & 15, sof[8]
+        quality = _estimate_quality(tables[luma_tq])
+    except (JpegError, IndexError, KeyError, StopIteration):
+        return None
+    if nf == 1:
+        sampling = "gray"
+    elif any(sof[7 + 3 * i] != 0x11 for i in range(1, nf)):
+        sampling = "other"
+    else:
+        sampling = {(1, 1): "4:4:4", (2, 1): "4:2:2", (2, 2): "4:2:0"}.get((luma_h, luma_v), "other")
+    return quality, sampling
+
+
+def optimize_jpeg_lossless(data: bytes, huffman: bool = True, target: int | None = None) -> bytes | None:
+    """픽셀을 바꾸지 않고 JPEG 을 줄인 바이트. 해석할 수 없거나 줄지 않으면 None.
+
+    target: 비교할 다른 인코딩의 크기. 마커만 정리한 결과가 target 이하이거나, 허프만 재부호화로
+    HUFFMAN_MAX_GAIN 만큼 줄어도 target 보다 크면 (느린) 재부호화를 하지 않는다.
+    """
+    try:
+        segs = _strip_metadata(_parse(data))
+        if huffman and target is not None:
+            stripped = len(_build(segs))
+            huffman = target < stripped <= target / (1 - HUFFMAN_MAX_GAIN)
+        if huffman:
+            segs = _rehuffman(segs) or segs
+        out = _build(segs)
+    except (JpegError, IndexError, KeyError, TypeError):
+        return None
+    return out if len(out) < len(data) else None
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PNG 무손실 최적화 (이미지 슬리머 · 정밀 슬리머 공용)
+- Pillow 로 픽셀을 디코딩하지 않고 PNG 청크 단위로 다시 쓴다.
+  · 텍스트/시간 청크(tEXt, iTXt, zTXt, tIME) 제거
+  · sRGB 청크가 함께 있는 iCCP 는 제거, 프로파일 자체가 sRGB 인 iCCP 는 13바이트 sRGB 청크로 교체
+  · IDAT 를 하나로 합쳐 여러 zlib 전략(기본/FILTERED/RLE, 레벨 9)으로 다시 압축해 가장 작은 것을 사용
+  · NumPy 가 있으면 원본 행 필터를 풀고 다시 골라 본다 (전부 None, 행별 최소 절대합)
+    필터 재선택만 NumPy 를 쓴다 (순수 파이썬 바이트 반복은 큰 이미지에서 너무 느림).
+    NumPy 가 없어도 청크 정리와 IDAT 재압축은 표준 라이브러리(zlib)만으로 동작한다.
+- 스캔라인은 그대로 다시 압축하거나 같은 픽셀로 되돌아가는 필터만 쓰므로 디코딩 결과가 원본과 같다.
+- zlib 은 압축하는 동안 GIL 을 놓으므로 호출 측에서 여러 이미지를 스레드 풀로 나눠 처리할 수 있다.
+"""
+import struct
+import zlib
+
+try:
+    import numpy as np
+    NUMPY_OK = True
+except Exception:
+    np = None
+    NUMPY_OK = False
+
+from excel_jpeg_lossless import is_srgb_profile
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+FILTER_TRIAL_MAX_BYTES = 8 * 1024 * 1024  # 스캔라인이 이보다 크면 필터 재선택 생략 (메모리)
+
+_DROP_CHUNKS = {b"tEXt", b"iTXt", b"zTXt", b"tIME"}
+_ZLIB_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED, zlib.Z_RLE)
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}  # 색 형식별 채널 수
+
+
+class PngError(ValueError):
+    pass
+
+
+def _read_chunks(data: bytes) -> list:
+    if data[:8] != PNG_SIGNATURE:
+        raise PngError("PNG 가 아닙니다.")
+    chunks = []
+    pos = 8
+    while pos + 12 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        crc = data[pos + 8 + length:pos + 12 + length]
+        if len(body) != length or len(crc) != 4 or zlib.crc32(ctype + body) != int.from_bytes(crc, "big"):
+            raise PngError(f"{ctype!r} 청크가 손상되었습니다.")
+        chunks.append((ctype, body))
+        pos += 12 + length
+        if ctype == b"IEND":
+            return chunks
+    raise PngError("IEND 가 없습니다.")
+
+
+def _chunk(ctype: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", zlib.crc32(ctype + body))
+
+
+def _iccp_profile(body: bytes) -> bytes | None:
+    sep = body.find(b"\x00")
+    if sep < 0 or sep + 2 > len(body):
+        return None
+    try:
+        return zlib.decompress(body[sep + 2:])
+    except zlib.error:
+        return None
+
+
+def _deflate(raw: bytes) -> bytes:
+    """여러 zlib 전략 중 가장 작은 결과."""
+    best = None
+    for strategy in _ZLIB_STRATEGIES:
+        c = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        out = c.compress(raw) + c.flush()
+        if best is None or len(out) < len(best):
+            best = out
+    return best
+
+
+def _unfilter_diagonal(kinds, data, bpp: int):
+    """Average/Paeth 가 섞인 스캔라인을 되돌린다.
+
+    각 바이트는 왼쪽(a), 위(b), 왼쪽 위(c) 복원값에만 의존하므로, bpp 바이트 묶음을 한 칸으로 보고
+    y + x 가 같은 대각선의 칸들을 한 번에 계산한다 (행마다 다른 필터는 칸마다 골라 적용).
+    """
+    height, stride = data.shape
+    cols = -(-stride // bpp)
+    cells = np.zeros((height, cols * bpp), dtype=np.int16)
+    cells[:, :stride] = data
+    cells = cells.reshape(height, cols, bpp)
+    out = np.zeros((height + 1, cols + 1, bpp), dtype=np.int16)  # 0 행/0 열은 경계(0)
+    for k in range(height + cols - 1):
+        ys = np.arange(max(0, k - cols + 1), min(height - 1, k) + 1)
+        xs = k - ys
+        a, b, c = out[ys + 1, xs], out[ys, xs + 1], out[ys, xs]
+        p = a + b - c
+        pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+        kind = kinds[ys][:, None]
+        pred = np.select([kind == 1, kind == 2, kind == 3, kind == 4], [a, b, (a + b) >> 1, paeth], 0)
+        out[ys + 1, xs + 1] = (cells[ys, xs] + pred) & 0xFF
+    return out[1:, 1:].reshape(height, -1)[:, :stride].astype(np.uint8)
+
+
+def _unfilter(rows, bpp: int):
+    """스캔라인의 필터(None/Sub/Up/Average/Paeth)를 풀어 원래 바이트로 되돌린다. 알 수 없는 필터가 있으면 None."""
+    kinds = rows[:, 0]
+    if kinds.max() > 4:
+        return None
+    data = rows[:, 1:]
+    if kinds.max() > 2:
+        return _unfilter_diagonal(kinds, data, bpp)
+    height, stride = data.shape
+    out = np.empty_like(data)
+    prev = np.zeros(stride, dtype=np.uint8)
+    pad = (-stride) % bpp
+    for y in range(height):
+        kind, line = kinds[y], data[y]
+        if kind == 1:
+            lanes = np.concatenate([line, np.zeros(pad, dtype=np.uint8)]).reshape(-1, bpp)
+            out[y] = (np.cumsum(lanes, axis=0, dtype=np.uint64) & 0xFF).reshape(-1)[:stride]
+        elif kind == 2:
+            out[y] = line + prev
+        else:
+            out[y] = line
+        prev = out[y]
+    return out
+
+
+def _filter_candidates(raw: bytes, ihdr: bytes) -> list:
+    """원래 스캔라인에 필터를 다시 적용한 후보 (전부 None, 행별 최소 절대합)."""
+    width, height, depth, color, _, _, interlace = struct.unpack(">IIBBBBB", ihdr)
+    if interlace or color not in _CHANNELS or len(raw) > FILTER_TRIAL_MAX_BYTES:
+        return []
+    stride = (width * _CHANNELS[color] * depth + 7) // 8
+    if not height or len(raw) != height * (stride + 1):
+        return []
+    bpp = max(1, _CHANNELS[color] * depth // 8)
+    pixels = _unfilter(np.frombuffer(raw, dtype=np.uint8).reshape(height, stride + 1), bpp)
+    if pixels is None:
+        return []
+
+    def _pack(kinds, filtered):
+        return np.concatenate([kinds.astype(np.uint8)[:, None], filtered], axis=1).tobytes()
+
+    candidates = [_pack(np.zeros(height), pixels)]
+    if color == 3 or depth < 8:
+        return candidates  # 팔레트/저비트 이미지는 None 필터가 보통 가장 작다
+
+    r = pixels.astype(np.int16)
+    left = np.zeros_like(r)
+    left[:, bpp:] = r[:, :-bpp]
+    up = np.zeros_like(r)
+    up[1:] = r[:-1]
+    up_left = np.zeros_like(r)
+    up_left[1:, bpp:] = r[:-1, :-bpp]
+    p = left + up - up_left
+    pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - up_left)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, up_left))
+    filtered = np.stack([r, r - left, r - up, r - ((left + up) >> 1), r - paeth]).astype(np.uint8)
+    cost = np.abs(filtered.view(np.int8).astype(np.int32)).sum(axis=2)
+    kinds = cost.argmin(axis=0)
+    candidates.append(_pack(kinds, filtered[kinds, np.arange(height)]))
+    return candidates
+
+
+def optimize_png_lossless(data: bytes, filters: bool = True) -> bytes | None:
+    """픽셀을 바꾸지 않고 PNG 를 줄인 바이트. 해석할 수 없거나 줄지 않으면 None."""
+    try:
+        chunks = _read_chunks(data)
+    except (PngError, struct.error):
+        return None
+    if chunks[0][0] != b"IHDR" or len(chunks[0][1]) != 13:
+        return None
+    has_srgb = any(ctype == b"sRGB" for ctype, _ in chunks)
+
+    out, idat, idat_at = [], [], None
+    for ctype, body in chunks:
+        if ctype in _DROP_CHUNKS:
+            continue
+        if ctype == b"iCCP":
+            if has_srgb:
+                continue
+            profile = _iccp_profile(body)
+            if profile is not None and is_srgb_profile(profile):
+                out.append((b"sRGB", b"\x00"))
+                continue
+        if ctype == b"IDAT":
+            if idat_at is None:
+                idat_at = len(out)
+                out.append(None)
+            idat.append(body)
+            continue
+        out.append((ctype, body))
+    if idat_at is None:
+        return None
+
+    original = b"".join(idat)
+    try:
+        raw = zlib.decompress(original)
+    except zlib.error:
+        return None
+    candidates = [raw]
+    if filters and NUMPY_OK:
+        candidates += _filter_candidates(raw, chunks[0][1])
+    best = min((_deflate(c) for c in candidates), key=len)
+    out[idat_at] = (b"IDAT", best if len(best) < len(original) else original)
+
+    result = PNG_SIGNATURE + b"".join(_chunk(ctype, body) for ctype, body in out)
+    return result if len(result) < len(data) else None
+
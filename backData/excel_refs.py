@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel 셀 참조/수식 도우미 (정밀 슬리머 공용)
+- A1 형식 셀/범위 참조 파싱과 출력, sqref(공백으로 구분된 다중 범위) 처리
+- 겹치거나 이어지는 사각형 범위를 구간 병합으로 합치기
+- 수식 안의 상대 참조를 기준 셀 대비 오프셋으로 바꾸고(relativize), 다른 기준 셀에서 다시 쓰기(render)
+"""
+import re
+from collections import defaultdict
+
+MAX_ROW = 1048576
+MAX_COL = 16384
+
+_CELL_RE = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+
+# 수식 토큰: 문자열 리터럴 / 따옴표 시트 이름 / 구조적 참조 / 행·열 전체 범위 / 셀 참조
+_FORMULA_TOKEN_RE = re.compile(
+    r'(?P<str>"(?:[^"]|"")*")'
+    r"|(?P<sheet>'(?:[^']|'')*'!)"
+    r"|(?P<bracket>\[)"
+    r"|(?P<span>(?<![\w.$])(?:\$?[A-Za-z]{1,3}:\$?[A-Za-z]{1,3}|\$?\d+:\$?\d+)(?![\w.(!]))"
+    r"|(?<![\w.$])(?P<cabs>\$?)(?P<col>[A-Za-z]{1,3})(?P<rabs>\$?)(?P<row>\d+)(?![\w.(!])"
+)
+
+
+def col_to_index(letters: str) -> int:
+    n = 0
+    for ch in letters.upper():
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def index_to_col(n: int) -> str:
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def parse_cell(ref: str) -> tuple[int, int] | None:
+    """"B3" → (3, 2). 해석할 수 없으면 None."""
+    m = _CELL_RE.match(ref)
+    if not m:
+        return None
+    return int(m.group(2)), col_to_index(m.group(1))
+
+
+def parse_range(text: str) -> tuple[int, int, int, int] | None:
+    """"A1:C5" 또는 "B2" → (r1, c1, r2, c2). 해석할 수 없으면 None."""
+    a, _, b = text.partition(":")
+    p1 = parse_cell(a)
+    p2 = parse_cell(b) if b else p1
+    if p1 is None or p2 is None:
+        return None
+    return min(p1[0], p2[0]), min(p1[1], p2[1]), max(p1[0], p2[0]), max(p1[1], p2[1])
+
+
+def format_range(rect: tuple[int, int, int, int]) -> str:
+    r1, c1, r2, c2 = rect
+    head = f"{index_to_col(c1)}{r1}"
+    return head if (r1, c1) == (r2, c2) else f"{head}:{index_to_col(c2)}{r2}"
+
+
+def parse_sqref(sqref: str) -> list[tuple[int, int, int, int]] | None:
+    """공백으로 구분된 다중 범위. 하나라도 해석할 수 없으면 None."""
+    rects = []
+    for part in sqref.split():
+        rect = parse_range(part)
+        if rect is None:
+            return None
+        rects.append(rect)
+    return rects or None
+
+
+def format_sqref(rects) -> str:
+    return " ".join(format_range(r) for r in rects)
+
+
+def merge_ranges(rects) -> list[tuple[int, int, int, int]]:
+    """범위 목록을 같은 영역을 덮는 더 적은 수의 범위로 합친다.
+
+    같은 열 구간을 가진 범위끼리 행 구간을 병합하고, 같은 행 구간끼리 열 구간을 병합하는 과정을
+    더 이상 줄지 않을 때까지 반복한다.
+    """
+    current = set(rects)
+    while True:
+        before = len(current)
+        for axis in (0, 1):
+            bands = defaultdict(list)
+            for r1, c1, r2, c2 in current:
+                if axis == 0:
+                    bands[(c1, c2)].append((r1, r2))
+                else:
+                    bands[(r1, r2)].append((c1, c2))
+            merged = set()
+            for (k1, k2), spans in bands.items():
+                spans.sort()
+                lo, hi = spans[0]
+                for a, b in spans[1:]:
+                    if a <= hi + 1:
+                        hi = max(hi, b)
+                        continue
+                    merged.add((lo, k1, hi, k2) if axis == 0 else (k1, lo, k2, hi))
+                    lo, hi = a, b
+                merged.add((lo, k1, hi, k2) if axis == 0 else (k1, lo, k2, hi))
+            current = merged
+        if len(current) == before:
+            return sorted(current)
+
+
+def ranges_overlap(a, b) -> bool:
+    """두 범위 목록이 한 칸이라도 겹치는지 여부."""
+    for r1, c1, r2, c2 in a:
+        for s1, d1, s2, d2 in b:
+            if r1 <= s2 and s1 <= r2 and c1 <= d2 and d1 <= c2:
+                return True
+    return False
+
+
+def bounding_box(rects) -> tuple[int, int, int, int]:
+    return (min(r[0] for r in rects), min(r[1] for r in rects),
+            max(r[2] for r in rects), max(r[3] for r in rects))
+
+
+def relativize(formula: str, row: int, col: int) -> tuple | None:
+    """수식을 기준 셀(row, col) 대비 상대 토큰으로 바꾼다.
+
+    상대 참조는 오프셋, 절대 참조($)는 그대로 저장한다. 구조적 참조나 상대 행/열 전체 범위처럼
+    안전하게 옮길 수 없는 형태가 있으면 None 을 반환한다.
+    """
+    tokens = []
+    pos = 0
+    for m in _FORMULA_TOKEN_RE.finditer(formula):
+        if m.group("bracket"):
+            return None
+        if m.group("span"):
+            if m.group("span").count("$") < 2:
+                return None
+            continue
+        if m.group("col") is None:
+            continue
+        ci = col_to_index(m.group("col"))
+        ri = int(m.group("row"))
+        if ci > MAX_COL or ri < 1 or ri > MAX_ROW:
+            continue  # 셀 참조가 아닌 이름(예: 열 범위를 넘는 글자)
+        tokens.append(formula[pos:m.start()])
+        c_abs, r_abs = bool(m.group("cabs")), bool(m.group("rabs"))
+        tokens.append((c_abs, ci if c_abs else ci - col, r_abs, ri if r_abs else ri - row))
+        pos = m.end()
+    tokens.append(formula[pos:])
+    return tuple(tokens)
+
+
+def has_relative(tokens: tuple) -> bool:
+    return any(isinstance(t, tuple) and not (t[0] and t[2]) for t in tokens)
+
+
+def render(tokens: tuple, row: int, col: int) -> str | None:
+    """relativize 결과를 기준 셀(row, col)에서 다시 수식 문자열로 만든다. 범위를 벗어나면 None."""
+    out = []
+    for t in tokens:
+        if not isinstance(t, tuple):
+            out.append(t)
+            continue
+        c_abs, c, r_abs, r = t
+        ci = c if c_abs else col + c
+        ri = r if r_abs else row + r
+        if not (1 <= ci <= MAX_COL and 1 <= ri <= MAX_ROW):
+            return None
+        out.append(f"{'$' if c_abs else ''}{index_to_col(ci)}{'$' if r_abs else ''}{ri}")
+    return "".join(out)
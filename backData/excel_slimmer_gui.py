@@ -200,7 +200,7 @@ def update_rels_targets_for_media(unpacked_dir: Path, rename_map: dict[str, str]
                         rel.set("Target", tgt.replace(old_name, new_name))
                         dirty = True
             if dirty:
-                tree.write(str(rels), encoding="utf-8", xml_declaration=True, pretty_print=True)
+                tree.write(str(rels), encoding="utf-8", xml_declaration=True)
                 changed += 1
         except Exception:
             pass
@@ -240,7 +240,7 @@ def update_content_types_for_renamed(unpacked_dir: Path, rename_map: dict[str, s
                     ov.set("PartName", part.replace(old_name, new_name))
                     dirty = True
         if dirty:
-            tree.write(str(ct_path), encoding="utf-8", xml_declaration=True, pretty_print=True)
+            tree.write(str(ct_path), encoding="utf-8", xml_declaration=True)
             return 1
     except Exception:
         return 0
@@ -8,11 +8,22 @@ Excel Slimmer — Precision Plus
 - XML 정리(안전): calcChain, printerSettings, 썸네일, docProps/custom.xml (옵션 customXml) 제거
 - 진행률: 전체/개별 퍼센트, 완료 후 진행률/현재 파일만 초기화(로그 유지)
 """
+import io
+import os
+import re
+import copy
+import posixpath
+import time
 import sys
+import bisect
+import hashlib
 import threading
 import shutil
 import tempfile
 import zipfile
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait as futures_wait
+from dataclasses import dataclass, fields
 from pathlib import Path
 import traceback
 
@@ -28,6 +39,19 @@ try:
 except Exception:
     LXML_OK = False
 
+from excel_xml_stream import (
+    NS_MAIN, NS_REL, NS_PKG_REL, NS_CT, TAG_SHEETDATA, XML_DECLARATION, serialize, iter_units, stream_rewrite, commit_rewrites,
+    iter_sheet_parts,
+)
+from excel_refs import (
+    MAX_ROW, MAX_COL, parse_cell, parse_sqref, format_range, format_sqref, merge_ranges, ranges_overlap,
+    bounding_box, relativize, has_relative, render,
+)
+from excel_vba_compact import compact_vba_project
+from excel_image_codecs import NUMPY_OK, ROUTE_JPEG, ROUTE_PALETTE, classify_image, encode_png
+from excel_jpeg_lossless import jpeg_source_info, optimize_jpeg_lossless
+from excel_png_lossless import optimize_png_lossless
+
 try:
     import tkinter as tk
     from tkinter import ttk, filedialog, messagebox, scrolledtext
@@ -40,8 +64,26 @@ JPEG_QUALITY_AGGRESSIVE = 70
 PNG_OPTIMIZE = True
 RECOMPRESS_ZIP_LEVEL = 9
 MAX_IMAGE_DIM_AGGRESSIVE = (1600, 1600)  # 공격 모드 리사이즈 기준
+MINIFY_MAX_WORKERS = min(8, os.cpu_count() or 1)  # XML 축소 병렬 작업 수
+SHARED_FORMULA_MIN_RUN = 4  # 공유 수식으로 바꿀 최소 연속 행 수
+EMBED_MAX_DEPTH = 3  # 포함된 패키지 안의 패키지를 따라 들어갈 최대 깊이
+EMBED_TIME_LIMIT_SEC = 120  # 포함된 패키지 최적화 전체 시간 제한
+EMBED_MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))  # 포함된 패키지 작업 프로세스 수
 # --------------------------
 
+_TAG_ROW = f"{{{NS_MAIN}}}row"
+_TAG_C = f"{{{NS_MAIN}}}c"
+_TAG_V = f"{{{NS_MAIN}}}v"
+_TAG_SI = f"{{{NS_MAIN}}}si"
+_TAG_COLS = f"{{{NS_MAIN}}}cols"
+_TAG_COL = f"{{{NS_MAIN}}}col"
+
+_NS_X14AC = "http://schemas.microsoft.com/office/spreadsheetml/2009/9/ac"
+# 생략해도 Excel 이 다시 계산하는 선택 속성 (요소 태그 → 속성 목록)
+MINIFY_OPTIONAL_ATTRS = {
+    _TAG_ROW: ("spans", f"{{{_NS_X14AC}}}dyDescent"),
+}
+
 def ui_log(widget, msg):
     if widget is None:
         return
@@ -160,6 +202,9 @@ def convert_png_to_jpg_with_rename_and_resize(p: Path, quality: int, max_dim: tu
                 return None
             im = ImageOps.exif_transpose(im)
             im.thumbnail(max_dim, Image.LANCZOS)
+            if NUMPY_OK and classify_image(im).route != ROUTE_JPEG:
+                # 스크린샷/도표처럼 JPEG 로 바꾸면 번지는 이미지는 PNG 로 남긴다.
+                return None
             rgb = im.convert("RGB")
             new_name = p.stem + ".jpg"
             tmp_jpeg = p.with_name(new_name + ".tmp")
@@ -177,8 +222,8 @@ def convert_png_to_jpg_with_rename_and_resize(p: Path, quality: int, max_dim: tu
     except Exception:
         return None
 
-def update_rels_targets_for_media(unpacked_dir: Path, rename_map: dict[str, str]) -> int:
-    base = unpacked_dir / "xl"
+def update_rels_targets_for_media(unpacked_dir: Path, rename_map: dict[str, str], part_root: str = "xl") -> int:
+    base = unpacked_dir / part_root
     changed = 0
     for rels in base.rglob("_rels/*.rels"):
         try:
@@ -193,14 +238,14 @@ def update_rels_targets_for_media(unpacked_dir: Path, rename_map: dict[str, str]
                         rel.set("Target", tgt.replace(old_name, new_name))
                         dirty = True
             if dirty:
-                tree.write(str(rels), encoding="utf-8", xml_declaration=True, pretty_print=True)
+                tree.write(str(rels), encoding="utf-8", xml_declaration=True)
                 changed += 1
         except Exception:
             pass
     return changed
 
-def update_vml_imagedata_sources(unpacked_dir: Path, rename_map: dict[str, str]) -> int:
-    drawings = (unpacked_dir / "xl" / "drawings")
+def update_vml_imagedata_sources(unpacked_dir: Path, rename_map: dict[str, str], part_root: str = "xl") -> int:
+    drawings = (unpacked_dir / part_root / "drawings")
     if not drawings.exists():
         return 0
     changed = 0
@@ -209,7 +254,7 @@ def update_vml_imagedata_sources(unpacked_dir: Path, rename_map: dict[str, str])
             s = vml.read_text(encoding="utf-8", errors="ignore")
             s_new = s
             for old_name, new_name in rename_map.items():
-                s_new = s_new.replace(f"/xl/media/{old_name}", f"/xl/media/{new_name}")
+                s_new = s_new.replace(f"/{part_root}/media/{old_name}", f"/{part_root}/media/{new_name}")
             if s_new != s:
                 vml.write_text(s_new, encoding="utf-8")
                 changed += 1
@@ -217,7 +262,7 @@ def update_vml_imagedata_sources(unpacked_dir: Path, rename_map: dict[str, str])
             pass
     return changed
 
-def update_content_types_for_renamed(unpacked_dir: Path, rename_map: dict[str, str]) -> int:
+def update_content_types_for_renamed(unpacked_dir: Path, rename_map: dict[str, str], part_root: str = "xl") -> int:
     ct_path = unpacked_dir / "[Content_Types].xml"
     if not ct_path.exists():
         return 0
@@ -229,27 +274,57 @@ def update_content_types_for_renamed(unpacked_dir: Path, rename_map: dict[str, s
         for ov in root.findall(".//{*}Override"):
             part = ov.get("PartName") or ""
             for old_name, new_name in rename_map.items():
-                if part.endswith("/xl/media/" + old_name):
+                if part.endswith(f"/{part_root}/media/" + old_name):
                     ov.set("PartName", part.replace(old_name, new_name))
                     dirty = True
         if dirty:
-            tree.write(str(ct_path), encoding="utf-8", xml_declaration=True, pretty_print=True)
+            tree.write(str(ct_path), encoding="utf-8", xml_declaration=True)
             return 1
     except Exception:
         return 0
     return 0
 
-def recompress_images_with_sync(unpacked_dir: Path, aggressive: bool, logger=None):
+def _optimize_png_part(p: Path) -> tuple[bool, str | None]:
+    """PNG 하나를 색 손실 없이 줄인다 (청크 정리/IDAT 재압축과 Pillow 재인코딩 중 작은 쪽). 스레드 풀에서 실행."""
+    try:
+        data = p.read_bytes()
+        best = optimize_png_lossless(data)
+        with Image.open(p) as im:
+            if NUMPY_OK and im.mode in ("1", "L", "LA", "P", "RGB", "RGBA"):
+                profile = classify_image(im)
+                # 팔레트로 줄이거나 쓰지 않는 알파 채널을 뗄 수 있을 때만 재인코딩이 청크 최적화보다 작아진다.
+                if best is None or (profile.route == ROUTE_PALETTE and im.mode != "P") or (profile.opaque and "A" in im.mode):
+                    encoded = encode_png(im, profile)
+                else:
+                    encoded = None
+            else:
+                out = io.BytesIO()
+                im.save(out, format="PNG", optimize=True)
+                encoded = out.getvalue()
+        if encoded is not None and (best is None or len(encoded) < len(best)):
+            best = encoded
+        if best is None or len(best) >= len(data):
+            return False, None
+        tmp = p.with_suffix(p.suffix + ".tmp")
+        tmp.write_bytes(best)
+        return _replace_if_smaller(p, tmp), None
+    except Exception as e:
+        return False, str(e)
+
+def recompress_images_with_sync(unpacked_dir: Path, aggressive: bool, logger=None, part_root: str = "xl"):
+    """part_root/media 의 이미지를 재압축한다. part_root 는 xl(엑셀), word(워드), ppt(파워포인트) 등 본문 폴더."""
     if not PIL_OK:
         if logger: logger("Pillow가 없어 이미지 최적화를 건너뜁니다. (pip install pillow)")
         return 0, {}
 
-    media_dir = unpacked_dir / "xl" / "media"
+    media_dir = unpacked_dir / part_root / "media"
     if not media_dir.exists():
         return 0, {}
 
     changed = 0
     rename_map: dict[str, str] = {}
+    png_parts: list[Path] = []
+    jpeg_skipped = 0
 
     for p in media_dir.iterdir():
         if not p.is_file():
@@ -258,6 +333,7 @@ def recompress_images_with_sync(unpacked_dir: Path, aggressive: bool, logger=Non
         try:
             if ext in [".jpg", ".jpeg"]:
                 with Image.open(p) as im:
+                    size = im.size
                     if aggressive:
                         im = ImageOps.exif_transpose(im)
                         im.thumbnail(MAX_IMAGE_DIM_AGGRESSIVE, Image.LANCZOS)
@@ -265,41 +341,189 @@ def recompress_images_with_sync(unpacked_dir: Path, aggressive: bool, logger=Non
                             im = im.convert("RGB")
                         tmp = p.with_suffix(p.suffix + ".tmp")
                         im.save(tmp, format="JPEG", quality=JPEG_QUALITY_AGGRESSIVE, optimize=True, progressive=True)
-                        if _replace_if_smaller(p, tmp):
-                            changed += 1
                     else:
                         tmp = p.with_suffix(p.suffix + ".tmp")
-                        im.save(tmp, format="JPEG", quality=JPEG_QUALITY_SAFE, optimize=True, progressive=True)
-                        if _replace_if_smaller(p, tmp):
-                            changed += 1
+                        data = p.read_bytes()
+                        info = jpeg_source_info(data)
+                        if info and info[0] <= JPEG_QUALITY_SAFE and info[1] in ("4:2:0", "gray"):
+                            # 원본 품질이 목표 이하이고 이미 크로마를 줄인 파일은 재인코딩해도 커지거나 화질만 잃는다.
+                            jpeg_skipped += 1
+                            lossless = optimize_jpeg_lossless(data)
+                            if lossless is not None:
+                                tmp.write_bytes(lossless)
+                                if _replace_if_smaller(p, tmp):
+                                    changed += 1
+                            continue
+                        quality = min(info[0], JPEG_QUALITY_SAFE) if info else JPEG_QUALITY_SAFE
+                        im.save(tmp, format="JPEG", quality=quality, optimize=True, progressive=True)
+                    # 리사이즈하지 않았으면 무손실 최적화(마커/허프만 테이블만 다시 씀)가 더 작을 때 그쪽을 쓴다.
+                    lossless = optimize_jpeg_lossless(p.read_bytes(), target=tmp.stat().st_size) if im.size in (size, size[::-1]) else None
+                    if lossless is not None and len(lossless) <= tmp.stat().st_size:
+                        tmp.write_bytes(lossless)
+                        if logger: logger(f"JPEG 무손실 최적화: {p.name}")
+                    if _replace_if_smaller(p, tmp):
+                        changed += 1
             elif ext == ".png":
+                new_name = None
                 if aggressive:
                     new_name = convert_png_to_jpg_with_rename_and_resize(p, quality=JPEG_QUALITY_AGGRESSIVE, max_dim=MAX_IMAGE_DIM_AGGRESSIVE)
                     if new_name:
                         rename_map[p.name] = new_name
                         changed += 1
-                else:
-                    with Image.open(p) as im:
-                        tmp = p.with_suffix(p.suffix + ".tmp")
-                        im.save(tmp, format="PNG", optimize=True)
-                        if _replace_if_smaller(p, tmp):
-                            changed += 1
+                if not new_name:
+                    png_parts.append(p)
             else:
                 continue
         except Exception as e:
             if logger: logger(f"이미지 처리 건너뜀: {p.name} ({e})")
 
+    # PNG 는 zlib 압축이 GIL 을 놓으므로 스레드 풀로 병렬 처리
+    if png_parts:
+        with ThreadPoolExecutor(max_workers=MINIFY_MAX_WORKERS) as ex:
+            results = list(ex.map(_optimize_png_part, png_parts))
+        for p, (ok, err) in zip(png_parts, results):
+            if ok:
+                changed += 1
+            elif err and logger:
+                logger(f"이미지 처리 건너뜀: {p.name} ({err})")
+
     if rename_map:
-        c1 = update_rels_targets_for_media(unpacked_dir, rename_map)
-        c2 = update_vml_imagedata_sources(unpacked_dir, rename_map)
-        c3 = update_content_types_for_renamed(unpacked_dir, rename_map)
+        c1 = update_rels_targets_for_media(unpacked_dir, rename_map, part_root)
+        c2 = update_vml_imagedata_sources(unpacked_dir, rename_map, part_root)
+        c3 = update_content_types_for_renamed(unpacked_dir, rename_map, part_root)
         if logger:
             logger(f"[정밀 동기화] .rels: {c1}개, VML: {c2}개, Content_Types: {c3}개 갱신")
 
+    if jpeg_skipped and logger:
+        logger(f"JPEG 재인코딩 건너뜀: {jpeg_skipped}개 (원본 품질이 {JPEG_QUALITY_SAFE} 이하, 무손실 최적화만 적용)")
     if changed and logger:
         logger(f"이미지 최적화 완료: {changed}개 (리사이즈/변환/재압축 포함)")
     return changed, rename_map
 
+# ---- 포함된 OPC 패키지(xlsx/docx/pptx) 재귀 최적화 ----
+_OPC_PART_ROOTS = ("xl", "word", "ppt")
+
+def _embedded_package_files(unpacked_dir: Path) -> list[Path]:
+    """embeddings 폴더에서 [Content_Types].xml 을 가진 ZIP(OPC 패키지) 파일을 찾는다."""
+    found = []
+    for root in _OPC_PART_ROOTS:
+        d = unpacked_dir / root / "embeddings"
+        if not d.exists():
+            continue
+        for p in sorted(d.iterdir()):
+            try:
+                if p.is_file() and zipfile.is_zipfile(p):
+                    with zipfile.ZipFile(p) as zf:
+                        if "[Content_Types].xml" in zf.namelist():
+                            found.append(p)
+            except Exception:
+                continue
+    return found
+
+def _optimize_package_file(path: Path, aggressive: bool, depth: int, deadline: float, out_path: Path | None = None) -> tuple[int, list[str]]:
+    """패키지 하나를 풀어 이미지 재압축(+하위 포함 패키지) 후 다시 묶고, 더 작으면 out_path(기본: 제자리)에 쓴다.
+
+    반환값: (줄어든 바이트 수, 로그 목록). 마감 시각을 넘기면 원본을 그대로 둔다.
+    """
+    logs: list[str] = []
+    with tempfile.TemporaryDirectory() as td:
+        unpacked = unzip_to_temp(path, Path(td))
+        for root in _OPC_PART_ROOTS:
+            if (unpacked / root).is_dir():
+                recompress_images_with_sync(unpacked, aggressive=aggressive, logger=logs.append, part_root=root)
+        if depth < EMBED_MAX_DEPTH:
+            for inner in _embedded_package_files(unpacked):
+                if time.time() > deadline:
+                    break
+                saved, inner_logs = _optimize_package_file(inner, aggressive, depth + 1, deadline)
+                logs.extend(f"[{inner.name}] {line}" for line in inner_logs)
+        if time.time() > deadline:
+            logs.append("시간 제한을 넘겨 원본을 유지합니다.")
+            return 0, logs
+        out_tmp = Path(td) / ("repacked" + path.suffix)
+        rezip_max_compress(unpacked, out_tmp)
+        before, after = path.stat().st_size, out_tmp.stat().st_size
+        if after >= before:
+            return 0, logs
+        shutil.copyfile(out_tmp, out_path or path)
+        return before - after, logs
+
+def _embedded_package_worker(path: str, aggressive: bool, deadline: float, out_path: str) -> tuple[int, list[str]]:
+    """작업 프로세스 진입점 (피클 가능한 인자만 받는다). 결과는 out_path 에만 쓰고 원본은 건드리지 않는다."""
+    return _optimize_package_file(Path(path), aggressive, 1, deadline, Path(out_path))
+
+def _terminate_pool(pool: ProcessPoolExecutor) -> None:
+    """기다리지 않고 풀을 닫고, 아직 돌고 있는 작업 프로세스를 종료한다."""
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for proc in processes:
+        try:
+            proc.terminate()
+        except Exception:
+            pass
+
+def optimize_embedded_packages(unpacked_dir: Path, aggressive: bool, logger=None) -> int:
+    """xl/embeddings 등에 포함된 xlsx/docx/pptx 패키지를 작업 프로세스에서 재귀적으로 최적화한다.
+
+    - 포함 깊이는 EMBED_MAX_DEPTH, 전체 시간은 EMBED_TIME_LIMIT_SEC 로 제한
+    - 최적화 결과가 더 작을 때만 같은 경로에 덮어쓰므로 .rels/[Content_Types].xml 은 바뀌지 않는다.
+    반환값: 줄어든 바이트 수
+    """
+    packages = _embedded_package_files(unpacked_dir)
+    if not packages:
+        return 0
+
+    deadline = time.time() + EMBED_TIME_LIMIT_SEC
+    results = []
+    # 작업 결과는 임시 폴더에 쓰고, 마감 전에 끝난 것만 원래 자리로 옮긴다.
+    # (시간을 넘긴 작업이 나중에 압축을 다시 묶는 중인 폴더에 쓰는 일이 없도록)
+    with tempfile.TemporaryDirectory(prefix="embed_out_") as out_dir:
+        outputs = {p: Path(out_dir) / f"{i}{p.suffix}" for i, p in enumerate(packages)}
+        try:
+            pool = ProcessPoolExecutor(max_workers=min(len(packages), EMBED_MAX_WORKERS))
+        except Exception:
+            pool = None
+        if pool is None:
+            # 프로세스를 만들 수 없는 환경에서는 현재 프로세스에서 순서대로 처리한다.
+            for p in packages:
+                if time.time() > deadline:
+                    if logger: logger(f"포함된 패키지 최적화: 시간 제한을 넘겨 원본 유지: {p.name}")
+                    continue
+                try:
+                    results.append((p, _embedded_package_worker(str(p), aggressive, deadline, str(outputs[p]))))
+                except Exception as e:
+                    if logger: logger(f"포함된 패키지 처리 건너뜀: {p.name} ({e})")
+        else:
+            futures = {pool.submit(_embedded_package_worker, str(p), aggressive, deadline, str(outputs[p])): p for p in packages}
+            done, not_done = futures_wait(futures, timeout=max(0.0, deadline - time.time()))
+            if not_done:
+                # 마감 시각이 지나면 남은 작업을 기다리지 않고 종료한다 (원본 유지).
+                _terminate_pool(pool)
+                if logger:
+                    names = ", ".join(sorted(futures[f].name for f in not_done))
+                    logger(f"포함된 패키지 최적화: 시간 제한을 넘겨 원본 유지: {names}")
+            else:
+                pool.shutdown(wait=True)
+            for fut in done:
+                p = futures[fut]
+                try:
+                    results.append((p, fut.result()))
+                except Exception as e:
+                    if logger: logger(f"포함된 패키지 처리 건너뜀: {p.name} ({e})")
+        for p, (n, _) in results:
+            if n:
+                shutil.copyfile(outputs[p], p)
+
+    saved = 0
+    for p, (n, logs) in results:
+        if logger:
+            for line in logs:
+                logger(f"[{p.name}] {line}")
+        if n:
+            saved += n
+            if logger: logger(f"포함된 패키지 최적화: {p.name} {(n/1024):.1f} KB 절감")
+    return saved
+
 def remove_calc_chain(unpacked_dir: Path, logger=None) -> int:
     p = unpacked_dir / "xl" / "calcChain.xml"
     if p.exists():
@@ -359,6 +583,1667 @@ def remove_customxml(unpacked_dir: Path, logger=None) -> int:
         if logger: logger(f"customXml 제거 실패: {e}")
         return 0
 
+# ---- 피벗 캐시 레코드 제거 ----
+_REL_TYPE_PIVOT_RECORDS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/pivotCacheRecords"
+
+def _rels_path_for(part: Path) -> Path:
+    return part.parent / "_rels" / (part.name + ".rels")
+
+def _rel_target_path(unpacked_dir: Path, part: Path, target: str) -> Path:
+    """관계 Target 을 압축 해제 폴더 기준 실제 경로로 바꾼다 (상대/절대 경로 모두 처리)."""
+    if target.startswith("/"):
+        return unpacked_dir / posixpath.normpath(target.lstrip("/"))
+    base = part.parent.relative_to(unpacked_dir).as_posix()
+    return unpacked_dir / posixpath.normpath(posixpath.join(base, target))
+
+def _part_name(unpacked_dir: Path, path: Path) -> str:
+    return "/" + path.relative_to(unpacked_dir).as_posix()
+
+def strip_pivot_cache_records(unpacked_dir: Path, logger=None) -> int:
+    """피벗 캐시 정의에 saveData="0", refreshOnLoad="1" 을 설정하고 캐시 레코드 파트를 제거한다.
+
+    - 정의의 r:id, 정의 .rels 의 pivotCacheRecords 관계, [Content_Types].xml Override 를 함께 정리
+    - 피벗 표시는 정의에 남은 항목으로 유지되고, 데이터는 파일을 열 때 원본에서 다시 읽는다.
+    반환값: 제거된 레코드 파트 크기 합계(바이트)
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 피벗 캐시 정리를 건너뜁니다. (pip install lxml)")
+        return 0
+    piv_dir = unpacked_dir / "xl" / "pivotCache"
+    if not piv_dir.exists():
+        return 0
+
+    try:
+        jobs, records, defs = [], [], 0
+        for definition in sorted(piv_dir.glob("pivotCacheDefinition*.xml")):
+            rels_path = _rels_path_for(definition)
+            rels_tree = etree.parse(str(rels_path)) if rels_path.exists() else None
+            dropped_ids = set()
+            if rels_tree is not None:
+                for rel in list(rels_tree.getroot()):
+                    if rel.get("Type") == _REL_TYPE_PIVOT_RECORDS:
+                        target = _rel_target_path(unpacked_dir, definition, rel.get("Target", ""))
+                        if target.exists():
+                            records.append(target)
+                        dropped_ids.add(rel.get("Id"))
+                        rels_tree.getroot().remove(rel)
+
+            def _set_attrs(root, dropped_ids=dropped_ids):
+                root.set("saveData", "0")
+                root.set("refreshOnLoad", "1")
+                if root.get(f"{{{NS_REL}}}id") in dropped_ids:
+                    del root.attrib[f"{{{NS_REL}}}id"]
+
+            jobs.append((definition, lambda dst, d=definition, f=_set_attrs: stream_rewrite(d, containers=(), on_start=f, dst=dst)))
+            if dropped_ids:
+                jobs.append((rels_path, lambda dst, t=rels_tree: t.write(str(dst), encoding="UTF-8", xml_declaration=True, standalone=True)))
+            defs += 1
+        if not defs:
+            return 0
+
+        ct_path = unpacked_dir / "[Content_Types].xml"
+        if records and ct_path.exists():
+            ct_tree = etree.parse(str(ct_path))
+            names = {_part_name(unpacked_dir, p) for p in records}
+            for ov in list(ct_tree.getroot().iterchildren(f"{{{NS_CT}}}Override")):
+                if ov.get("PartName") in names:
+                    ct_tree.getroot().remove(ov)
+            jobs.append((ct_path, lambda dst: ct_tree.write(str(dst), encoding="UTF-8", xml_declaration=True, standalone=True)))
+        commit_rewrites(jobs)
+
+        reclaimed = 0
+        for p in records:
+            reclaimed += p.stat().st_size
+            p.unlink(missing_ok=True)
+            _rels_path_for(p).unlink(missing_ok=True)
+        if logger:
+            logger(f"피벗 캐시 정리: 정의 {defs}개 saveData=0/refreshOnLoad=1, 레코드 {len(records)}개 제거 "
+                   f"({(reclaimed/1024/1024):.2f} MB, 압축 전)")
+        return reclaimed
+    except Exception as e:
+        if logger: logger(f"피벗 캐시 정리 실패: {e}")
+        return 0
+
+# ---- 외부 링크 캐시 제거 ----
+_TAG_EXTERNAL_BOOK = f"{{{NS_MAIN}}}externalBook"
+_TAG_SHEET_DATA_SET = f"{{{NS_MAIN}}}sheetDataSet"
+_EXTERNAL_LINK_CONTAINERS = (_TAG_EXTERNAL_BOOK, _TAG_SHEET_DATA_SET, TAG_SHEETDATA)
+
+def strip_external_link_cache(unpacked_dir: Path, logger=None) -> int:
+    """외부 링크 파트의 캐시된 셀 값(sheetDataSet/sheetData/row)을 비운다.
+
+    연결 정의(externalBook r:id, sheetNames, definedNames)와 시트별 sheetData 요소는 그대로 두고
+    row 만 제거하므로, Excel 은 링크를 업데이트할 때 원본에서 값을 다시 읽는다.
+    반환값: 줄어든 바이트 수(압축 전)
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 외부 링크 캐시 제거를 건너뜁니다. (pip install lxml)")
+        return 0
+    links_dir = unpacked_dir / "xl" / "externalLinks"
+    if not links_dir.exists():
+        return 0
+
+    total = 0
+    for link in sorted(links_dir.glob("externalLink*.xml")):
+        try:
+            before = link.stat().st_size
+            stream_rewrite(link, lambda unit: None if unit.tag == _TAG_ROW else unit,
+                           containers=_EXTERNAL_LINK_CONTAINERS)
+            saved = before - link.stat().st_size
+        except Exception as e:
+            if logger: logger(f"외부 링크 캐시 제거 실패: {link.name} ({e})")
+            continue
+        if saved > 0:
+            total += saved
+            if logger: logger(f"외부 링크 캐시 제거: {link.name} {(saved/1024):.1f} KB 절감 (압축 전)")
+    return total
+
+# ---- 차트 캐시 제거 ----
+NS_CHART = "http://schemas.openxmlformats.org/drawingml/2006/chart"
+_CHART_CACHE_TAGS = {f"{{{NS_CHART}}}{n}" for n in ("numCache", "strCache", "multiLvlStrCache")}
+_TAG_CHART_F = f"{{{NS_CHART}}}f"
+_CHART_PART_RE = re.compile(r"^chart\d+\.xml$")
+_CHART_SHARED_PART_RE = re.compile(r"^(style|colors)\d+\.xml$")
+
+def _strip_chart_unit(unit):
+    for cache in [el for el in unit.iter() if el.tag in _CHART_CACHE_TAGS]:
+        ref = cache.getparent()
+        f = ref.find(_TAG_CHART_F)
+        # 다른 통합 문서를 가리키는 참조([1]Sheet1!A1 형식)는 캐시가 유일한 값이므로 유지
+        if f is None or "[" in (f.text or ""):
+            continue
+        ref.remove(cache)
+    return unit
+
+def _strip_chart_part(path: Path) -> int:
+    before = path.stat().st_size
+    tmp = path.with_name(path.name + ".tmp2")
+    try:
+        stream_rewrite(path, _strip_chart_unit, containers=(), dst=tmp)
+        after = tmp.stat().st_size
+        if after >= before:
+            return 0
+        tmp.replace(path)
+        return before - after
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def _dedupe_chart_shared_parts(unpacked_dir: Path, charts_dir: Path) -> tuple[int, int]:
+    """내용이 같은 차트 스타일/색 파트(style*.xml, colors*.xml)를 하나로 합친다.
+
+    반환값: (제거된 파트 수, 줄어든 바이트 수)
+    """
+    keep_by_hash, dup_map = {}, {}
+    for part in sorted(charts_dir.glob("*.xml")):
+        if not _CHART_SHARED_PART_RE.match(part.name):
+            continue
+        digest = hashlib.blake2b(part.read_bytes(), digest_size=16).digest()
+        keep = keep_by_hash.setdefault(digest, part)
+        if keep is not part:
+            dup_map[part] = keep
+    if not dup_map:
+        return 0, 0
+
+    jobs = []
+    for chart in sorted(charts_dir.glob("*.xml")):
+        rels_path = _rels_path_for(chart)
+        if not rels_path.exists():
+            continue
+        tree = etree.parse(str(rels_path))
+        changed = False
+        for rel in tree.getroot().iterchildren(f"{{{NS_PKG_REL}}}Relationship"):
+            if rel.get("TargetMode") == "External":
+                continue
+            keep = dup_map.get(_rel_target_path(unpacked_dir, chart, rel.get("Target", "")))
+            if keep is not None:
+                rel.set("Target", posixpath.relpath(keep.relative_to(unpacked_dir).as_posix(),
+                                                    chart.parent.relative_to(unpacked_dir).as_posix()))
+                changed = True
+        if changed:
+            jobs.append((rels_path, lambda dst, t=tree: t.write(str(dst), encoding="UTF-8", xml_declaration=True, standalone=True)))
+
+    ct_path = unpacked_dir / "[Content_Types].xml"
+    if ct_path.exists():
+        ct_tree = etree.parse(str(ct_path))
+        names = {_part_name(unpacked_dir, p) for p in dup_map}
+        for ov in list(ct_tree.getroot().iterchildren(f"{{{NS_CT}}}Override")):
+            if ov.get("PartName") in names:
+                ct_tree.getroot().remove(ov)
+        jobs.append((ct_path, lambda dst: ct_tree.write(str(dst), encoding="UTF-8", xml_declaration=True, standalone=True)))
+    commit_rewrites(jobs)
+
+    reclaimed = 0
+    for dup in dup_map:
+        reclaimed += dup.stat().st_size
+        dup.unlink(missing_ok=True)
+        _rels_path_for(dup).unlink(missing_ok=True)
+    return len(dup_map), reclaimed
+
+def strip_chart_caches(unpacked_dir: Path, logger=None) -> int:
+    """차트 파트(xl/charts/chart*.xml)의 numCache/strCache 값 사본을 제거하고, 같은 스타일/색 파트를 합친다.
+
+    - 캐시는 c:f 가 같은 통합 문서의 셀을 가리킬 때만 제거한다 (Excel 이 열 때 셀에서 다시 읽음).
+    - 차트 파트끼리는 독립적이므로 스레드 풀로 병렬 처리한다.
+    반환값: 줄어든 바이트 수(압축 전)
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 차트 캐시 제거를 건너뜁니다. (pip install lxml)")
+        return 0
+    charts_dir = unpacked_dir / "xl" / "charts"
+    if not charts_dir.exists():
+        return 0
+    charts = [p for p in sorted(charts_dir.glob("*.xml")) if _CHART_PART_RE.match(p.name)]
+
+    def _job(path):
+        try:
+            return path, _strip_chart_part(path), None
+        except Exception as e:
+            return path, 0, e
+
+    saved = 0
+    touched = 0
+    with ThreadPoolExecutor(max_workers=MINIFY_MAX_WORKERS) as pool:
+        for path, n, err in pool.map(_job, charts):
+            if err is not None:
+                if logger: logger(f"차트 캐시 제거 실패: {path.name} ({err})")
+                continue
+            if n:
+                saved += n
+                touched += 1
+
+    try:
+        removed, reclaimed = _dedupe_chart_shared_parts(unpacked_dir, charts_dir)
+    except Exception as e:
+        if logger: logger(f"차트 스타일/색 파트 병합 실패: {e}")
+        removed, reclaimed = 0, 0
+    saved += reclaimed
+
+    if logger and (touched or removed):
+        logger(f"차트 캐시 제거: 차트 {touched}/{len(charts)}개, 중복 스타일/색 파트 {removed}개 제거, "
+               f"{(saved/1024):.1f} KB 절감 (압축 전)")
+    return saved
+
+# ---- 보이지 않는 도형(크기 0/숨김/중복) 정리 ----
+NS_XDR = "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"
+_XDR_ANCHOR_TAGS = {f"{{{NS_XDR}}}{n}" for n in ("twoCellAnchor", "oneCellAnchor", "absoluteAnchor")}
+_XDR_PLACEMENT_TAGS = {f"{{{NS_XDR}}}{n}" for n in ("from", "to", "pos", "ext", "clientData")}
+_TAG_XDR_FROM = f"{{{NS_XDR}}}from"
+_TAG_XDR_TO = f"{{{NS_XDR}}}to"
+_TAG_XDR_EXT = f"{{{NS_XDR}}}ext"
+_TAG_XDR_CNVPR = f"{{{NS_XDR}}}cNvPr"
+_TAG_COMPAT_EXT = "{http://schemas.microsoft.com/office/drawing/2010/main}compatExt"
+_VML_SHAPE_RE = re.compile(r"<v:shape\b[^>]*?(?:/>|>.*?</v:shape>)", re.S)
+_VML_SHAPE_ID_RE = re.compile(r'\bid="_x0000_s(\d+)"')
+_VML_SIZE_RE = re.compile(r"\b(width|height)\s*:\s*(-?[\d.]+)")
+_SHAPE_ID_RE = re.compile(rb'\bshapeId="(\d+)"')
+
+def _anchor_kind(unit) -> str | None:
+    """크기 0 / 숨김이면 "zero" / "hidden", 아니면 None."""
+    frm, to = unit.find(_TAG_XDR_FROM), unit.find(_TAG_XDR_TO)
+    if frm is not None and to is not None:
+        if [(c.tag, c.text) for c in frm] == [(c.tag, c.text) for c in to]:
+            return "zero"
+    else:
+        ext = unit.find(_TAG_XDR_EXT)
+        if ext is not None and ext.get("cx") == "0" and ext.get("cy") == "0":
+            return "zero"
+    for obj in unit:
+        if not isinstance(obj.tag, str) or obj.tag in _XDR_PLACEMENT_TAGS:
+            continue
+        nv = obj[0] if len(obj) else None
+        cnv = nv.find(_TAG_XDR_CNVPR) if nv is not None else None
+        if cnv is not None and _is_true(cnv.get("hidden")):
+            return "hidden"
+    return None
+
+def _anchor_key(unit, declared: dict) -> bytes:
+    """id/name 을 뺀 요소 내용 해시 (같은 위치에 같은 내용으로 겹친 복사본 판별용)."""
+    dup = copy.deepcopy(unit)
+    for cnv in dup.iter(_TAG_XDR_CNVPR):
+        cnv.attrib.pop("id", None)
+        cnv.attrib.pop("name", None)
+    return hashlib.blake2b(serialize(dup, declared), digest_size=16).digest()
+
+def _rel_ids(unit) -> set:
+    return {v for el in unit.iter() if isinstance(el.tag, str)
+            for k, v in el.attrib.items() if k.startswith(f"{{{NS_REL}}}")}
+
+def _purge_drawing(drawing: Path) -> tuple[dict, set, set]:
+    """도형 파트 하나를 정리한다. 반환값: (종류별 제거 수, 더 이상 쓰이지 않는 rId, 제거된 VML spid)"""
+    counts = {"zero": 0, "hidden": 0, "dup": 0}
+    seen, kept_ids, dropped_ids, spids = set(), set(), set(), set()
+    declared = {None: NS_XDR}
+
+    def _transform(unit):
+        if unit.tag not in _XDR_ANCHOR_TAGS:
+            # mc:AlternateContent 로 감싼 양식 컨트롤 등은 VML 과 짝을 이루므로 그대로 둔다.
+            kept_ids.update(_rel_ids(unit))
+            return unit
+        kind = _anchor_kind(unit)
+        if kind is None:
+            key = _anchor_key(unit, declared)
+            if key in seen:
+                kind = "dup"
+            seen.add(key)
+        if kind is None:
+            kept_ids.update(_rel_ids(unit))
+            return unit
+        counts[kind] += 1
+        dropped_ids.update(_rel_ids(unit))
+        spids.update(el.get("spid") for el in unit.iter(_TAG_COMPAT_EXT) if el.get("spid"))
+        return None
+
+    stream_rewrite(drawing, _transform, containers=())
+    return counts, dropped_ids - kept_ids, spids
+
+def _purge_vml(vml: Path, spids: set, used_shape_ids: set) -> int:
+    """크기 0 인 VML 도형과 삭제된 DrawingML 도형의 짝(spid)을 제거한다.
+
+    메모(Note)와 시트의 controls/oleObjects 가 shapeId 로 가리키는 도형은 유지한다.
+    """
+    text = vml.read_text(encoding="utf-8", errors="ignore")
+    removed = [0]
+
+    def _sub(m):
+        shape = m.group(0)
+        mid = _VML_SHAPE_ID_RE.search(shape)
+        num = int(mid.group(1)) if mid else None
+        if 'ObjectType="Note"' in shape or num in used_shape_ids:
+            return shape
+        head = shape[:shape.find(">")]
+        sizes = {k: float(v) for k, v in _VML_SIZE_RE.findall(head) if v not in ("-", ".")}
+        zero = sizes.get("width") == 0 and sizes.get("height") == 0
+        if zero or (mid and f"_x0000_s{num}" in spids):
+            removed[0] += 1
+            return ""
+        return shape
+
+    new = _VML_SHAPE_RE.sub(_sub, text)
+    if removed[0]:
+        vml.write_text(new, encoding="utf-8")
+    return removed[0]
+
+def _remove_orphan_parts(unpacked_dir: Path, candidates) -> tuple[int, int]:
+    """어떤 .rels 에서도 더 이상 가리키지 않는 후보 파트를 지운다 (지운 파트의 .rels 대상도 다시 검사).
+
+    반환값: (삭제된 파트 수, 바이트 수)
+    """
+    pending = {p for p in candidates if p.exists()}
+    removed, reclaimed = [], 0
+    while pending:
+        referenced = set()
+        for rels in unpacked_dir.rglob("*.rels"):
+            src_dir = rels.parent.parent.relative_to(unpacked_dir).as_posix()
+            for rel in etree.parse(str(rels)).getroot().iterchildren(f"{{{NS_PKG_REL}}}Relationship"):
+                target = rel.get("Target", "")
+                if rel.get("TargetMode") == "External" or not target:
+                    continue
+                path = target.lstrip("/") if target.startswith("/") else posixpath.join(src_dir, target)
+                referenced.add(unpacked_dir / posixpath.normpath(path))
+        orphans = [p for p in pending if p not in referenced]
+        if not orphans:
+            break
+        pending = set()
+        for p in orphans:
+            rels = _rels_path_for(p)
+            if rels.exists():
+                for rel in etree.parse(str(rels)).getroot().iterchildren(f"{{{NS_PKG_REL}}}Relationship"):
+                    if rel.get("TargetMode") != "External" and rel.get("Target"):
+                        t = _rel_target_path(unpacked_dir, p, rel.get("Target"))
+                        if t.exists():
+                            pending.add(t)
+                rels.unlink()
+            reclaimed += p.stat().st_size
+            p.unlink()
+            removed.append(p)
+        pending -= set(removed)
+
+    ct_path = unpacked_dir / "[Content_Types].xml"
+    if removed and ct_path.exists():
+        ct_tree = etree.parse(str(ct_path))
+        names = {_part_name(unpacked_dir, p) for p in removed}
+        for ov in list(ct_tree.getroot().iterchildren(f"{{{NS_CT}}}Override")):
+            if ov.get("PartName") in names:
+                ct_tree.getroot().remove(ov)
+        ct_tree.write(str(ct_path), encoding="UTF-8", xml_declaration=True, standalone=True)
+    return len(removed), reclaimed
+
+def purge_drawing_objects(unpacked_dir: Path, logger=None) -> int:
+    """도형 파트(xl/drawings/drawing*.xml)에서 보이지 않는 개체를 제거한다.
+
+    - 크기가 0 인 개체(from == to, 또는 ext 0x0), cNvPr hidden="1" 로 숨겨진 개체,
+      같은 위치에 같은 내용으로 겹쳐 있는 복사본을 스트리밍으로 제거
+    - 제거된 개체만 쓰던 관계와, 더 이상 참조되지 않는 이미지/차트 파트를 함께 삭제
+    - VML(vmlDrawing*.vml)의 크기 0 도형과 삭제된 개체의 짝도 제거 (메모/컨트롤은 유지)
+    반환값: 제거된 개체 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 도형 정리를 건너뜁니다. (pip install lxml)")
+        return 0
+    drawings_dir = unpacked_dir / "xl" / "drawings"
+    if not drawings_dir.exists():
+        return 0
+
+    # 도형 파트 → 시트 이름(로그용), 시트가 shapeId 로 참조하는 VML 도형 번호
+    owner, used_shape_ids = {}, set()
+    sheet_parts = list(iter_sheet_parts(unpacked_dir))
+    chartsheets = unpacked_dir / "xl" / "chartsheets"
+    if chartsheets.exists():
+        sheet_parts += sorted(chartsheets.glob("*.xml"))
+    for sheet in sheet_parts:
+        used_shape_ids.update(int(n) for n in _SHAPE_ID_RE.findall(sheet.read_bytes()))
+        rels = _rels_path_for(sheet)
+        if rels.exists():
+            for rel in etree.parse(str(rels)).getroot().iterchildren(f"{{{NS_PKG_REL}}}Relationship"):
+                if rel.get("TargetMode") != "External":
+                    owner.setdefault(_rel_target_path(unpacked_dir, sheet, rel.get("Target", "")), sheet.name)
+
+    total = 0
+    spids = set()
+    orphan_candidates = []
+    for drawing in sorted(drawings_dir.glob("drawing*.xml")):
+        try:
+            counts, unused_ids, dropped_spids = _purge_drawing(drawing)
+        except Exception as e:
+            if logger: logger(f"도형 정리 실패: {drawing.name} ({e})")
+            continue
+        spids |= dropped_spids
+        n = sum(counts.values())
+        if not n:
+            continue
+        total += n
+        rels_path = _rels_path_for(drawing)
+        if unused_ids and rels_path.exists():
+            tree = etree.parse(str(rels_path))
+            for rel in list(tree.getroot()):
+                if rel.get("Id") in unused_ids:
+                    if rel.get("TargetMode") != "External":
+                        orphan_candidates.append(_rel_target_path(unpacked_dir, drawing, rel.get("Target", "")))
+                    tree.getroot().remove(rel)
+            tree.write(str(rels_path), encoding="UTF-8", xml_declaration=True, standalone=True)
+        if logger:
+            logger(f"도형 정리: {owner.get(drawing, drawing.name)} 크기 0 {counts['zero']}개, "
+                   f"숨김 {counts['hidden']}개, 겹친 복사본 {counts['dup']}개 제거")
+
+    for vml in sorted(drawings_dir.glob("vmlDrawing*.vml")):
+        try:
+            n = _purge_vml(vml, spids, used_shape_ids)
+        except Exception as e:
+            if logger: logger(f"VML 도형 정리 실패: {vml.name} ({e})")
+            continue
+        if n:
+            total += n
+            if logger: logger(f"도형 정리: {owner.get(vml, vml.name)} VML 도형 {n}개 제거")
+
+    if orphan_candidates:
+        try:
+            parts, reclaimed = _remove_orphan_parts(unpacked_dir, orphan_candidates)
+            if logger and parts:
+                logger(f"도형 정리: 더 이상 쓰이지 않는 파트 {parts}개 삭제 ({(reclaimed/1024):.1f} KB)")
+        except Exception as e:
+            if logger: logger(f"사용되지 않는 파트 정리 실패: {e}")
+    return total
+
+# ---- 시트 관계(하이퍼링크) 중복 정리 ----
+_REL_TYPE_HYPERLINK = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+
+def _remap_rel_attrs(unit, id_map: dict):
+    if unit.tag == _TAG_ROW:
+        return unit
+    for el in unit.iter():
+        if not isinstance(el.tag, str):
+            continue
+        for k, v in el.attrib.items():
+            if k.startswith(f"{{{NS_REL}}}") and v in id_map:
+                el.set(k, id_map[v])
+    return unit
+
+def dedupe_sheet_relationships(unpacked_dir: Path, logger=None) -> int:
+    """시트 .rels 에서 같은 외부 주소를 가리키는 하이퍼링크 관계를 하나로 합치고 Id 를 rId1.. 로 다시 매긴다.
+
+    시트의 r:id 참조(hyperlinks, drawing, legacyDrawing 등)는 스트리밍 패스로 함께 바꾸고,
+    시트와 .rels 는 둘 다 성공한 경우에만 교체한다. 반환값: 제거된 관계 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 시트 관계 정리를 건너뜁니다. (pip install lxml)")
+        return 0
+
+    total = 0
+    for sheet in iter_sheet_parts(unpacked_dir):
+        rels_path = _rels_path_for(sheet)
+        if not rels_path.exists():
+            continue
+        try:
+            tree = etree.parse(str(rels_path))
+            rels = list(tree.getroot().iterchildren(f"{{{NS_PKG_REL}}}Relationship"))
+            id_map, first_by_target, removed = {}, {}, 0
+            for rel in rels:
+                old = rel.get("Id")
+                if rel.get("Type") == _REL_TYPE_HYPERLINK and rel.get("TargetMode") == "External":
+                    key = rel.get("Target", "")
+                    if key in first_by_target:
+                        id_map[old] = first_by_target[key]
+                        tree.getroot().remove(rel)
+                        removed += 1
+                        continue
+                new = f"rId{len(id_map) - removed + 1}"
+                id_map[old] = new
+                rel.set("Id", new)
+                if rel.get("Type") == _REL_TYPE_HYPERLINK and rel.get("TargetMode") == "External":
+                    first_by_target[rel.get("Target", "")] = new
+            if not removed and all(k == v for k, v in id_map.items()):
+                continue
+
+            commit_rewrites([
+                (sheet, lambda dst, src=sheet, m=id_map: stream_rewrite(src, lambda u: _remap_rel_attrs(u, m), dst=dst)),
+                (rels_path, lambda dst, t=tree: t.write(str(dst), encoding="UTF-8", xml_declaration=True, standalone=True)),
+            ])
+        except Exception as e:
+            if logger: logger(f"시트 관계 정리 실패: {sheet.name} ({e})")
+            continue
+        total += removed
+        if logger and removed:
+            logger(f"시트 관계 정리: {sheet.name} 관계 {len(rels)}개 → {len(rels) - removed}개 (중복 하이퍼링크 {removed}개 병합)")
+    return total
+
+# ---- VBA 프로젝트 정리 ----
+_VBA_SIGNATURE_PARTS = ("vbaProjectSignature.bin", "vbaProjectSignatureAgile.bin", "vbaProjectSignatureV3.bin")
+
+def compact_vba_part(unpacked_dir: Path, logger=None) -> int:
+    """xl/vbaProject.bin 을 p-code/캐시 스트림과 빈 섹터 없이 다시 쓴다.
+
+    모듈 소스는 그대로 두고 Office 가 열 때 다시 컴파일하게 한다.
+    디지털 서명 파트가 있으면 서명이 깨지지 않도록 건너뛴다.
+    반환값: 줄어든 바이트 수
+    """
+    vba = unpacked_dir / "xl" / "vbaProject.bin"
+    if not vba.exists():
+        return 0
+    if any((unpacked_dir / "xl" / name).exists() for name in _VBA_SIGNATURE_PARTS):
+        if logger: logger("VBA 프로젝트에 디지털 서명이 있어 정리를 건너뜁니다.")
+        return 0
+    try:
+        data = vba.read_bytes()
+        new = compact_vba_project(data)
+    except Exception as e:
+        if logger: logger(f"VBA 프로젝트 정리 실패: {e}")
+        return 0
+    if new is None:
+        return 0
+    vba.write_bytes(new)
+    saved = len(data) - len(new)
+    if logger: logger(f"VBA 프로젝트 정리: {(saved/1024):.1f} KB 절감 ({len(data):,} → {len(new):,} 바이트)")
+    return saved
+
+# ---- 인라인 문자열 → 공유 문자열 변환 ----
+_TAG_IS = f"{{{NS_MAIN}}}is"
+_TAG_SST = f"{{{NS_MAIN}}}sst"
+_TAG_F = f"{{{NS_MAIN}}}f"
+_REL_TYPE_SST = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+_CT_SST = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+
+def _sst_relationship(unpacked_dir: Path):
+    """workbook.xml.rels 의 sharedStrings 관계. 반환값: (rels 트리, 관계 요소 또는 None). rels 가 없으면 (None, None)"""
+    rels_path = unpacked_dir / "xl" / "_rels" / "workbook.xml.rels"
+    if not rels_path.exists():
+        return None, None
+    tree = etree.parse(str(rels_path))
+    for rel in tree.getroot().iterchildren(f"{{{NS_PKG_REL}}}Relationship"):
+        if rel.get("Type") == _REL_TYPE_SST:
+            return tree, rel
+    return tree, None
+
+def _si_key(si, declared: dict) -> bytes:
+    return hashlib.blake2b(serialize(si, declared), digest_size=16).digest()
+
+def convert_inline_strings(unpacked_dir: Path, logger=None) -> int:
+    """t="inlineStr" 셀을 공유 문자열(t="s") 참조로 바꾼다.
+
+    - 기존 sharedStrings.xml 항목을 해시로 색인해 같은 문자열은 기존 인덱스를 재사용하고,
+      새 문자열은 모든 시트에 걸쳐 한 번만 표 끝에 추가한다.
+    - sharedStrings.xml 이 없으면 새로 만들고 [Content_Types].xml / workbook.xml.rels 항목을 추가한다.
+    반환값: 변환된 셀 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 인라인 문자열 변환을 건너뜁니다. (pip install lxml)")
+        return 0
+
+    try:
+        sheets = []
+        for sheet in iter_sheet_parts(unpacked_dir):
+            with open(sheet, "rb") as fh:
+                if any(b't="inlineStr"' in chunk for chunk in iter(lambda: fh.read(1 << 20), b"")):
+                    sheets.append(sheet)
+        if not sheets:
+            return 0
+
+        rels_tree, sst_rel = _sst_relationship(unpacked_dir)
+        if rels_tree is None:
+            return 0
+        sst_path = unpacked_dir / "xl" / "sharedStrings.xml"
+        if sst_rel is not None and sst_rel.get("Target", "").lstrip("/") not in ("sharedStrings.xml", "xl/sharedStrings.xml"):
+            if logger: logger("인라인 문자열 변환 건너뜀: 공유 문자열 파트 위치가 기본값(xl/sharedStrings.xml)이 아닙니다.")
+            return 0
+        if (sst_rel is None) != (not sst_path.exists()):
+            if logger: logger("인라인 문자열 변환 건너뜀: sharedStrings.xml 과 관계 정보가 일치하지 않습니다.")
+            return 0
+
+        # 1) 기존 공유 문자열 색인
+        main_ns = {None: NS_MAIN}
+        index: dict[bytes, int] = {}
+        existing = 0
+        if sst_path.exists():
+            for si in iter_units(sst_path, containers=()):
+                if si.tag != _TAG_SI:
+                    continue
+                index.setdefault(_si_key(si, main_ns), existing)
+                existing += 1
+
+        # 2) 시트마다 인라인 문자열을 공유 문자열 인덱스로 교체 (새 문자열은 added 에 모음)
+        added = []
+        converted = [0]
+
+        def _convert(unit):
+            if unit.tag != _TAG_ROW:
+                return unit
+            for c in unit.iterchildren(_TAG_C):
+                if c.get("t") != "inlineStr":
+                    continue
+                is_el = c.find(_TAG_IS)
+                if is_el is None or c.find(_TAG_F) is not None:
+                    continue
+                si = etree.Element(_TAG_SI, nsmap=main_ns)
+                for ch in list(is_el):
+                    si.append(ch)
+                key = _si_key(si, main_ns)
+                idx = index.get(key)
+                if idx is None:
+                    idx = index[key] = existing + len(added)
+                    added.append(si)
+                v = etree.Element(_TAG_V)
+                v.text = str(idx)
+                is_el.addprevious(v)
+                c.remove(is_el)
+                c.set("t", "s")
+                converted[0] += 1
+            return unit
+
+        def _write_sst(dst: Path):
+            unique = existing + len(added)
+            if sst_path.exists():
+                def _set_counts(root):
+                    if root.get("count") is not None:
+                        root.set("count", str(int(root.get("count")) + converted[0]))
+                    root.set("uniqueCount", str(unique))
+
+                stream_rewrite(sst_path, containers=(), on_start=_set_counts,
+                               flush=lambda root: added if root.tag == _TAG_SST else None, dst=dst)
+            else:
+                with open(dst, "wb") as fh:
+                    fh.write(XML_DECLARATION)
+                    fh.write(f'<sst xmlns="{NS_MAIN}" count="{converted[0]}" uniqueCount="{unique}">'.encode())
+                    for si in added:
+                        fh.write(serialize(si, main_ns))
+                    fh.write(b"</sst>")
+
+        jobs = [(sheet, lambda dst, sheet=sheet: stream_rewrite(sheet, _convert, dst=dst)) for sheet in sheets]
+        # 시트를 모두 쓴 뒤에야 새 문자열 목록이 확정되므로 sharedStrings.xml 은 마지막에 쓴다.
+        jobs.append((sst_path, _write_sst))
+        if sst_rel is None:
+            rels_path = unpacked_dir / "xl" / "_rels" / "workbook.xml.rels"
+            ids = {rel.get("Id") for rel in rels_tree.getroot()}
+            n = 1
+            while f"rId{n}" in ids:
+                n += 1
+            rel = etree.SubElement(rels_tree.getroot(), f"{{{NS_PKG_REL}}}Relationship")
+            rel.set("Id", f"rId{n}")
+            rel.set("Type", _REL_TYPE_SST)
+            rel.set("Target", "sharedStrings.xml")
+            jobs.append((rels_path, lambda dst: rels_tree.write(str(dst), encoding="UTF-8", xml_declaration=True, standalone=True)))
+
+            ct_path = unpacked_dir / "[Content_Types].xml"
+            ct_tree = etree.parse(str(ct_path))
+            if not any(ov.get("PartName") == "/xl/sharedStrings.xml" for ov in ct_tree.getroot().iterchildren(f"{{{NS_CT}}}Override")):
+                ov = etree.SubElement(ct_tree.getroot(), f"{{{NS_CT}}}Override")
+                ov.set("PartName", "/xl/sharedStrings.xml")
+                ov.set("ContentType", _CT_SST)
+                jobs.append((ct_path, lambda dst: ct_tree.write(str(dst), encoding="UTF-8", xml_declaration=True, standalone=True)))
+        commit_rewrites(jobs)
+
+        if logger:
+            logger(f"인라인 문자열 변환: 셀 {converted[0]}개 → 공유 문자열 참조 (새 항목 {len(added)}개 추가)")
+        return converted[0]
+    except Exception as e:
+        if logger: logger(f"인라인 문자열 변환 실패: {e}")
+        return 0
+
+# ---- 공유 문자열(sharedStrings) 정리 ----
+def compact_shared_strings(unpacked_dir: Path, logger=None) -> int:
+    """사용되지 않거나 중복된 <si> 항목을 제거하고 시트의 t="s" 인덱스를 다시 매긴다.
+
+    1) 모든 시트를 스트리밍으로 읽어 참조되는 인덱스를 비트맵으로 수집
+    2) sharedStrings.xml 을 스트리밍으로 읽어 중복 제거 후 새 인덱스 매핑 생성
+    3) sharedStrings.xml 과 시트를 스트리밍으로 다시 쓰기
+    반환값: 제거된 항목 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 공유 문자열 정리를 건너뜁니다. (pip install lxml)")
+        return 0
+    sst_path = unpacked_dir / "xl" / "sharedStrings.xml"
+    if not sst_path.exists():
+        return 0
+
+    try:
+        used = bytearray()
+        ref_count = 0
+        sheets_with_refs = []
+        for sheet in iter_sheet_parts(unpacked_dir):
+            has_refs = False
+            for unit in iter_units(sheet):
+                if unit.tag != _TAG_ROW:
+                    continue
+                for c in unit.iterchildren(_TAG_C):
+                    if c.get("t") != "s":
+                        continue
+                    v = c.find(_TAG_V)
+                    if v is None or not (v.text or "").strip().isdigit():
+                        if logger: logger(f"공유 문자열 정리 건너뜀: {sheet.name} 에 해석할 수 없는 인덱스가 있습니다.")
+                        return 0
+                    idx = int(v.text)
+                    if idx >= len(used):
+                        used.extend(b"\0" * (idx + 1 - len(used)))
+                    used[idx] = 1
+                    ref_count += 1
+                    has_refs = True
+            if has_refs:
+                sheets_with_refs.append(sheet)
+
+        remap = array("l")
+        seen: dict[bytes, int] = {}
+        total = 0
+        for si in iter_units(sst_path, containers=()):
+            if si.tag != _TAG_SI:
+                continue
+            if total < len(used) and used[total]:
+                key = hashlib.blake2b(
+                    etree.tostring(si, encoding="UTF-8", xml_declaration=False, with_tail=False),
+                    digest_size=16,
+                ).digest()
+                remap.append(seen.setdefault(key, len(seen)))
+            else:
+                remap.append(-1)
+            total += 1
+
+        if len(used) > total:
+            if logger: logger("공유 문자열 정리 건너뜀: 시트가 존재하지 않는 문자열 인덱스를 참조합니다.")
+            return 0
+        unique = len(seen)
+        if unique == total:
+            return 0
+        del seen
+
+        state = {"i": 0}
+
+        def _keep_first(si):
+            if si.tag != _TAG_SI:
+                return si
+            i = state["i"]
+            state["i"] += 1
+            new = remap[i]
+            if new < 0 or new != state.setdefault("next", 0):
+                return None
+            state["next"] = new + 1
+            return si
+
+        def _set_counts(root):
+            root.set("count", str(ref_count))
+            root.set("uniqueCount", str(unique))
+
+        def _remap_row(row):
+            if row.tag == _TAG_ROW:
+                for c in row.iterchildren(_TAG_C):
+                    if c.get("t") == "s":
+                        v = c.find(_TAG_V)
+                        v.text = str(remap[int(v.text)])
+            return row
+
+        jobs = [(sst_path, lambda dst: stream_rewrite(sst_path, _keep_first, containers=(), on_start=_set_counts, dst=dst))]
+        for sheet in sheets_with_refs:
+            jobs.append((sheet, lambda dst, sheet=sheet: stream_rewrite(sheet, _remap_row, dst=dst)))
+        commit_rewrites(jobs)
+
+        removed = total - unique
+        if logger:
+            logger(f"공유 문자열 정리: {total}개 → {unique}개 (미사용/중복 {removed}개 제거)")
+        return removed
+    except Exception as e:
+        if logger: logger(f"공유 문자열 정리 실패: {e}")
+        return 0
+
+# ---- 스타일(styles.xml) 정리 ----
+def _canon_key(elem) -> tuple:
+    """속성 순서와 무관하게 같은 정의면 같은 값이 되는 비교용 키."""
+    return (
+        elem.tag,
+        tuple(sorted(elem.attrib.items())),
+        (elem.text or "").strip(),
+        tuple(_canon_key(ch) for ch in elem if isinstance(ch.tag, str)),
+    )
+
+def _xf_key(xf, overrides: dict) -> tuple:
+    attrs = dict(xf.attrib)
+    attrs.update(overrides)
+    return (tuple(sorted(attrs.items())), tuple(_canon_key(ch) for ch in xf if isinstance(ch.tag, str)))
+
+def _table_style_names(unpacked_dir: Path) -> set[str]:
+    names = set()
+    tables = unpacked_dir / "xl" / "tables"
+    if tables.exists():
+        for p in tables.glob("*.xml"):
+            for el in etree.parse(str(p)).iter():
+                for attr in ("headerRowCellStyle", "dataCellStyle", "totalsRowCellStyle"):
+                    if el.get(attr):
+                        names.add(el.get(attr))
+    return names
+
+def compact_styles(unpacked_dir: Path, logger=None) -> int:
+    """중복/미사용 스타일 레코드를 정리하고 시트의 스타일 인덱스를 다시 매긴다.
+
+    - fonts/fills/borders: 같은 정의는 하나로 합치고 참조되지 않는 항목 제거
+    - cellXfs: 같은 정의는 하나로 합치고 시트에서 쓰이지 않는 항목 제거
+    - cellStyles: 기본(Normal)·사용 중·표에서 이름으로 참조하는 스타일만 유지
+    - 시트의 c/@s, row/@s, col/@style 은 스트리밍 패스로 재매핑
+    반환값: 제거된 cellXfs 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 스타일 정리를 건너뜁니다. (pip install lxml)")
+        return 0
+    styles_path = unpacked_dir / "xl" / "styles.xml"
+    if not styles_path.exists():
+        return 0
+
+    try:
+        tree = etree.parse(str(styles_path))
+        root = tree.getroot()
+
+        def _section(name):
+            sec = root.find(f"{{{NS_MAIN}}}{name}")
+            return sec, ([el for el in sec if isinstance(el.tag, str)] if sec is not None else [])
+
+        fonts_sec, fonts = _section("fonts")
+        fills_sec, fills = _section("fills")
+        borders_sec, borders = _section("borders")
+        style_xfs_sec, style_xfs = _section("cellStyleXfs")
+        cell_xfs_sec, cell_xfs = _section("cellXfs")
+        cell_styles_sec, cell_styles = _section("cellStyles")
+        if not cell_xfs:
+            return 0
+        before = {
+            "cellXfs": len(cell_xfs), "cellStyleXfs": len(style_xfs), "cellStyles": len(cell_styles),
+            "fonts": len(fonts), "fills": len(fills), "borders": len(borders),
+        }
+
+        # 1) 시트에서 실제로 쓰이는 cellXfs 인덱스 수집 (스트리밍)
+        used = bytearray(len(cell_xfs))
+        used[0] = 1
+        styled_sheets = []
+        for sheet in iter_sheet_parts(unpacked_dir):
+            has_style = False
+            for unit in iter_units(sheet):
+                if unit.tag == _TAG_ROW:
+                    cands = [unit.get("s")] + [c.get("s") for c in unit.iterchildren(_TAG_C)]
+                elif unit.tag == _TAG_COLS:
+                    cands = [col.get("style") for col in unit.iterchildren(_TAG_COL)]
+                else:
+                    continue
+                for s in cands:
+                    if s is None:
+                        continue
+                    idx = int(s)
+                    if idx >= len(cell_xfs):
+                        if logger: logger(f"스타일 정리 건너뜀: {sheet.name} 에 존재하지 않는 스타일 인덱스({idx})가 있습니다.")
+                        return 0
+                    used[idx] = 1
+                    has_style = True
+            if has_style:
+                styled_sheets.append(sheet)
+
+        # 2) fonts/fills/borders 중복 정의 → 처음 나온 인덱스로 별칭
+        def _aliases(items):
+            first, alias = {}, []
+            for i, el in enumerate(items):
+                alias.append(first.setdefault(_canon_key(el), i))
+            return alias
+
+        font_alias, fill_alias, border_alias = _aliases(fonts), _aliases(fills), _aliases(borders)
+
+        def _ref_overrides(xf):
+            out = {}
+            for attr, alias in (("fontId", font_alias), ("fillId", fill_alias), ("borderId", border_alias)):
+                v = xf.get(attr)
+                if v is not None and int(v) < len(alias):
+                    out[attr] = str(alias[int(v)])
+            return out
+
+        # 3) 유지할 cellStyles / cellStyleXfs 결정
+        used_style_xf = {0}
+        for i, xf in enumerate(cell_xfs):
+            if used[i] and xf.get("xfId") is not None:
+                used_style_xf.add(int(xf.get("xfId")))
+        table_names = _table_style_names(unpacked_dir)
+        kept_styles = [
+            cs for cs in cell_styles
+            if cs.get("builtinId") == "0"
+            or int(cs.get("xfId", "0")) in used_style_xf
+            or cs.get("name") in table_names
+        ]
+        for cs in kept_styles:
+            used_style_xf.add(int(cs.get("xfId", "0")))
+        style_xf_map = {}
+        for i in range(len(style_xfs)):
+            if i in used_style_xf:
+                style_xf_map[i] = len(style_xf_map)
+
+        # 4) cellXfs 중복 제거 + 재번호 (0번은 항상 유지)
+        xf_map = array("l", [-1]) * len(cell_xfs)
+        kept_xfs = []
+        seen: dict[tuple, int] = {}
+        for i, xf in enumerate(cell_xfs):
+            if not used[i]:
+                continue
+            overrides = _ref_overrides(xf)
+            if xf.get("xfId") is not None:
+                overrides["xfId"] = str(style_xf_map.get(int(xf.get("xfId")), 0))
+            key = _xf_key(xf, overrides)
+            if key not in seen:
+                seen[key] = len(kept_xfs)
+                for k, v in overrides.items():
+                    xf.set(k, v)
+                kept_xfs.append(xf)
+            xf_map[i] = seen[key]
+
+        kept_style_xfs = [xf for i, xf in enumerate(style_xfs) if i in style_xf_map]
+        for xf in kept_style_xfs:
+            for k, v in _ref_overrides(xf).items():
+                xf.set(k, v)
+        for cs in kept_styles:
+            cs.set("xfId", str(style_xf_map[int(cs.get("xfId", "0"))]))
+
+        # 5) 참조되는 fonts/fills/borders 만 남기고 재번호
+        def _renumber(items, attr, reserved):
+            keep = set(range(min(reserved, len(items))))
+            for xf in kept_xfs + kept_style_xfs:
+                if xf.get(attr) is not None:
+                    keep.add(int(xf.get(attr)))
+            mapping = {old: new for new, old in enumerate(sorted(keep))}
+            for xf in kept_xfs + kept_style_xfs:
+                if xf.get(attr) is not None:
+                    xf.set(attr, str(mapping[int(xf.get(attr))]))
+            return [items[i] for i in sorted(keep)]
+
+        kept_fonts = _renumber(fonts, "fontId", 1)
+        kept_fills = _renumber(fills, "fillId", 2)
+        kept_borders = _renumber(borders, "borderId", 1)
+
+        after = {
+            "cellXfs": len(kept_xfs), "cellStyleXfs": len(kept_style_xfs), "cellStyles": len(kept_styles),
+            "fonts": len(kept_fonts), "fills": len(kept_fills), "borders": len(kept_borders),
+        }
+        if after == before and all(xf_map[i] in (i, -1) for i in range(len(cell_xfs))):
+            return 0
+
+        for sec, items, kept in (
+            (fonts_sec, fonts, kept_fonts), (fills_sec, fills, kept_fills), (borders_sec, borders, kept_borders),
+            (style_xfs_sec, style_xfs, kept_style_xfs), (cell_xfs_sec, cell_xfs, kept_xfs),
+            (cell_styles_sec, cell_styles, kept_styles),
+        ):
+            if sec is None:
+                continue
+            keep_ids = {id(el) for el in kept}
+            for el in items:
+                if id(el) not in keep_ids:
+                    sec.remove(el)
+            # cellXfs 는 중복 제거로 순서가 바뀌지 않으므로 제거만으로 새 인덱스와 일치한다.
+            if sec.get("count") is not None:
+                sec.set("count", str(len(kept)))
+
+        def _remap_styles(unit):
+            if unit.tag == _TAG_ROW:
+                if unit.get("s") is not None:
+                    unit.set("s", str(xf_map[int(unit.get("s"))]))
+                for c in unit.iterchildren(_TAG_C):
+                    if c.get("s") is not None:
+                        c.set("s", str(xf_map[int(c.get("s"))]))
+            elif unit.tag == _TAG_COLS:
+                for col in unit.iterchildren(_TAG_COL):
+                    if col.get("style") is not None:
+                        col.set("style", str(xf_map[int(col.get("style"))]))
+            return unit
+
+        jobs = [(styles_path, lambda dst: tree.write(str(dst), encoding="UTF-8", xml_declaration=True, standalone=True))]
+        for sheet in styled_sheets:
+            jobs.append((sheet, lambda dst, sheet=sheet: stream_rewrite(sheet, _remap_styles, dst=dst)))
+        commit_rewrites(jobs)
+
+        if logger:
+            logger("스타일 정리: " + ", ".join(f"{k} {before[k]}→{after[k]}" for k in before))
+        return before["cellXfs"] - after["cellXfs"]
+    except Exception as e:
+        if logger: logger(f"스타일 정리 실패: {e}")
+        return 0
+
+# ---- 사용 범위(빈 서식 셀/행/열 정의) 정리 ----
+_TAG_SHEET_FORMAT_PR = f"{{{NS_MAIN}}}sheetFormatPr"
+_DIMENSION_RE = re.compile(rb'(<(?:[\w.\-]+:)?dimension\b[^>]*?\bref=")([^"]*)(")')
+# 값이 이 값이면 행의 표시에 영향을 주지 않는 속성
+_ROW_NEUTRAL_VALUES = {
+    "customFormat": ("0", "false"), "customHeight": ("0", "false"), "hidden": ("0", "false"),
+    "outlineLevel": ("0",), "collapsed": ("0", "false"), "thickTop": ("0", "false"),
+    "thickBot": ("0", "false"), "ph": ("0", "false"),
+}
+
+def _is_true(v) -> bool:
+    return v in ("1", "true")
+
+def _merge_col_ranges(cols) -> int:
+    """속성이 같고 이어지는 <col> 범위를 하나로 합친다. 반환값: 합쳐서 없앤 개수"""
+    merged = 0
+    prev, prev_key = None, None
+    for col in list(cols.iterchildren(_TAG_COL)):
+        key = tuple(sorted((k, v) for k, v in col.attrib.items() if k not in ("min", "max")))
+        if prev is not None and key == prev_key and int(prev.get("max")) + 1 == int(col.get("min")):
+            prev.set("max", col.get("max"))
+            cols.remove(col)
+            merged += 1
+            continue
+        prev, prev_key = col, key
+    return merged
+
+def _patch_dimension(src: Path, dst: Path, ref: str) -> None:
+    """시트 앞부분의 <dimension ref> 만 바꾸고 나머지는 바이트 그대로 복사한다."""
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        head = fin.read(1 << 16)
+        fout.write(_DIMENSION_RE.sub(lambda m: m.group(1) + ref.encode() + m.group(3), head, count=1))
+        shutil.copyfileobj(fin, fout, 1 << 20)
+
+def _trim_sheet(sheet: Path) -> tuple[int, int, int, int]:
+    """시트 하나를 정리한다. 반환값: (제거 셀, 제거 행, 정리 전 col 수, 정리 후 col 수)"""
+    col_bounds: list[int] = []   # 각 <col> 의 max (오름차순)
+    col_ranges: list[tuple[int, int, str]] = []
+    st = {"default_ht": None, "prev_row": 0, "shifted": False, "cells": 0, "rows": 0,
+          "cols_before": 0, "bbox": None, "bbox_ok": True}
+
+    def _col_style(ci: int) -> str:
+        i = bisect.bisect_left(col_bounds, ci)
+        if i < len(col_ranges) and col_ranges[i][0] <= ci:
+            return col_ranges[i][2]
+        return "0"
+
+    def _row_is_plain(row) -> bool:
+        custom_fmt = _is_true(row.get("customFormat"))
+        custom_ht = _is_true(row.get("customHeight"))
+        for k, v in row.attrib.items():
+            if k in ("r", "spans") or k in MINIFY_OPTIONAL_ATTRS.get(_TAG_ROW, ()):
+                continue
+            if k == "s" and not custom_fmt:
+                continue
+            if k == "ht" and not custom_ht and st["default_ht"] is not None:
+                try:
+                    if float(v) == st["default_ht"]:
+                        continue
+                except ValueError:
+                    pass
+            if v in _ROW_NEUTRAL_VALUES.get(k, ()):
+                continue
+            return False
+        return True
+
+    def _extend_bbox(r: int, c: int):
+        b = st["bbox"]
+        st["bbox"] = (r, c, r, c) if b is None else (min(b[0], r), min(b[1], c), max(b[2], r), max(b[3], c))
+
+    def _transform(unit):
+        tag = unit.tag
+        if tag == _TAG_SHEET_FORMAT_PR:
+            try:
+                st["default_ht"] = float(unit.get("defaultRowHeight"))
+            except (TypeError, ValueError):
+                pass
+        elif tag == _TAG_COLS:
+            st["cols_before"] += sum(1 for _ in unit.iterchildren(_TAG_COL))
+            _merge_col_ranges(unit)
+            for col in unit.iterchildren(_TAG_COL):
+                col_ranges.append((int(col.get("min")), int(col.get("max")), col.get("style", "0")))
+            col_ranges.sort()
+            col_bounds[:] = [mx for _, mx, _ in col_ranges]
+        elif tag == _TAG_ROW:
+            r = unit.get("r")
+            ri = int(r) if r is not None else st["prev_row"] + 1
+            if r is None and st["shifted"]:
+                # 앞의 행을 지웠으므로 위치로 정해지던 행 번호를 명시한다.
+                unit.set("r", str(ri))
+            st["prev_row"] = ri
+
+            cells = list(unit.iterchildren(_TAG_C))
+            row_default = unit.get("s", "0") if _is_true(unit.get("customFormat")) else None
+            if all(c.get("r") for c in cells):
+                dropped = 0
+                for c in cells:
+                    ci = parse_cell(c.get("r"))[1]
+                    if len(c) == 0 and set(c.attrib) <= {"r", "s"}:
+                        default = row_default if row_default is not None else _col_style(ci)
+                        if c.get("s", "0") == default:
+                            unit.remove(c)
+                            dropped += 1
+                            continue
+                    _extend_bbox(ri, ci)
+                if dropped:
+                    st["cells"] += dropped
+                    unit.attrib.pop("spans", None)
+            else:
+                st["bbox_ok"] = False
+
+            if len(unit) == 0 and _row_is_plain(unit):
+                st["rows"] += 1
+                st["shifted"] = True
+                return None
+        return unit
+
+    tmp = sheet.with_name(sheet.name + ".trim")
+    try:
+        stream_rewrite(sheet, _transform, dst=tmp)
+        if not (st["cells"] or st["rows"] or st["cols_before"] != len(col_ranges)):
+            return 0, 0, st["cols_before"], len(col_ranges)
+        b = st["bbox"]
+        if not st["bbox_ok"]:
+            tmp.replace(sheet)
+        else:
+            _patch_dimension(tmp, sheet, format_range(b) if b is not None else "A1")
+        return st["cells"], st["rows"], st["cols_before"], len(col_ranges)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def trim_used_range(unpacked_dir: Path, logger=None) -> int:
+    """서식만 있고 값이 없는 셀/행과 잘게 나뉜 열 정의를 정리한다.
+
+    - 값·수식·추가 속성이 없고 스타일이 행(customFormat) 또는 열 기본 스타일과 같은 셀 제거
+    - 셀이 없고 높이/서식/숨김 등 표시 속성이 없는 행 제거
+    - 속성이 같고 이어지는 <col> 범위 병합, <dimension> 을 남은 셀 범위로 갱신
+    반환값: 제거된 셀 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 사용 범위 정리를 건너뜁니다. (pip install lxml)")
+        return 0
+
+    total_cells = 0
+    for sheet in iter_sheet_parts(unpacked_dir):
+        try:
+            cells, rows, cols_before, cols_after = _trim_sheet(sheet)
+        except Exception as e:
+            if logger: logger(f"사용 범위 정리 실패: {sheet.name} ({e})")
+            continue
+        if (cells or rows or cols_before != cols_after) and logger:
+            logger(f"사용 범위 정리: {sheet.name} 빈 셀 {cells}개, 빈 행 {rows}개 제거, 열 정의 {cols_before}→{cols_after}")
+        total_cells += cells
+    return total_cells
+
+# ---- 조건부 서식 / 데이터 유효성 조각 통합 ----
+_TAG_CF = f"{{{NS_MAIN}}}conditionalFormatting"
+_TAG_CF_RULE = f"{{{NS_MAIN}}}cfRule"
+_TAG_DVS = f"{{{NS_MAIN}}}dataValidations"
+_TAG_DV = f"{{{NS_MAIN}}}dataValidation"
+_FORMULA_TAGS = {f"{{{NS_MAIN}}}formula", f"{{{NS_MAIN}}}formula1", f"{{{NS_MAIN}}}formula2"}
+# 셀 하나만 보고 판정하는 규칙만 합친다 (색조/데이터 막대/상위 N 등은 범위 전체로 계산되므로 제외)
+_CF_MERGEABLE_TYPES = {
+    "cellIs", "expression", "containsText", "notContainsText", "beginsWith", "endsWith",
+    "containsBlanks", "notContainsBlanks", "containsErrors", "notContainsErrors", "timePeriod",
+}
+
+def _fragment_signature(elem, rules) -> tuple | None:
+    """조각(CF 블록 또는 dataValidation)의 비교용 서명을 만든다. 합칠 수 없으면 None.
+
+    수식의 상대 참조는 첫 범위의 왼쪽 위 셀 기준 오프셋으로 바꿔 비교한다.
+    반환값: (서명, 범위 목록, 규칙별 수식 토큰 목록, 상대 참조 여부)
+    """
+    rects = parse_sqref(elem.get("sqref", ""))
+    if rects is None:
+        return None
+    origin = rects[0][:2]
+    sig, tokens, relative = [], [], False
+    for rule in rules:
+        attrs = tuple(sorted((k, v) for k, v in rule.attrib.items() if k not in ("priority", "sqref")))
+        children, rule_tokens = [], []
+        for ch in rule:
+            if not isinstance(ch.tag, str):
+                continue
+            if ch.tag in _FORMULA_TAGS:
+                toks = relativize(ch.text or "", *origin)
+                if toks is None:
+                    return None
+                relative = relative or has_relative(toks)
+                children.append((ch.tag, toks))
+                rule_tokens.append(toks)
+            else:
+                children.append(_canon_key(ch))
+        sig.append((attrs, tuple(children)))
+        tokens.append(rule_tokens)
+    # 상대 수식의 기준 셀이 "첫 범위의 왼쪽 위"와 "전체 범위의 왼쪽 위" 중 어느 쪽이어도 같도록 한다.
+    if relative and origin != bounding_box(rects)[:2]:
+        return None
+    return tuple(sig), rects, tokens, relative
+
+def _apply_merged(elem, rules, rects, tokens) -> bool:
+    """대표 조각에 합친 범위를 쓰고 수식을 새 기준 셀에서 다시 만든다. 실패하면 False."""
+    row, col = rects[0][:2]
+    rendered = []
+    for rule, rule_tokens in zip(rules, tokens):
+        formulas = [ch for ch in rule if isinstance(ch.tag, str) and ch.tag in _FORMULA_TAGS]
+        for f, toks in zip(formulas, rule_tokens):
+            text = render(toks, row, col)
+            if text is None:
+                return False
+            rendered.append((f, text))
+    for f, text in rendered:
+        f.text = text
+    elem.set("sqref", format_sqref(rects))
+    return True
+
+def _merge_fragments(frags, prio_of=None):
+    """조각 목록을 서명별로 묶고 범위를 병합한다.
+
+    frags: [(요소, 규칙 목록, 합칠 수 있는지)]. prio_of 가 있으면(조건부 서식) 겹치는 다른 조각과의
+    우선순위 순서가 바뀌지 않는 경우에만 합치고, 없으면(데이터 유효성) 다른 조각과 겹치지 않을 때만 합친다.
+    반환값: 출력할 요소 목록(원래 순서 유지)
+    """
+    infos = [_fragment_signature(el, rules) if ok else None for el, rules, ok in frags]
+    groups: dict[tuple, list[int]] = {}
+    for i, info in enumerate(infos):
+        groups.setdefault(info[0] if info is not None else ("#", i), []).append(i)
+    group_of = {i: key for key, members in groups.items() for i in members}
+
+    rects_of = []
+    for (el, _, _), info in zip(frags, infos):
+        rects = info[1] if info is not None else parse_sqref(el.get("sqref", ""))
+        # 범위를 알 수 없는 조각은 시트 전체와 겹친다고 본다.
+        rects_of.append(rects or [(1, 1, MAX_ROW, MAX_COL)])
+    bbox = [bounding_box(r) for r in rects_of]
+
+    merged_rects = {}
+    for key, members in groups.items():
+        if len(members) < 2 or infos[members[0]] is None:
+            continue
+        rects = merge_ranges([r for i in members for r in infos[i][1]])
+        if infos[members[0]][3] and rects[0][:2] != bounding_box(rects)[:2]:
+            continue
+        merged_rects[key] = rects
+    if not merged_rects:
+        return [el for el, _, _ in frags]
+
+    # 합칠 후보 묶음의 조각과, 다른 묶음에 속하면서 겹치는 조각 쌍
+    pairs = []
+    for key in merged_rects:
+        others = [j for j in range(len(frags)) if group_of[j] != key]
+        for i in groups[key]:
+            for j in others:
+                if group_of[j] in merged_rects and j < i:
+                    continue
+                bi, bj = bbox[i], bbox[j]
+                if bi[0] <= bj[2] and bj[0] <= bi[2] and bi[1] <= bj[3] and bj[1] <= bi[3] \
+                        and ranges_overlap(rects_of[i], rects_of[j]):
+                    pairs.append((i, j))
+
+    def _prios(i, merged):
+        rules = frags[i][1]
+        if not merged:
+            return [prio_of(r) for r in rules]
+        members = groups[group_of[i]]
+        return [min(prio_of(frags[j][1][k]) for j in members) for k in range(len(rules))]
+
+    def _order(pi, pj):
+        if not pi or not pj:
+            return 0
+        return -1 if max(pi) < min(pj) else (1 if max(pj) < min(pi) else None)
+
+    changed = True
+    while changed:
+        changed = False
+        for i, j in pairs:
+            gi, gj = group_of[i], group_of[j]
+            if gi not in merged_rects and gj not in merged_rects:
+                continue
+            if prio_of is None:
+                ok = False
+            else:
+                before = _order(_prios(i, False), _prios(j, False))
+                ok = before is not None and before == _order(_prios(i, gi in merged_rects), _prios(j, gj in merged_rects))
+            if not ok:
+                merged_rects.pop(gi, None)
+                merged_rects.pop(gj, None)
+                changed = True
+
+    out, emitted = [], set()
+    for i, (el, rules, _) in enumerate(frags):
+        key = group_of[i]
+        if key not in merged_rects:
+            out.append(el)
+            continue
+        if key in emitted:
+            continue
+        emitted.add(key)
+        new_prios = _prios(i, True) if prio_of is not None else None
+        if not _apply_merged(el, rules, merged_rects[key], infos[i][2]):
+            out.extend(frags[j][0] for j in groups[key])
+            continue
+        if new_prios is not None:
+            for rule, p in zip(rules, new_prios):
+                rule.set("priority", str(p))
+        out.append(el)
+    return out
+
+def _cf_rules(block) -> tuple[list, bool]:
+    """블록의 규칙을 우선순위 순으로 정렬해 돌려주고, 합칠 수 있는 블록인지 함께 알려 준다."""
+    rules = [r for r in block if isinstance(r.tag, str) and r.get("priority") is not None]
+    rules.sort(key=lambda r: int(r.get("priority")))
+    ok = (
+        bool(rules)
+        and not set(block.attrib) - {"sqref"}
+        and len(rules) == sum(1 for r in block if isinstance(r.tag, str))
+        and all(r.tag == _TAG_CF_RULE and r.get("type") in _CF_MERGEABLE_TYPES for r in rules)
+    )
+    return rules, ok
+
+def _count_rules(blocks) -> int:
+    return sum(1 for b in blocks for r in b if isinstance(r.tag, str))
+
+def _consolidate_sheet_cf_dv(sheet: Path) -> tuple[int, int, int, int]:
+    """시트 하나의 CF/DV 조각을 통합한다. 반환값: (CF 규칙 전, 후, DV 전, 후)"""
+    buf = []
+    counts = [0, 0, 0, 0]
+
+    def _emit_cf():
+        frags = [(block, *_cf_rules(block)) for block in buf]
+        out = _merge_fragments(frags, prio_of=lambda r: int(r.get("priority")))
+        counts[0] += _count_rules(buf)
+        counts[1] += _count_rules(out)
+        buf.clear()
+        return out
+
+    def _transform(unit):
+        if unit.tag == _TAG_CF:
+            # 부모에서 떼어 낸 요소는 기본 네임스페이스가 접두사로 바뀌므로 복사본을 보관한다.
+            buf.append(copy.deepcopy(unit))
+            return None
+        pending = _emit_cf() if buf else []
+        if unit.tag == _TAG_DVS:
+            dvs = [dv for dv in unit if isinstance(dv.tag, str)]
+            kept = _merge_fragments([(dv, [dv], dv.tag == _TAG_DV) for dv in dvs])
+            kept_ids = {id(dv) for dv in kept}
+            for dv in dvs:
+                if id(dv) not in kept_ids:
+                    unit.remove(dv)
+            if len(kept) != len(dvs) and unit.get("count") is not None:
+                unit.set("count", str(len(kept)))
+            counts[2] += len(dvs)
+            counts[3] += len(kept)
+        return pending + [unit] if pending else unit
+
+    def _flush(elem):
+        return _emit_cf() if buf else None
+
+    tmp = sheet.with_name(sheet.name + ".cf")
+    try:
+        stream_rewrite(sheet, _transform, flush=_flush, dst=tmp)
+        if counts[0] != counts[1] or counts[2] != counts[3]:
+            tmp.replace(sheet)
+        return tuple(counts)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def consolidate_cf_dv(unpacked_dir: Path, logger=None) -> int:
+    """조건부 서식/데이터 유효성 조각 중 정의가 같은 것을 하나로 묶고 sqref 범위를 병합한다.
+
+    - 셀 단위로 판정되는 조건부 서식 규칙만 합치고(피벗 CF, 색조/데이터 막대 등 제외)
+      겹치는 다른 규칙과의 우선순위 순서가 유지될 때만 적용
+    - 상대 참조 수식은 병합된 범위의 왼쪽 위 셀 기준으로 다시 계산
+    반환값: 줄어든 규칙(조건부 서식 + 데이터 유효성) 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 조건부 서식/데이터 유효성 통합을 건너뜁니다. (pip install lxml)")
+        return 0
+
+    reduced = 0
+    for sheet in iter_sheet_parts(unpacked_dir):
+        try:
+            cf_before, cf_after, dv_before, dv_after = _consolidate_sheet_cf_dv(sheet)
+        except Exception as e:
+            if logger: logger(f"조건부 서식/데이터 유효성 통합 실패: {sheet.name} ({e})")
+            continue
+        if cf_before != cf_after or dv_before != dv_after:
+            if logger:
+                logger(f"조건부 서식/데이터 유효성 통합: {sheet.name} 조건부 서식 규칙 {cf_before}→{cf_after}개, "
+                       f"데이터 유효성 {dv_before}→{dv_after}개")
+            reduced += (cf_before - cf_after) + (dv_before - dv_after)
+    return reduced
+
+# ---- 공유 수식(shared formula) 합성 ----
+
+def _plain_formula(c):
+    """속성 없는 일반 수식 셀이면 (행, 열, <f> 요소) 를, 아니면 None 을 반환한다."""
+    f = c.find(_TAG_F)
+    if f is None or f.attrib or not f.text or c.get("r") is None:
+        return None
+    pos = parse_cell(c.get("r"))
+    return (pos[0], pos[1], f) if pos is not None else None
+
+def _scan_formula_runs(sheet: Path) -> tuple[dict[int, list[tuple[int, int]]], int]:
+    """세로로 이어진 같은(상대 참조 기준) 수식 구간을 찾는다.
+
+    반환값: ({열: [(시작 행, 끝 행)]}, 기존 공유 수식 si 최대값 + 1)
+    """
+    runs: dict[int, list[tuple[int, int]]] = {}
+    open_runs: dict[int, list] = {}   # 열 → [시작 행, 마지막 행, 토큰]
+    next_si = 0
+
+    def _close(col):
+        start, last, _ = open_runs.pop(col)
+        if last - start + 1 >= SHARED_FORMULA_MIN_RUN:
+            runs.setdefault(col, []).append((start, last))
+
+    for unit in iter_units(sheet):
+        if unit.tag != _TAG_ROW:
+            continue
+        for c in unit.iterchildren(_TAG_C):
+            f = c.find(_TAG_F)
+            if f is not None and f.get("t") == "shared" and f.get("si", "").isdigit():
+                next_si = max(next_si, int(f.get("si")) + 1)
+            hit = _plain_formula(c)
+            if hit is None:
+                continue
+            row, col, f = hit
+            tokens = relativize(f.text, row, col)
+            run = open_runs.get(col)
+            if run is not None and tokens is not None and run[1] + 1 == row and run[2] == tokens:
+                run[1] = row
+                continue
+            if run is not None:
+                _close(col)
+            if tokens is not None:
+                open_runs[col] = [row, row, tokens]
+    for col in list(open_runs):
+        _close(col)
+    return runs, next_si
+
+def share_repeated_formulas(unpacked_dir: Path, logger=None) -> int:
+    """세로로 반복되는 같은 수식을 t="shared" 마스터/자식 수식으로 바꾼다.
+
+    1) 시트를 스트리밍으로 읽어 상대 참조를 옮기면 같아지는 수식 구간(SHARED_FORMULA_MIN_RUN 행 이상) 수집
+    2) 두 번째 스트리밍 패스에서 구간 첫 셀은 ref/si 를 가진 마스터로, 나머지는 si 만 가진 자식으로 다시 씀
+    배열 수식 등 속성이 있는 수식은 건드리지 않는다. 반환값: 공유 수식으로 바뀐 셀 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 공유 수식 합성을 건너뜁니다. (pip install lxml)")
+        return 0
+
+    total = 0
+    for sheet in iter_sheet_parts(unpacked_dir):
+        try:
+            runs, next_si = _scan_formula_runs(sheet)
+            if not runs:
+                continue
+            # 열마다 (시작 행, 끝 행, si) 목록과 현재 위치
+            plan = {}
+            for col in sorted(runs):
+                entries = []
+                for start, end in runs[col]:
+                    entries.append((start, end, next_si))
+                    next_si += 1
+                plan[col] = [entries, 0]
+            count = sum(end - start + 1 for col in runs for start, end in runs[col])
+
+            def _share(unit, plan=plan):
+                if unit.tag != _TAG_ROW:
+                    return unit
+                for c in unit.iterchildren(_TAG_C):
+                    hit = _plain_formula(c)
+                    if hit is None or hit[1] not in plan:
+                        continue
+                    row, col, f = hit
+                    entries, i = plan[col]
+                    while i < len(entries) and entries[i][1] < row:
+                        i += 1
+                    plan[col][1] = i
+                    if i == len(entries) or entries[i][0] > row:
+                        continue
+                    start, end, si = entries[i]
+                    f.set("t", "shared")
+                    if row == start:
+                        f.set("ref", format_range((start, col, end, col)))
+                    else:
+                        f.text = None
+                    f.set("si", str(si))
+                return unit
+
+            stream_rewrite(sheet, _share)
+            total += count
+            if logger:
+                n_runs = sum(len(v) for v in runs.values())
+                logger(f"공유 수식 합성: {sheet.name} 수식 {count}개 → 공유 수식 {n_runs}개 구간")
+        except Exception as e:
+            if logger: logger(f"공유 수식 합성 실패: {sheet.name} ({e})")
+    return total
+
+# ---- 수식 캐시 값 제거 ----
+_TAG_CALC_PR = f"{{{NS_MAIN}}}calcPr"
+# CT_Workbook 에서 calcPr 뒤에 오는 요소들 (calcPr 을 새로 넣을 위치)
+_WORKBOOK_AFTER_CALC_PR = {f"{{{NS_MAIN}}}{n}" for n in (
+    "oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes", "webPublishing",
+    "fileRecoveryPr", "webPublishObjects", "extLst")}
+
+def _set_full_calc_on_load(unpacked_dir: Path) -> None:
+    """workbook.xml 의 calcPr 에 fullCalcOnLoad="1" 을 설정한다 (없으면 스키마 순서에 맞춰 추가)."""
+    wb = unpacked_dir / "xl" / "workbook.xml"
+    st = {"done": False}
+
+    def _new_calc_pr():
+        st["done"] = True
+        calc = etree.Element(_TAG_CALC_PR, nsmap={None: NS_MAIN})
+        calc.set("fullCalcOnLoad", "1")
+        return calc
+
+    def _transform(unit):
+        if st["done"]:
+            return unit
+        if unit.tag == _TAG_CALC_PR:
+            st["done"] = True
+            unit.set("fullCalcOnLoad", "1")
+            return unit
+        if unit.tag in _WORKBOOK_AFTER_CALC_PR:
+            return [_new_calc_pr(), unit]
+        return unit
+
+    stream_rewrite(wb, _transform, containers=(),
+                   flush=lambda root: None if st["done"] else _new_calc_pr())
+
+def strip_formula_values(unpacked_dir: Path, logger=None) -> int:
+    """수식 셀의 캐시된 값(<v>)을 제거하고 workbook.xml 에 fullCalcOnLoad="1" 을 설정한다.
+
+    값은 파일을 열 때 Excel 이 전체 재계산으로 다시 채운다 (calcChain 제거와 함께 쓰기 좋음).
+    값 형식을 나타내는 셀의 t 속성도 함께 지운다. 반환값: 값이 제거된 셀 수
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 수식 캐시 값 제거를 건너뜁니다. (pip install lxml)")
+        return 0
+    if not (unpacked_dir / "xl" / "workbook.xml").exists():
+        return 0
+    # 값을 지우기 전에 재계산 설정부터 한다 (실패하면 값을 그대로 둔다).
+    try:
+        _set_full_calc_on_load(unpacked_dir)
+    except Exception as e:
+        if logger: logger(f"fullCalcOnLoad 설정 실패로 수식 캐시 값 제거를 건너뜁니다: {e}")
+        return 0
+
+    total = 0
+    for sheet in iter_sheet_parts(unpacked_dir):
+        count = [0]
+
+        def _strip(unit, count=count):
+            if unit.tag != _TAG_ROW:
+                return unit
+            for c in unit.iterchildren(_TAG_C):
+                if c.find(_TAG_F) is None:
+                    continue
+                v = c.find(_TAG_V)
+                if v is not None:
+                    c.remove(v)
+                    count[0] += 1
+                c.attrib.pop("t", None)
+            return unit
+
+        try:
+            before = sheet.stat().st_size
+            stream_rewrite(sheet, _strip)
+        except Exception as e:
+            if logger: logger(f"수식 캐시 값 제거 실패: {sheet.name} ({e})")
+            continue
+        if count[0]:
+            total += count[0]
+            if logger: logger(f"수식 캐시 값 제거: {sheet.name} {count[0]:,}개 셀, "
+                              f"{((before - sheet.stat().st_size)/1024):.1f} KB 절감 (압축 전)")
+
+    if logger and total:
+        logger(f"수식 캐시 값 제거: 총 {total:,}개 셀, workbook.xml 에 fullCalcOnLoad=1 설정 (열 때 전체 재계산)")
+    return total
+
+# ---- XML 축소(minify) ----
+def _minify_targets(unpacked_dir: Path) -> list[Path]:
+    """축소 대상 파트: 모든 .xml/.rels (VML 과 임의 스키마인 customXml 은 제외)."""
+    targets = []
+    for path in sorted(unpacked_dir.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in (".xml", ".rels"):
+            continue
+        if "customXml" in path.relative_to(unpacked_dir).parts:
+            continue
+        targets.append(path)
+    return targets
+
+def _drop_optional_attrs(unit):
+    names = MINIFY_OPTIONAL_ATTRS.get(unit.tag)
+    if names:
+        for name in names:
+            unit.attrib.pop(name, None)
+    return unit
+
+def _minify_part(path: Path, drop_optional: bool) -> int:
+    """파트 하나를 공백 제거 + 선택 속성 제거로 다시 쓰고, 줄어든 바이트 수를 반환한다."""
+    before = path.stat().st_size
+    tmp = path.with_name(path.name + ".min")
+    try:
+        stream_rewrite(path, _drop_optional_attrs if drop_optional else None, dst=tmp, remove_blank_text=True)
+        after = tmp.stat().st_size
+        if after >= before:
+            return 0
+        tmp.replace(path)
+        return before - after
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def minify_xml_parts(unpacked_dir: Path, drop_optional: bool = True, logger=None) -> int:
+    """모든 XML 파트에서 의미 없는 공백/선택 속성을 제거하고 xmlns 선언을 정리한다.
+
+    - 파트별로 스트리밍 재작성하므로 큰 시트도 메모리 사용량이 일정하다.
+    - 파트 간에는 독립적이므로 스레드 풀로 병렬 처리한다.
+    - 루트의 xmlns 선언은 mc:Ignorable 등 속성 값에서 참조될 수 있어 그대로 둔다.
+    - 하위 요소의 선언은 요소 트리에서 정리한다 (중복 제거, 같은 URI 는 상위 접두사로 통일, 미사용 선언 제거).
+    - 루트 앞뒤의 PI/주석은 그대로 유지한다.
+    반환값: 줄어든 바이트 수(압축 전)
+    """
+    if not LXML_OK:
+        if logger: logger("lxml이 없어 XML 축소를 건너뜁니다. (pip install lxml)")
+        return 0
+
+    targets = _minify_targets(unpacked_dir)
+
+    def _job(path):
+        try:
+            return path, _minify_part(path, drop_optional), None
+        except Exception as e:
+            return path, 0, e
+
+    saved = 0
+    changed = 0
+    with ThreadPoolExecutor(max_workers=MINIFY_MAX_WORKERS) as pool:
+        for path, n, err in pool.map(_job, targets):
+            if err is not None:
+                if logger: logger(f"XML 축소 건너뜀: {path.relative_to(unpacked_dir).as_posix()} ({err})")
+                continue
+            if n:
+                saved += n
+                changed += 1
+
+    if logger and changed:
+        logger(f"XML 축소: {changed}/{len(targets)}개 파트, {(saved/1024):.1f} KB 절감 (압축 전)")
+    return saved
+
 def rezip_max_compress(unpacked_dir: Path, out_path: Path):
     with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=RECOMPRESS_ZIP_LEVEL) as zf:
         for path in sorted(unpacked_dir.rglob("*")):
@@ -376,11 +2261,75 @@ def get_new_output_path(src_path: Path) -> Path:
         i += 1
     return candidate
 
-def process_file(src_path: Path, aggressive: bool, no_backup: bool, do_xml_cleanup: bool, force_customxml_remove: bool, logger, overall_prog: Progress, file_prog: Progress, summary_dict):
+@dataclass
+class PrecisionOptions:
+    """정밀 슬리머의 선택 단계 묶음. 필드 이름은 AppSettings 의 precision_* 항목에서 접두어를 뺀 것."""
+
+    optimize_embedded_packages: bool = False
+    strip_pivot_cache: bool = False
+    strip_external_link_cache: bool = False
+    strip_chart_cache: bool = False
+    purge_drawing_objects: bool = False
+    dedupe_sheet_rels: bool = False
+    compact_vba: bool = False
+    inline_to_shared_strings: bool = False
+    compact_shared_strings: bool = False
+    compact_styles: bool = False
+    consolidate_cf_dv: bool = False
+    trim_used_range: bool = False
+    share_formulas: bool = False
+    strip_formula_values: bool = False
+    minify_xml: bool = False
+    minify_drop_optional_attrs: bool = True
+
+    @classmethod
+    def from_settings(cls, settings, do_xml_cleanup: bool = True) -> "PrecisionOptions":
+        """AppSettings 에서 옵션을 만든다. 구조 최적화 단계는 XML 정리가 켜져 있을 때만 켠다."""
+        opts = cls()
+        if settings is None:
+            return opts
+        for f in fields(cls):
+            value = bool(getattr(settings, "precision_" + f.name, f.default))
+            if f.name in _XML_CLEANUP_STEPS and not do_xml_cleanup:
+                value = False
+            setattr(opts, f.name, value)
+        return opts
+
+# XML 정리 옵션에 묶인 구조 최적화 단계
+_XML_CLEANUP_STEPS = (
+    "strip_pivot_cache", "strip_external_link_cache", "strip_chart_cache", "purge_drawing_objects",
+    "dedupe_sheet_rels", "inline_to_shared_strings", "compact_shared_strings", "compact_styles",
+    "consolidate_cf_dv", "trim_used_range", "share_formulas", "strip_formula_values", "minify_xml",
+)
+# 진행률에 한 칸씩 차지하는 선택 단계 (minify_drop_optional_attrs 는 축소 단계의 세부 옵션)
+_OPTIONAL_STEPS = ("optimize_embedded_packages", "compact_vba") + _XML_CLEANUP_STEPS
+
+def precision_step_count(options: PrecisionOptions | None = None) -> int:
+    """파일 하나를 처리할 때 진행률 단계 수 (백업/압축 해제/이미지/XML 정리 4/customXml/재압축/저장 = 10 + 선택 단계)."""
+    options = options or PrecisionOptions()
+    return 10 + sum(1 for name in _OPTIONAL_STEPS if getattr(options, name))
+
+def load_precision_options(do_xml_cleanup: bool = True) -> PrecisionOptions:
+    """환경 설정(settings.py)이 있으면 그 값으로, 없으면 기본값(선택 단계 모두 끔)으로 옵션을 만든다."""
+    try:
+        from settings import get_settings
+    except ImportError:
+        root = str(Path(__file__).resolve().parent.parent)
+        if root in sys.path:
+            return PrecisionOptions()
+        sys.path.append(root)
+        try:
+            from settings import get_settings
+        except ImportError:
+            return PrecisionOptions()
+    return PrecisionOptions.from_settings(get_settings(), do_xml_cleanup)
+
+def process_file(src_path: Path, aggressive: bool, no_backup: bool, do_xml_cleanup: bool, force_customxml_remove: bool, logger, overall_prog: Progress, file_prog: Progress, summary_dict, options: PrecisionOptions | None = None):
     fname = src_path.name
     logger(f"처리 시작: {fname} (공격 모드={aggressive}, XML정리={do_xml_cleanup})")
 
-    steps = 10 + (1 if aggressive else 0) + (1 if do_xml_cleanup else 0) + (1 if (force_customxml_remove) else 0) + 1
+    opts = options or PrecisionOptions()
+    steps = precision_step_count(opts)
     file_prog.reset(steps, label_text=f"{fname} — 0%", prefix=fname + " —")
 
     if not src_path.exists():
@@ -405,6 +2354,9 @@ def process_file(src_path: Path, aggressive: bool, no_backup: bool, do_xml_clean
             tempdir = Path(td)
             unpacked = unzip_to_temp(src_path, tempdir); overall_prog.add(1); file_prog.add(1)
             recompress_images_with_sync(unpacked, aggressive=aggressive, logger=logger); overall_prog.add(1); file_prog.add(1)
+            if opts.optimize_embedded_packages:
+                optimize_embedded_packages(unpacked, aggressive=aggressive, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
             if do_xml_cleanup:
                 # XML 정리 옵션이 켜져 있을 때만 구조 관련 정리를 수행
                 remove_calc_chain(unpacked, logger=logger)
@@ -423,6 +2375,51 @@ def process_file(src_path: Path, aggressive: bool, no_backup: bool, do_xml_clean
                 remove_customxml(unpacked, logger=logger)
             overall_prog.add(1); file_prog.add(1)
 
+            if opts.strip_pivot_cache:
+                strip_pivot_cache_records(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.strip_external_link_cache:
+                strip_external_link_cache(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.strip_chart_cache:
+                strip_chart_caches(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.purge_drawing_objects:
+                purge_drawing_objects(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.dedupe_sheet_rels:
+                dedupe_sheet_relationships(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.compact_vba:
+                compact_vba_part(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.inline_to_shared_strings:
+                # 새로 추가된 공유 문자열도 다음 단계에서 중복 제거되도록 먼저 수행한다.
+                convert_inline_strings(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.compact_shared_strings:
+                compact_shared_strings(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.compact_styles:
+                compact_styles(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.consolidate_cf_dv:
+                consolidate_cf_dv(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.trim_used_range:
+                trim_used_range(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.share_formulas:
+                share_repeated_formulas(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.strip_formula_values:
+                strip_formula_values(unpacked, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+            if opts.minify_xml:
+                # 다른 XML 단계가 모두 끝난 뒤 마지막에 한 번 축소한다.
+                minify_xml_parts(unpacked, drop_optional=opts.minify_drop_optional_attrs, logger=logger)
+                overall_prog.add(1); file_prog.add(1)
+
             out_tmp = tempdir / ("slimmed" + src_path.suffix)
             rezip_max_compress(unpacked, out_tmp); overall_prog.add(1); file_prog.add(1)
 
@@ -459,16 +2456,19 @@ def run_processing(files, aggressive, no_backup, do_xml_cleanup, force_customxml
     overall = Progress(overall_bar, overall_label)
     perfile = Progress(file_bar, file_label)
 
-    total_steps = len(files) * (10 + (1 if aggressive else 0) + (1 if do_xml_cleanup else 0) + (1 if force_customxml else 0) + 1)
+    options = load_precision_options(do_xml_cleanup)
+    total_steps = len(files) * precision_step_count(options)
     overall.reset(total_steps, label_text="0%")
 
     summary = {'files': [], 'saved_bytes': 0, 'original_bytes': 0}
+    enabled = [name for name in _OPTIONAL_STEPS if getattr(options, name)]
+    ui_log(log_box, "정밀 옵션(환경 설정): " + (", ".join(enabled) if enabled else "없음"))
 
     try:
         for f in files:
             process_file(Path(f), aggressive, no_backup, do_xml_cleanup, force_customxml,
                          logger=lambda m: ui_log(log_box, m),
-                         overall_prog=overall, file_prog=perfile, summary_dict=summary)
+                         overall_prog=overall, file_prog=perfile, summary_dict=summary, options=options)
     finally:
         overall.finish()
         if run_button:
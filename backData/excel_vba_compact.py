@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+VBA 프로젝트(vbaProject.bin) 정리 도우미 (정밀 슬리머 공용, 순수 파이썬)
+- OLE 복합 문서(CFB, MS-CFB)를 읽어 트리로 만들고, 빈 섹터 없이 v3(512바이트 섹터) 형식으로 다시 쓴다.
+- 모듈 스트림 앞의 컴파일된 p-code(성능 캐시)와 __SRP_ 캐시 스트림을 제거하고, dir 스트림의
+  MODULEOFFSET 을 0 으로 고친다 (MS-OVBA). 모듈 소스(압축된 소스 코드)는 그대로 유지한다.
+- _VBA_PROJECT 스트림은 버전 0xFFFF 헤더만 남겨 Office 가 소스에서 다시 컴파일하도록 한다.
+"""
+import struct
+from dataclasses import dataclass, field
+
+CFB_SIGNATURE = b"\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1"
+
+MAXREGSECT = 0xFFFFFFFA
+DIFSECT = 0xFFFFFFFC
+FATSECT = 0xFFFFFFFD
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+NOSTREAM = 0xFFFFFFFF
+
+TYPE_STORAGE = 1
+TYPE_STREAM = 2
+TYPE_ROOT = 5
+
+_SECTOR = 512          # 출력은 항상 v3 (512바이트 섹터)
+_MINI_SECTOR = 64
+_MINI_CUTOFF = 4096
+_DIR_ENTRY = 128
+
+# _VBA_PROJECT: Reserved1(0x61CC) + Version(0xFFFF: 성능 캐시 무시) + Reserved2/3
+VBA_PROJECT_STUB = b"\xCC\x61\xFF\xFF\x00\x00\x00"
+
+
+class CfbError(ValueError):
+    """CFB/VBA 구조를 해석할 수 없을 때 발생한다."""
+
+
+@dataclass
+class CfbEntry:
+    name: str
+    kind: int
+    data: bytes = b""
+    children: list = field(default_factory=list)
+    clsid: bytes = b"\0" * 16
+    state: int = 0
+    ctime: bytes = b"\0" * 8
+    mtime: bytes = b"\0" * 8
+
+    def child(self, name: str):
+        for ch in self.children:
+            if ch.name.upper() == name.upper():
+                return ch
+        return None
+
+
+# ---------- 읽기 ----------
+def read_cfb(data: bytes) -> CfbEntry:
+    """CFB 바이트를 루트 항목 트리로 읽는다."""
+    if len(data) < 512 or data[:8] != CFB_SIGNATURE:
+        raise CfbError("CFB 시그니처가 아닙니다.")
+    (major, byte_order, sector_shift, mini_shift) = struct.unpack_from("<HHHH", data, 0x1A)
+    if byte_order != 0xFFFE or sector_shift not in (9, 12):
+        raise CfbError("지원하지 않는 CFB 헤더입니다.")
+    sector = 1 << sector_shift
+    mini_sector = 1 << mini_shift
+    (n_fat, first_dir, _, mini_cutoff, first_minifat, n_minifat, first_difat, n_difat) = \
+        struct.unpack_from("<IIIIIIII", data, 0x2C)
+    n_sectors = (len(data) - sector) // sector + (1 if (len(data) - sector) % sector else 0)
+
+    def _sector(sid: int) -> bytes:
+        if sid > MAXREGSECT or sid >= n_sectors:
+            raise CfbError(f"잘못된 섹터 번호: {sid}")
+        off = (sid + 1) * sector
+        return data[off:off + sector].ljust(sector, b"\0")
+
+    # DIFAT → FAT 섹터 목록
+    difat = list(struct.unpack_from("<109I", data, 0x4C))
+    sid, seen = first_difat, 0
+    while sid not in (ENDOFCHAIN, FREESECT) and seen < n_difat + 1:
+        vals = struct.unpack("<%dI" % (sector // 4), _sector(sid))
+        difat.extend(vals[:-1])
+        sid = vals[-1]
+        seen += 1
+    fat_sids = [s for s in difat if s <= MAXREGSECT][:n_fat]
+    fat = []
+    for s in fat_sids:
+        fat.extend(struct.unpack("<%dI" % (sector // 4), _sector(s)))
+
+    def _chain(start: int, table: list) -> list:
+        out, cur = [], start
+        while cur != ENDOFCHAIN:
+            if cur >= len(table) or len(out) > len(table):
+                raise CfbError("섹터 체인이 손상되었습니다.")
+            out.append(cur)
+            cur = table[cur]
+        return out
+
+    def _read_chain(start: int) -> bytes:
+        if start in (ENDOFCHAIN, FREESECT):
+            return b""
+        return b"".join(_sector(s) for s in _chain(start, fat))
+
+    dir_data = _read_chain(first_dir)
+    raw_entries = []
+    for off in range(0, len(dir_data) - _DIR_ENTRY + 1, _DIR_ENTRY):
+        e = dir_data[off:off + _DIR_ENTRY]
+        name_len = struct.unpack_from("<H", e, 64)[0]
+        name = e[:max(0, min(name_len, 64) - 2)].decode("utf-16-le", errors="replace")
+        kind, _color = e[66], e[67]
+        left, right, child = struct.unpack_from("<III", e, 68)
+        clsid = e[80:96]
+        state = struct.unpack_from("<I", e, 96)[0]
+        ctime, mtime = e[100:108], e[108:116]
+        start, size_lo, size_hi = struct.unpack_from("<III", e, 116)
+        size = size_lo if major == 3 else size_lo | (size_hi << 32)
+        raw_entries.append((name, kind, left, right, child, clsid, state, ctime, mtime, start, size))
+    if not raw_entries or raw_entries[0][1] != TYPE_ROOT:
+        raise CfbError("루트 디렉터리 항목이 없습니다.")
+
+    root_raw = raw_entries[0]
+    mini_stream = _read_chain(root_raw[9])[:root_raw[10]]
+    minifat = []
+    if n_minifat and first_minifat not in (ENDOFCHAIN, FREESECT):
+        minifat = list(struct.unpack("<%dI" % (len(_read_chain(first_minifat)) // 4), _read_chain(first_minifat)))
+
+    def _stream_data(start: int, size: int) -> bytes:
+        if size == 0:
+            return b""
+        if size < mini_cutoff:
+            chunks = []
+            for s in _chain(start, minifat):
+                off = s * mini_sector
+                chunks.append(mini_stream[off:off + mini_sector])
+            return b"".join(chunks)[:size]
+        return _read_chain(start)[:size]
+
+    visiting = set()
+
+    def _build(idx: int) -> CfbEntry:
+        if idx in visiting or idx >= len(raw_entries):
+            raise CfbError("디렉터리 트리가 손상되었습니다.")
+        visiting.add(idx)
+        name, kind, _, _, child, clsid, state, ctime, mtime, start, size = raw_entries[idx]
+        entry = CfbEntry(name=name, kind=kind, clsid=clsid, state=state, ctime=ctime, mtime=mtime)
+        if kind == TYPE_STREAM:
+            entry.data = _stream_data(start, size)
+        else:
+            entry.children = [_build(i) for i in _siblings(child)]
+        return entry
+
+    def _siblings(idx: int) -> list:
+        # 형제 트리를 중위 순회 (재귀 깊이 제한을 피하려고 스택 사용)
+        out, stack, cur, guard = [], [], idx, set()
+        while stack or cur != NOSTREAM:
+            while cur != NOSTREAM:
+                if cur in guard or cur >= len(raw_entries):
+                    raise CfbError("디렉터리 트리가 손상되었습니다.")
+                guard.add(cur)
+                stack.append(cur)
+                cur = raw_entries[cur][2]
+            cur = stack.pop()
+            out.append(cur)
+            cur = raw_entries[cur][3]
+        return out
+
+    return _build(0)
+
+
+# ---------- 쓰기 ----------
+def _name_key(name: str) -> tuple:
+    """MS-CFB 디렉터리 정렬 순서: 이름 길이 우선, 같으면 대문자 비교."""
+    return len(name), name.upper()
+
+
+def write_cfb(root: CfbEntry) -> bytes:
+    """루트 항목 트리를 빈 섹터 없는 CFB v3 바이트로 쓴다."""
+    entries: list[CfbEntry] = []
+    links: dict[int, list] = {}   # 항목 번호 → [left, right, child, color]
+
+    def _collect(entry: CfbEntry) -> int:
+        idx = len(entries)
+        entries.append(entry)
+        links[idx] = [NOSTREAM, NOSTREAM, NOSTREAM, 1]
+        if entry.kind != TYPE_STREAM and entry.children:
+            kids = sorted(entry.children, key=lambda e: _name_key(e.name))
+            ids = [_collect(k) for k in kids]
+            links[idx][2] = _balanced(ids, 0, len(ids) - 1, 0, _depth(len(ids)))
+        return idx
+
+    def _depth(n: int) -> int:
+        d = 0
+        while (1 << (d + 1)) - 1 < n:
+            d += 1
+        return d
+
+    def _balanced(ids: list, lo: int, hi: int, depth: int, max_depth: int) -> int:
+        # 가운데 항목을 부모로 하는 균형 이진 트리. 가장 깊은 층만 빨강으로 칠하면
+        # 모든 경로의 검정 노드 수가 같아 레드-블랙 트리 조건을 만족한다.
+        if lo > hi:
+            return NOSTREAM
+        mid = (lo + hi) // 2
+        node = ids[mid]
+        links[node][0] = _balanced(ids, lo, mid - 1, depth + 1, max_depth)
+        links[node][1] = _balanced(ids, mid + 1, hi, depth + 1, max_depth)
+        links[node][3] = 0 if (depth == max_depth and max_depth > 0) else 1
+        return node
+
+    _collect(root)
+
+    # 스트림 배치: 4096 바이트 미만은 미니 스트림, 나머지는 일반 섹터
+    mini_stream = bytearray()
+    minifat: list[int] = []
+    big_streams = []   # (항목 번호, 데이터)
+    starts = {}
+    for idx, e in enumerate(entries):
+        if e.kind != TYPE_STREAM:
+            continue
+        if not e.data:
+            starts[idx] = ENDOFCHAIN
+        elif len(e.data) < _MINI_CUTOFF:
+            first = len(minifat)
+            n = -(-len(e.data) // _MINI_SECTOR)
+            minifat.extend(range(first + 1, first + n))
+            minifat.append(ENDOFCHAIN)
+            mini_stream += e.data.ljust(n * _MINI_SECTOR, b"\0")
+            starts[idx] = first
+        else:
+            big_streams.append((idx, e.data))
+
+    def _nsec(nbytes: int) -> int:
+        return -(-nbytes // _SECTOR)
+
+    n_big = sum(_nsec(len(d)) for _, d in big_streams)
+    n_mini_container = _nsec(len(mini_stream))
+    n_minifat = _nsec(len(minifat) * 4)
+    n_dir = _nsec(len(entries) * _DIR_ENTRY)
+    n_data = n_big + n_mini_container + n_minifat + n_dir
+
+    n_fat, n_difat = 1, 0
+    while True:
+        n_difat = 0 if n_fat <= 109 else -(-(n_fat - 109) // (_SECTOR // 4 - 1))
+        if n_fat * (_SECTOR // 4) >= n_data + n_fat + n_difat:
+            break
+        n_fat += 1
+    total = n_data + n_fat + n_difat
+    fat = [FREESECT] * (n_fat * (_SECTOR // 4))
+
+    sectors = []
+    cursor = 0
+
+    def _place(payload: bytes) -> int:
+        nonlocal cursor
+        n = _nsec(len(payload))
+        if n == 0:
+            return ENDOFCHAIN
+        first = cursor
+        for i in range(n):
+            fat[first + i] = first + i + 1 if i < n - 1 else ENDOFCHAIN
+        sectors.append(payload.ljust(n * _SECTOR, b"\0"))
+        cursor += n
+        return first
+
+    for idx, payload in big_streams:
+        starts[idx] = _place(payload)
+    mini_start = _place(bytes(mini_stream))
+    minifat_start = _place(struct.pack("<%dI" % len(minifat), *minifat)) if minifat else ENDOFCHAIN
+
+    dir_bytes = bytearray()
+    for idx, e in enumerate(entries):
+        left, right, child, color = links[idx]
+        name = e.name.encode("utf-16-le")[:62]
+        if e.kind == TYPE_ROOT:
+            start, size = (mini_start if mini_stream else ENDOFCHAIN), len(mini_stream)
+        elif e.kind == TYPE_STREAM:
+            start, size = starts[idx], len(e.data)
+        else:
+            start, size = 0, 0
+        dir_bytes += name.ljust(64, b"\0")
+        dir_bytes += struct.pack("<HBB", len(name) + 2, e.kind, color)
+        dir_bytes += struct.pack("<III", left, right, child)
+        dir_bytes += e.clsid[:16].ljust(16, b"\0")
+        dir_bytes += struct.pack("<I", e.state)
+        dir_bytes += e.ctime[:8].ljust(8, b"\0") + e.mtime[:8].ljust(8, b"\0")
+        dir_bytes += struct.pack("<IQ", start, size)
+    while len(dir_bytes) % _SECTOR:
+        # 빈 디렉터리 항목: 형제/자식 번호만 NOSTREAM
+        dir_bytes += b"\0" * 68 + struct.pack("<III", NOSTREAM, NOSTREAM, NOSTREAM) + b"\0" * 48
+    dir_start = _place(bytes(dir_bytes))
+
+    fat_sids = list(range(cursor, cursor + n_fat))
+    for s in fat_sids:
+        fat[s] = FATSECT
+    difat_sids = list(range(cursor + n_fat, cursor + n_fat + n_difat))
+    for s in difat_sids:
+        fat[s] = DIFSECT
+    fat_bytes = struct.pack("<%dI" % len(fat), *fat)
+    sectors.append(fat_bytes)
+
+    rest = fat_sids[109:]
+    per = _SECTOR // 4 - 1
+    for i, s in enumerate(difat_sids):
+        vals = rest[i * per:(i + 1) * per]
+        vals += [FREESECT] * (per - len(vals))
+        nxt = difat_sids[i + 1] if i + 1 < len(difat_sids) else ENDOFCHAIN
+        sectors.append(struct.pack("<%dI" % (per + 1), *vals, nxt))
+    assert cursor + n_fat + n_difat == total
+
+    head_difat = fat_sids[:109] + [FREESECT] * (109 - min(109, len(fat_sids)))
+    header = bytearray(CFB_SIGNATURE)
+    header += b"\0" * 16
+    header += struct.pack("<HHHHH", 0x003E, 3, 0xFFFE, 9, 6)
+    header += b"\0" * 6
+    header += struct.pack("<IIIIIIIII", 0, n_fat, dir_start, 0, _MINI_CUTOFF,
+                          minifat_start, n_minifat, difat_sids[0] if difat_sids else ENDOFCHAIN, n_difat)
+    header += struct.pack("<109I", *head_difat)
+    return bytes(header) + b"".join(sectors)
+
+
+# ---------- MS-OVBA 압축 ----------
+def _bit_count(diff: int) -> int:
+    n = 4
+    while (1 << n) < diff:
+        n += 1
+    return n
+
+
+def decompress(data: bytes) -> bytes:
+    """MS-OVBA 2.4.1 압축 컨테이너를 푼다."""
+    if not data or data[0] != 0x01:
+        raise CfbError("VBA 압축 컨테이너 시그니처가 아닙니다.")
+    out = bytearray()
+    pos = 1
+    while pos + 2 <= len(data):
+        header = struct.unpack_from("<H", data, pos)[0]
+        size = (header & 0x0FFF) + 3
+        chunk = data[pos + 2:pos + size]
+        pos += size
+        if not header & 0x8000:
+            out += chunk[:4096]
+            continue
+        start = len(out)
+        i = 0
+        while i < len(chunk):
+            flags = chunk[i]
+            i += 1
+            for bit in range(8):
+                if i >= len(chunk):
+                    break
+                if not flags & (1 << bit):
+                    out.append(chunk[i])
+                    i += 1
+                    continue
+                token = struct.unpack_from("<H", chunk, i)[0]
+                i += 2
+                bits = _bit_count(len(out) - start)
+                length = (token & (0xFFFF >> bits)) + 3
+                offset = (token >> (16 - bits)) + 1
+                src = len(out) - offset
+                if src < start:
+                    raise CfbError("VBA 압축 데이터가 손상되었습니다.")
+                for k in range(length):
+                    out.append(out[src + k])
+    return bytes(out)
+
+
+def _compress_chunk(piece: bytes) -> bytes:
+    out = bytearray()
+    pos = 0
+    table: dict[bytes, list[int]] = {}
+    while pos < len(piece):
+        flag_at = len(out)
+        out.append(0)
+        flags = 0
+        for bit in range(8):
+            if pos >= len(piece):
+                break
+            best_len, best_off = 0, 0
+            if pos > 0 and pos + 3 <= len(piece):
+                bits = _bit_count(pos)
+                max_len = (0xFFFF >> bits) + 3
+                for cand in reversed(table.get(piece[pos:pos + 3], ())[-64:]):
+                    n = 0
+                    limit = min(max_len, len(piece) - pos)
+                    while n < limit and piece[cand + n] == piece[pos + n]:
+                        n += 1
+                    if n > best_len:
+                        best_len, best_off = n, pos - cand
+                        if n == limit:
+                            break
+            step = best_len if best_len >= 3 else 1
+            if best_len >= 3:
+                bits = _bit_count(pos)
+                out += struct.pack("<H", ((best_off - 1) << (16 - bits)) | (best_len - 3))
+                flags |= 1 << bit
+            else:
+                out.append(piece[pos])
+            for k in range(pos, pos + step):
+                if k + 3 <= len(piece):
+                    table.setdefault(piece[k:k + 3], []).append(k)
+            pos += step
+        out[flag_at] = flags
+    return bytes(out)
+
+
+def _compressed_chunks(piece: bytes) -> bytes:
+    """압축 청크(들). 결과가 청크 한도(4096바이트)를 넘으면 반으로 나눠 각각 압축 청크로 쓴다."""
+    comp = _compress_chunk(piece)
+    if len(comp) <= 4096:
+        return struct.pack("<H", 0xB000 | (len(comp) + 2 - 3)) + comp
+    half = len(piece) // 2
+    return _compressed_chunks(piece[:half]) + _compressed_chunks(piece[half:])
+
+
+def compress(data: bytes) -> bytes:
+    """MS-OVBA 2.4.1 압축. decompress 하면 data 와 정확히 같은 바이트가 나온다.
+
+    원시(raw) 청크는 항상 4096바이트로 풀리므로 4096바이트를 다 채운 조각에만 쓴다.
+    마지막 부분 조각은 줄지 않더라도 압축 청크로 쓴다 (한 청크에 안 들어가면 둘로 나눔).
+    """
+    out = bytearray(b"\x01")
+    for start in range(0, len(data), 4096):
+        piece = data[start:start + 4096]
+        if len(piece) < 4096:
+            out += _compressed_chunks(piece)
+            continue
+        comp = _compress_chunk(piece)
+        if len(comp) <= 4096:
+            out += struct.pack("<H", 0xB000 | (len(comp) + 2 - 3))
+            out += comp
+        else:
+            out += struct.pack("<H", 0x3000 | (4096 + 2 - 3))
+            out += piece
+    return bytes(out)
+
+
+# ---------- VBA 프로젝트 정리 ----------
+def _module_offsets(dir_data: bytes) -> list[tuple[str, int, int]]:
+    """dir 스트림에서 (모듈 스트림 이름, MODULEOFFSET 값, 값 위치) 목록을 읽는다."""
+    out = []
+    pos, stream_name = 0, None
+    while pos + 6 <= len(dir_data):
+        rec_id, size = struct.unpack_from("<HI", dir_data, pos)
+        if rec_id == 0x0009:
+            # PROJECTVERSION: Size 자리는 Reserved(4) 이고 실제 데이터는 6바이트
+            pos += 6 + 6
+            continue
+        body = pos + 6
+        if rec_id == 0x001A:
+            stream_name = dir_data[body:body + size].decode("latin-1")
+        elif rec_id == 0x0032:
+            stream_name = dir_data[body:body + size].decode("utf-16-le", errors="replace")
+        elif rec_id == 0x0031 and size == 4 and stream_name is not None:
+            out.append((stream_name, struct.unpack_from("<I", dir_data, body)[0], body))
+        elif rec_id == 0x0010:
+            break
+        pos = body + size
+    return out
+
+
+def compact_vba_project(data: bytes) -> bytes | None:
+    """vbaProject.bin 에서 p-code/캐시 스트림과 빈 섹터를 제거한 새 바이트를 돌려준다.
+
+    구조를 확신할 수 없으면 CfbError 를 발생시키고, 더 작아지지 않으면 None 을 반환한다.
+    """
+    root = read_cfb(data)
+    vba = root.child("VBA")
+    if vba is None or vba.kind != TYPE_STORAGE:
+        raise CfbError("VBA 저장소가 없습니다.")
+    dir_entry = vba.child("dir")
+    if dir_entry is None or dir_entry.kind != TYPE_STREAM:
+        raise CfbError("VBA dir 스트림이 없습니다.")
+
+    dir_data = bytearray(decompress(dir_entry.data))
+    modules = _module_offsets(bytes(dir_data))
+    if not modules:
+        raise CfbError("VBA 모듈 정보를 찾지 못했습니다.")
+
+    for name, offset, at in modules:
+        stream = vba.child(name)
+        if stream is None or stream.kind != TYPE_STREAM:
+            raise CfbError(f"모듈 스트림이 없습니다: {name}")
+        if offset >= len(stream.data) or stream.data[offset] != 0x01:
+            raise CfbError(f"모듈 소스 위치가 올바르지 않습니다: {name}")
+        # 소스 앞의 p-code(성능 캐시)를 버리고 소스 시작 위치를 0 으로 바꾼다.
+        stream.data = stream.data[offset:]
+        struct.pack_into("<I", dir_data, at, 0)
+
+    new_dir = compress(bytes(dir_data))
+    if decompress(new_dir) != dir_data:
+        raise CfbError("다시 압축한 dir 스트림이 원래 내용과 다릅니다.")
+    dir_entry.data = new_dir
+    vba.children = [ch for ch in vba.children if not ch.name.upper().startswith("__SRP_")]
+    project = vba.child("_VBA_PROJECT")
+    if project is not None and project.kind == TYPE_STREAM:
+        project.data = VBA_PROJECT_STUB
+
+    new = write_cfb(root)
+    return new if len(new) < len(data) else None
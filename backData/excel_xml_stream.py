@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel XML 스트리밍 재작성 도우미 (정밀 슬리머 공용)
+- 파트 전체를 트리로 올리지 않고 lxml iterparse 로 이벤트 단위로 읽는다.
+- 루트/컨테이너(예: sheetData) 바로 아래 요소를 "단위"로 변환 함수에 넘기고,
+  결과를 곧바로 출력 파일(또는 ZIP 엔트리)에 써서 메모리 사용량을 일정하게 유지한다.
+- 단위는 상위 xmlns 선언을 가진 임시 부모 아래로 옮겨 직렬화한다. lxml 이 트리에서 이름공간을 맞추므로
+  상위와 같은 선언은 반복하지 않고, 같은 URI 의 다른 접두사는 상위 접두사로 합쳐진다 (쓰이지 않는 선언은
+  cleanup_namespaces 로 제거하되 mc:Ignorable/Requires, xsi:type 처럼 속성 값에서 참조되는 접두사는 유지).
+- 루트 앞뒤와 루트/컨테이너 바로 아래의 주석·처리 지시(PI), 텍스트와 단위 뒤 텍스트(tail)도 순서대로 쓴다.
+"""
+import copy
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+try:
+    from lxml import etree
+except Exception:
+    etree = None
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+NS_MC = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+NS_XSI = "http://www.w3.org/2001/XMLSchema-instance"
+
+TAG_SHEETDATA = f"{{{NS_MAIN}}}sheetData"
+SHEET_CONTAINERS = (TAG_SHEETDATA,)
+
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_SHELL_TAG = "_"  # 직렬화용 임시 부모 (출력에서는 잘라 낸다)
+_SHELL_END = b"</_>"
+
+
+def _referenced_prefixes(elem) -> list:
+    """속성 값에서 접두사로 참조되는 이름 (mc:Ignorable 등, mc:Choice/@Requires, xsi:type 의 QName)."""
+    values = elem.xpath("descendant-or-self::*/@mc:* | descendant-or-self::mc:Choice/@Requires"
+                        " | descendant-or-self::*/@xsi:type", namespaces={"mc": NS_MC, "xsi": NS_XSI})
+    prefixes = set()
+    for value in values:
+        for token in value.split():
+            prefixes.add(token.split(":", 1)[0])
+    return list(prefixes)
+
+
+def _shell(declared: dict, reuse: list | None):
+    """declared 선언만 가진 임시 부모와 그 시작 태그 길이. reuse(빈 목록)를 주면 거기 보관해 다시 쓴다."""
+    if reuse:
+        return reuse[0]
+    shell = etree.Element(_SHELL_TAG, nsmap=declared)
+    entry = (shell, len(etree.tostring(shell, encoding="UTF-8")) - 1)  # "<_ .../>" → "<_ ...>" 길이
+    if reuse is not None:
+        reuse.append(entry)
+    return entry
+
+
+def _serialize_in_scope(node, declared: dict, cleanup: bool, reuse: list | None = None) -> bytes:
+    """declared 선언을 가진 임시 부모 아래로 node 를 옮겨 직렬화하고 부모 태그를 잘라 낸다."""
+    node.tail = None
+    shell, head = _shell(declared, reuse)
+    shell.append(node)  # lxml 이 상위 선언을 재사용하도록 이름공간을 다시 맞춘다
+    data = etree.tostring(shell, encoding="UTF-8")
+    if cleanup and data.find(b"xmlns", head) >= 0:
+        # 단위 안에 새 선언이 남은 경우에만 쓰이지 않는 선언을 정리한다 (임시 부모는 따로 만들어 재사용 캐시를 보존).
+        shell.remove(node)
+        shell, head = _shell(declared, None)
+        shell.append(node)
+        etree.cleanup_namespaces(shell, keep_ns_prefixes=_referenced_prefixes(node))
+        data = etree.tostring(shell, encoding="UTF-8")
+        shell.remove(node)
+        head = len(etree.tostring(shell, encoding="UTF-8")) - 1
+    else:
+        shell.remove(node)
+    return data[head:-len(_SHELL_END)]
+
+
+def serialize(elem, declared: dict | None = None, detach: bool = False, reuse: list | None = None) -> bytes:
+    """요소 하나를 UTF-8 로 직렬화한다 (tail 제외).
+
+    declared(상위에서 선언된 접두사 → URI)를 주면 그 범위 안에 있는 것처럼 선언을 정리해 쓴다.
+    detach=True 이면 요소를 원래 트리에서 떼어 내 쓰고(복사 없음), 아니면 복사본을 쓴다.
+    reuse 는 같은 declared 로 여러 번 쓸 때 임시 부모를 보관하는 목록 (범위마다, 스레드마다 따로).
+    """
+    if not declared:
+        return etree.tostring(elem, encoding="UTF-8", xml_declaration=False, with_tail=False)
+    return _serialize_in_scope(elem if detach else copy.deepcopy(elem), declared, True, reuse)
+
+
+def _start_tag(elem, declared: dict) -> bytes:
+    shell = etree.Element(elem.tag, nsmap=elem.nsmap)
+    for k, v in elem.attrib.items():
+        shell.set(k, v)
+    # 컨테이너 자신의 선언은 하위 단위가 쓰므로 정리(cleanup)하지 않는다.
+    data = _serialize_in_scope(shell, declared, cleanup=False) if declared else serialize(shell)
+    return data[:-2] + b">"
+
+
+def _end_tag(elem) -> bytes:
+    local = etree.QName(elem).localname
+    return f"</{elem.prefix}:{local}>".encode() if elem.prefix else f"</{local}>".encode()
+
+
+def _text(text) -> bytes:
+    return escape(text).encode("utf-8") if text else b""
+
+
+def _parse_events(source, remove_blank_text: bool = False, events=("start", "end")):
+    src = str(source) if isinstance(source, Path) else source
+    return etree.iterparse(src, events=events, huge_tree=True, remove_blank_text=remove_blank_text)
+
+
+def iter_units(source, containers=SHEET_CONTAINERS):
+    """루트/컨테이너 바로 아래 요소를 하나씩 돌려주고, 처리 후 메모리에서 제거한다.
+
+    source 는 파일 경로 또는 읽기용 바이너리 파일 객체(ZipFile.open 등)이다.
+    """
+    opened = []
+    for event, elem in _parse_events(source):
+        if event == "start":
+            if not opened or (elem.getparent() is opened[-1] and elem.tag in containers):
+                opened.append(elem)
+            continue
+        if opened and elem is opened[-1]:
+            opened.pop()
+        elif opened and elem.getparent() is opened[-1]:
+            yield elem
+            opened[-1].remove(elem)
+
+
+def rewrite_stream(source, out, transform=None, containers=SHEET_CONTAINERS, on_start=None, flush=None,
+                   remove_blank_text: bool = False) -> None:
+    """source 를 요소 단위로 변환하면서 out(바이너리 쓰기 객체)에 바로 쓴다.
+
+    - transform(elem): 요소, 요소 목록, 또는 None(삭제)을 반환한다.
+    - on_start(elem): 루트/컨테이너 시작 태그를 쓰기 직전에 호출 (속성 수정용).
+    - flush(elem): 루트/컨테이너 종료 태그 직전에 추가로 쓸 요소 목록을 반환 (버퍼링된 단위 방출용).
+      단위는 transform 직후 부모에서 떼어 내므로, 나중에 쓰려고 보관할 단위는 copy.deepcopy 로 복사한다.
+    - 단위 뒤 텍스트(tail)는 다음 형제가 시작되거나 부모가 끝날 때 확정되므로, 단위는 그때 변환해 쓴다.
+    """
+    opened = []
+    declared = [{}]
+    shells = [[]]  # declared 와 같은 깊이: 재사용하는 임시 부모
+    pending = []  # opened 와 같은 깊이: [부모 text 를 썼는지, tail 을 기다리는 (노드, 종류)]
+
+    def _emit(result):
+        if result is None:
+            return
+        if not isinstance(result, (list, tuple)):
+            result = (result,)
+        for el in result:
+            out.write(serialize(el, declared[-1], detach=True, reuse=shells[-1]))
+
+    def _settle():
+        """맨 안쪽 단계에서 부모 text 와 대기 중인 자식(+tail)을 쓴다."""
+        state = pending[-1]
+        if not state[0]:
+            state[0] = True
+            out.write(_text(opened[-1].text))
+        if state[1] is None:
+            return
+        node, kind = state[1]
+        state[1] = None
+        tail = node.tail
+        if kind == "unit":
+            _emit(transform(node) if transform is not None else node)
+        elif kind == "node":
+            out.write(etree.tostring(node, encoding="UTF-8", with_tail=False))
+        out.write(_text(tail))
+        if kind != "tail" and node.getparent() is opened[-1]:
+            opened[-1].remove(node)
+
+    out.write(XML_DECLARATION)
+    for event, elem in _parse_events(source, remove_blank_text, ("start", "end", "comment", "pi")):
+        if event in ("comment", "pi"):
+            if elem.getparent() is None:
+                if not opened:
+                    out.write(etree.tostring(elem, encoding="UTF-8", with_tail=False))  # 루트 앞뒤
+            elif opened and elem.getparent() is opened[-1]:
+                _settle()
+                pending[-1][1] = (elem, "node")
+            continue
+        if event == "start":
+            if opened and elem.getparent() is opened[-1]:
+                _settle()
+            if not opened or (elem.getparent() is opened[-1] and elem.tag in containers):
+                if on_start is not None:
+                    on_start(elem)
+                out.write(_start_tag(elem, declared[-1]))
+                opened.append(elem)
+                declared.append({**declared[-1], **dict(elem.nsmap)})
+                shells.append([])
+                pending.append([False, None])
+            continue
+        if opened and elem is opened[-1]:
+            _settle()
+            if flush is not None:
+                _emit(flush(elem))
+            out.write(_end_tag(elem))
+            opened.pop()
+            declared.pop()
+            shells.pop()
+            pending.pop()
+            if opened:
+                pending[-1][1] = (elem, "tail")
+        elif opened and elem.getparent() is opened[-1]:
+            pending[-1][1] = (elem, "unit")
+
+
+def stream_rewrite(src: Path, transform=None, containers=SHEET_CONTAINERS, on_start=None, flush=None,
+                   dst: Path = None, remove_blank_text: bool = False) -> None:
+    """파일 파트를 스트리밍으로 다시 쓴다. dst 를 주지 않으면 원본을 교체한다."""
+    target = dst or src
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        with open(tmp, "wb") as fh:
+            rewrite_stream(src, fh, transform, containers, on_start, flush, remove_blank_text)
+        tmp.replace(target)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def commit_rewrites(jobs) -> None:
+    """[(대상 경로, write(dst))] 를 모두 .new 에 쓴 뒤 한꺼번에 교체한다.
+
+    중간에 실패하면 원본은 건드리지 않아 일부 파트만 바뀐 상태로 남지 않는다.
+    """
+    pending = []
+    try:
+        for target, write in jobs:
+            out = target.with_name(target.name + ".new")
+            pending.append((out, target))
+            write(out)
+    except Exception:
+        for out, _ in pending:
+            out.unlink(missing_ok=True)
+        raise
+    for out, target in pending:
+        out.replace(target)
+
+
+def iter_sheet_parts(unpacked_dir: Path):
+    """셀 데이터를 가진 시트 파트(워크시트/매크로시트/대화상자 시트) 경로."""
+    for sub in ("worksheets", "macrosheets", "dialogsheets"):
+        d = unpacked_dir / "xl" / sub
+        if d.exists():
+            yield from sorted(d.glob("*.xml"))
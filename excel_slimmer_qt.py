@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 import threading
 from pathlib import Path
@@ -1012,4 +1013,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # PyInstaller 로 묶은 실행 파일에서 정밀 슬리머의 작업 프로세스가 다시 GUI 를 띄우지 않도록 한다.
+    multiprocessing.freeze_support()
     main()
@@ -47,11 +47,18 @@ except ModuleNotFoundError:  # ExcelCleaner 모듈이 없는 환경(예: 웹 서
 try:
     from excel_image_slimmer_gui_v3 import (
         slim_xlsx,
+        slim_xlsx_to_size,
+        sweep_image_settings,
+        pick_sweep_result,
+        SWEEP_EDGES,
+        SWEEP_QUALITIES,
         human_size,
         open_in_explorer_select,
     )
 except ModuleNotFoundError:
     slim_xlsx = None
+    slim_xlsx_to_size = None
+    sweep_image_settings = None
 
     def human_size(num: int) -> str:
         for unit in ("B", "KB", "MB", "GB", "TB"):
@@ -64,14 +71,15 @@ except ModuleNotFoundError:
         return
 
 try:
-    from excel_slimmer_precision_plus import process_file as precision_process, Progress
+    from excel_slimmer_precision_plus import process_file as precision_process, Progress, PrecisionOptions
 except ModuleNotFoundError:
     precision_process = None
     Progress = None
+    PrecisionOptions = None
 from settings import get_settings, save_settings
 
 
-def run_image_slim(input_path: Path, max_edge: int, jpeg_quality: int, progressive: bool):
+def run_image_slim(input_path: Path, max_edge: int, jpeg_quality: int, progressive: bool, target_dpi: int = 0):
     if slim_xlsx is None:
         raise RuntimeError(
             "이미지 최적화 모듈이 이 환경에 설치되어 있지 않아 '이미지 최적화' 단계를 실행할 수 없습니다."
@@ -92,10 +100,57 @@ def run_image_slim(input_path: Path, max_edge: int, jpeg_quality: int, progressi
         progressive,
         log_path,
         ui=None,
+        target_dpi=target_dpi,
     )
     return out_path, before, after, count, log_path
 
 
+def run_image_sweep(input_path: Path, max_edge: int, jpeg_quality: int, min_ssim: float, log):
+    """최대 해상도/품질 조합을 비교해 표를 log 로 출력하고, 이번 실행에 쓸 (max_edge, jpeg_quality) 를 돌려준다."""
+
+    log_path = input_path.with_name(input_path.stem + "_image_sweep.log")
+    try:
+        # 현재 설정값도 표에 넣어 기준선으로 비교한다.
+        edges = sorted({max_edge, *SWEEP_EDGES}, reverse=True)
+        qualities = sorted({jpeg_quality, *SWEEP_QUALITIES}, reverse=True)
+        results = sweep_image_settings(input_path, log_path, edges=edges, qualities=qualities)
+        for line in log_path.read_text(encoding="utf-8").splitlines():
+            log(" - " + line)
+    except Exception as e:  # noqa: BLE001
+        log(f"[WARN] 파라미터 스윕 실패, 설정값 사용: {e}")
+        return max_edge, jpeg_quality
+    finally:
+        log_path.unlink(missing_ok=True)
+
+    if min_ssim > 0:
+        best = pick_sweep_result(results, min_ssim)
+        if best is None:
+            log(f"[INFO] SSIM {min_ssim:g} 이상인 조합이 없어 설정값을 사용합니다.")
+        else:
+            log(
+                f"[INFO] 스윕 결과 적용: 최대 해상도 {best.max_edge}px, JPEG 품질 {best.quality}"
+                f" (예상 {human_size(best.size)}, SSIM {best.ssim:.4f})"
+            )
+            return best.max_edge, best.quality
+    return max_edge, jpeg_quality
+
+
+def run_target_size(input_path: Path, target_bytes: int, progressive: bool):
+    if slim_xlsx_to_size is None:
+        raise RuntimeError(
+            "이미지 최적화 모듈이 이 환경에 설치되어 있지 않아 '목표 크기 맞춤' 단계를 실행할 수 없습니다."
+        )
+
+    out_path = input_path.with_stem(input_path.stem + "_fit")
+    idx = 1
+    while out_path.exists():
+        out_path = input_path.with_stem(input_path.stem + f"_fit({idx})")
+        idx += 1
+    log_path = input_path.with_name(input_path.stem + "_target_size.log")
+    before, after, choices = slim_xlsx_to_size(input_path, out_path, target_bytes, progressive, log_path, ui=None)
+    return out_path, before, after, choices, log_path
+
+
 def run_precision_step(
     input_path: Path,
     aggressive: bool,
@@ -109,6 +164,7 @@ def run_precision_step(
             "Precision Plus 모듈이 이 환경에 설치되어 있지 않아 '정밀 슬리머' 단계를 실행할 수 없습니다."
         )
 
+    settings = get_settings()
     overall = Progress(None, None)
     file_prog = Progress(None, None)
     summary = {"files": [], "saved_bytes": 0, "original_bytes": 0}
@@ -122,6 +178,8 @@ def run_precision_step(
         overall,
         file_prog,
         summary,
+        # 구조 최적화 단계는 XML 정리 옵션이 켜져 있을 때만 수행한다.
+        options=PrecisionOptions.from_settings(settings, do_xml_cleanup),
     )
     if summary["files"]:
         _, outname, old_b, new_b, saved_mb, pct = summary["files"][-1]
@@ -175,6 +233,9 @@ def run_pipeline_core(
         steps.append("image")
     if use_precision:
         steps.append("precision")
+    # 목표 크기 맞춤은 다른 단계가 모두 끝난 결과에 대해 마지막에 실행한다.
+    if settings.target_size_mb > 0:
+        steps.append("target")
 
     total = len(steps)
     log_info(f"[INFO] 파이프라인 시작: {start_path.name}, 단계 {total}개")
@@ -219,6 +280,10 @@ def run_pipeline_core(
                 # 설정에서 이미지 리사이즈/품질 값을 가져온다 (슬라이더와 연동).
                 max_edge = max(200, min(settings.image_max_edge, 10000))
                 jpeg_quality = max(10, min(settings.image_quality, 100))
+                if settings.image_sweep and sweep_image_settings is not None:
+                    max_edge, jpeg_quality = run_image_sweep(
+                        current, max_edge, jpeg_quality, settings.image_sweep_min_ssim, log_info
+                    )
                 (
                     out_path,
                     before,
@@ -230,6 +295,7 @@ def run_pipeline_core(
                     max_edge=max_edge,
                     jpeg_quality=jpeg_quality,
                     progressive=True,
+                    target_dpi=max(0, min(settings.image_target_dpi, 600)),
                 )
                 current = out_path
                 if step != steps[-1]:
@@ -281,6 +347,31 @@ def run_pipeline_core(
                     + human_size(new_b)
                     + f", Saved: {saved_mb:.2f} MB ({pct:.1f}%)"
                 )
+            elif step == "target":
+                target_bytes = int(settings.target_size_mb * 1024 * 1024)
+                set_status("목표 크기 맞추는 중...", base)
+                log_info(f"[{index}/{total}] 목표 크기 맞춤 ({settings.target_size_mb:g} MB 이하): {current.name}")
+                if current.stat().st_size <= target_bytes:
+                    log_info(f" - 이미 목표 크기 이하입니다 ({human_size(current.stat().st_size)}).")
+                else:
+                    (
+                        out_path,
+                        before,
+                        after,
+                        choices,
+                        log_path,
+                    ) = run_target_size(current, target_bytes, progressive=True)
+                    current = out_path
+                    if step != steps[-1]:
+                        intermediate_files.append(current)
+                    for name, edge, quality, size in choices:
+                        label = "PNG" if quality is None else f"JPEG 품질 {quality}"
+                        log_info(f" - {name}: 최대 변 {edge}px, {label} -> {human_size(size)}")
+                    log_info(" - Before: " + human_size(before) + ", After: " + human_size(after))
+                    if after > target_bytes:
+                        log_info("[WARN] 이미지를 최소 설정까지 줄여도 목표 크기에 도달하지 못했습니다.")
+                    log_detail(f" - 로그: {log_path}")
+                    log_files.append(log_path)
 
             set_status("진행 중...", next_p)
         except Exception as e:  # noqa: BLE001
@@ -47,6 +47,45 @@ class AppSettings:
     # 이미지 관련 기본값 (추후 슬라이더와 연동 예정)
     image_max_edge: int = 1400
     image_quality: int = 80
+    # 시트에 표시되는 크기(이 DPI 기준)보다 큰 이미지는 표시 크기로 축소 (0 이면 사용 안 함)
+    image_target_dpi: int = 144
+    # 최종 파일을 이 크기(MB) 이하로 맞추는 단계 (이미지 해상도/품질을 자동 탐색, 0 이면 사용 안 함)
+    target_size_mb: float = 0.0
+    # 이미지 단계 전에 최대 해상도/JPEG 품질 조합별 크기와 SSIM/PSNR 을 비교해 로그에 표로 출력 (numpy 필요)
+    image_sweep: bool = False
+    # 0 보다 크면 평균 SSIM 이 이 값 이상인 조합 중 가장 작은 것을 이번 실행에 적용 (0 이면 표만 출력)
+    image_sweep_min_ssim: float = 0.0
+    # 포함된 xlsx/docx/pptx 패키지 안의 이미지도 최적화 (작업 프로세스에서 실행, 선택 기능, 기본 꺼짐)
+    precision_optimize_embedded_packages: bool = False
+    # vbaProject.bin 의 p-code/캐시 스트림과 빈 섹터 제거 (선택 기능, 기본 꺼짐)
+    precision_compact_vba: bool = False
+
+    # 정밀 슬리머 구조 최적화 단계 (XML 정리 옵션이 켜져 있을 때 적용)
+    precision_inline_to_shared_strings: bool = True
+    precision_compact_shared_strings: bool = True
+    # 같은 외부 주소의 하이퍼링크 관계 병합 + 시트 관계 Id 재번호 (선택 기능, 기본 꺼짐)
+    precision_dedupe_sheet_rels: bool = False
+    # 기본 서식만 가진 빈 셀/행 제거, 같은 열 정의 병합, <dimension> 갱신 (선택 기능, 기본 꺼짐)
+    precision_trim_used_range: bool = False
+    # 같은 조건부 서식/데이터 유효성 조각을 합치고 상대 수식 기준 셀 이동 (선택 기능, 기본 꺼짐)
+    precision_consolidate_cf_dv: bool = False
+    # 중복/미사용 셀 서식과 사용자 셀 스타일 제거 후 인덱스 재매핑 (선택 기능, 기본 꺼짐)
+    precision_compact_styles: bool = False
+    # 반복 수식을 공유 수식으로 합성 (선택 기능, 기본 꺼짐)
+    precision_share_formulas: bool = False
+    # 수식 셀의 캐시 값(<v>) 제거 + 열 때 전체 재계산 (선택 기능, 기본 꺼짐)
+    precision_strip_formula_values: bool = False
+    # 피벗 캐시 레코드 제거 + 열 때 새로 고침 (선택 기능, 기본 꺼짐)
+    precision_strip_pivot_cache: bool = False
+    # 외부 링크에 저장된 다른 통합 문서 값 캐시 제거 (선택 기능, 기본 꺼짐)
+    precision_strip_external_link_cache: bool = False
+    # 차트 numCache/strCache 제거 + 같은 차트 스타일/색 파트 병합 (선택 기능, 기본 꺼짐)
+    precision_strip_chart_cache: bool = False
+    # 크기 0/숨김/겹친 복사본 도형 제거 (숨김 도형을 매크로로 켜는 파일이 있어 기본 꺼짐)
+    precision_purge_drawing_objects: bool = False
+    precision_minify_xml: bool = True
+    # XML 축소 시 spans / x14ac:dyDescent 같은 선택 속성까지 제거할지 여부
+    precision_minify_drop_optional_attrs: bool = True
 
     # 로그/테마 관련 기본값 (추후 확장 예정)
     log_mode: Literal["minimal", "verbose"] = "verbose"
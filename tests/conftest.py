@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 파이프라인과 같은 방식으로 루트와 backData 폴더를 import 경로에 추가한다.
+for path in (ROOT, ROOT / "backData"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from excel_image_codecs import (
+    PHOTO_MAX_FLAT_RATIO, PHOTO_MIN_ENTROPY, ROUTE_JPEG, ROUTE_PALETTE, ROUTE_TRUECOLOR, SSIM_WINDOW, classify_image,
+    encode_for_route, luminance, ssim_psnr, ssim_reference,
+)
+
+
+def _photo(size=(240, 160), seed=45):
+    """완만한 색 변화에 잡음을 얹은 사진 같은 RGB 배열."""
+    w, h = size
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.dstack([x * 255 / w, y * 255 / h, (x + y) * 127 / (w + h) + 64])
+    noise = np.random.default_rng(seed).normal(0, 12, base.shape)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def _screenshot():
+    """흰 바탕에 글자 같은 선과, 색이 많은 작은 그라데이션 막대가 있는 화면 캡처."""
+    rgb = np.full((160, 240, 3), 255, np.uint8)
+    rgb[20:22, 10:230] = 0
+    rgb[40:140:6, 20:200] = (30, 30, 90)
+    rgb[150:160, :] = _photo((240, 10))
+    return rgb
+
+
+def _palette():
+    """색 6개(반투명 1개 포함)로 그린 도표."""
+    rgba = np.zeros((120, 200, 4), np.uint8)
+    rgba[...] = (255, 255, 255, 255)
+    for i, color in enumerate([(200, 30, 30, 255), (30, 160, 30, 255), (30, 30, 200, 255), (0, 0, 0, 255)]):
+        rgba[10 + i * 25:30 + i * 25, 20:20 + (i + 1) * 40] = color
+    rgba[100:120, 150:200] = (255, 200, 0, 128)
+    return Image.fromarray(rgba, "RGBA")
+
+
+@pytest.mark.parametrize("image,route,ext", [
+    (_palette(), ROUTE_PALETTE, ".png"),
+    (Image.fromarray(_screenshot()), ROUTE_TRUECOLOR, ".png"),
+    (Image.fromarray(np.dstack([_photo(), np.full((160, 240), 200, np.uint8)]), "RGBA"), ROUTE_TRUECOLOR, ".png"),
+    (Image.fromarray(_photo()), ROUTE_JPEG, ".jpeg"),
+], ids=["palette", "screenshot", "transparent-photo", "photo"])
+def test_classify_image_picks_route(image, route, ext):
+    profile = classify_image(image)
+    assert profile.route == route
+    new_ext, data = encode_for_route(image, profile, jpeg_quality=80)
+    assert new_ext == ext
+    with Image.open(io.BytesIO(data)) as decoded:
+        assert decoded.size == image.size
+        if route != ROUTE_JPEG:
+            # 팔레트/트루컬러 PNG 는 색(알파 포함)을 그대로 보존한다.
+            assert np.array_equal(np.asarray(decoded.convert("RGBA")), np.asarray(image.convert("RGBA")))
+
+
+def test_classify_image_profile_values():
+    profile = classify_image(_palette())
+    assert profile.unique_colors == 6
+    assert not profile.opaque
+    # 화면 캡처는 색이 많아도 평탄한 영역 때문에 사진으로 보지 않는다.
+    screenshot = classify_image(Image.fromarray(_screenshot()))
+    assert screenshot.unique_colors > 256 and screenshot.flat_ratio > PHOTO_MAX_FLAT_RATIO
+    photo = classify_image(Image.fromarray(_photo()))
+    assert photo.opaque and photo.unique_colors > 256
+    assert photo.flat_ratio <= PHOTO_MAX_FLAT_RATIO and photo.entropy >= PHOTO_MIN_ENTROPY
+
+
+def test_ssim_is_one_for_identical_images_and_falls_with_noise():
+    ref = luminance(Image.fromarray(_photo()))
+    assert ssim_psnr(ref, ref.copy()) == (1.0, float("inf"))
+
+    stats = ssim_reference(ref)
+    rng = np.random.default_rng(50)
+    scores = []
+    for sigma in (2, 8, 24, 64):
+        noisy = np.clip(ref + rng.normal(0, sigma, ref.shape), 0, 255)
+        # 미리 계산한 기준 통계를 넘겨도 결과는 같다.
+        assert ssim_psnr(ref, noisy, stats) == pytest.approx(ssim_psnr(ref, noisy))
+        scores.append(ssim_psnr(ref, noisy, stats))
+    ssims, psnrs = zip(*scores)
+    assert 0 < ssims[-1] < ssims[2] < ssims[1] < ssims[0] < 1
+    assert list(psnrs) == sorted(psnrs, reverse=True)
+
+
+def test_ssim_on_images_smaller_than_window():
+    ref = np.full((SSIM_WINDOW - 1, 40), 128, np.float32)
+    assert ssim_psnr(ref, ref.copy())[0] == 1.0
+    assert ssim_psnr(ref, ref + 1)[0] == 0.0
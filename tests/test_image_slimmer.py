@@ -0,0 +1,214 @@
+import io
+import sys
+import zipfile
+
+import numpy as np
+import openpyxl
+from lxml import etree
+from openpyxl.drawing.image import Image as XlImage
+from PIL import Image
+
+from excel_image_slimmer_gui_v3 import (
+    NS_A, NS_XDR, SweepResult, collect_display_sizes, main as image_slimmer_main, pick_sweep_result, slim_xlsx,
+    sweep_image_settings,
+)
+from excel_slimmer_precision_plus import rezip_max_compress, unzip_to_temp
+from xlsx_fixtures import (
+    NS_R, SHEET_RELS, add_part, add_relationship, content_types, names, part, relationships, replace_in, values,
+)
+
+DRAWING = "xl/drawings/drawing1.xml"
+
+
+def _picture_workbook(tmp_path, pictures):
+    """pictures: [(이미지 크기, 셀, 표시 크기(px, 96 DPI))] 를 차례로 넣은 통합 문서 파일."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "pictures"
+    for i, (size, anchor, shown) in enumerate(pictures, start=1):
+        path = tmp_path / f"p{i}.png"
+        Image.new("RGB", size, (40 * i, 80, 120)).save(path)
+        img = XlImage(str(path))
+        img.width, img.height = shown
+        ws.add_image(img, anchor)
+    out = tmp_path / "pictures.xlsx"
+    wb.save(out)
+    return out
+
+
+def _unpacked(tmp_path, src, edit=None):
+    unpacked = unzip_to_temp(src, tmp_path)
+    if edit is not None:
+        edit(unpacked)
+    return unpacked
+
+
+def test_display_sizes_follow_anchor_extent_and_crop(tmp_path):
+    src = _picture_workbook(tmp_path, [((400, 200), "B2", (200, 100)),
+                                       ((400, 200), "F2", (100, 50)),
+                                       ((400, 200), "J2", (50, 25))])
+
+    def _crop_and_share(unpacked):
+        # 그림 2 는 가로 절반만 보이게 자르고, 그림 3 의 이미지는 시트 배경으로도 쓴다.
+        replace_in(unpacked / DRAWING, 'r:embed="rId2"/>', f'r:embed="rId2"/><a:srcRect xmlns:a="{NS_A}" l="25000" r="25000"/>')
+        add_relationship(unpacked, SHEET_RELS, "rId9", f"{NS_R}/image", "/xl/media/image3.png")
+
+    unpacked = _unpacked(tmp_path, src, _crop_and_share)
+    media = unpacked / "xl" / "media"
+    # 96 DPI 로 표시된 크기를 144 DPI 로 환산하고, 잘린 그림은 보이는 비율만큼 원본 전체 크기로 되돌린다.
+    assert collect_display_sizes(unpacked, 144) == {media / "image1.png": (300, 150), media / "image2.png": (300, 75)}
+    assert collect_display_sizes(unpacked, 0) == {}
+
+
+def _anchors(path):
+    """도형 파트의 그림 앵커별 (표시 크기 (cx, cy), srcRect 유무)."""
+    root = etree.fromstring(part(path, DRAWING).encode())
+    return [((ext.get("cx"), ext.get("cy")), anchor.find(f".//{{{NS_A}}}srcRect") is not None)
+            for anchor in root.iterchildren(f"{{{NS_XDR}}}oneCellAnchor")
+            for ext in [anchor.find(f"{{{NS_XDR}}}ext")]]
+
+
+def _media_image(path, name):
+    with zipfile.ZipFile(path) as zf:
+        with Image.open(io.BytesIO(zf.read(name))) as im:
+            return im.convert("RGB")
+
+
+def test_crop_is_baked_into_media_and_extent_kept(tmp_path):
+    src = _picture_workbook(tmp_path, [((400, 200), "B2", (200, 100)), ((400, 200), "F2", (200, 100))])
+
+    def _stripes_and_crop(unpacked):
+        # 가운데 절반만 초록인 이미지를 가운데 절반만 보이게 자른다.
+        stripes = Image.new("RGB", (400, 200), "red")
+        stripes.paste((0, 160, 0), (100, 0, 300, 200))
+        stripes.save(unpacked / "xl/media/image1.png", compress_level=0)
+        replace_in(unpacked / DRAWING, 'r:embed="rId1"/>', f'r:embed="rId1"/><a:srcRect xmlns:a="{NS_A}" l="25000" r="25000"/>')
+
+    unpacked = _unpacked(tmp_path, src, _stripes_and_crop)
+    before = tmp_path / "before.xlsx"
+    rezip_max_compress(unpacked, before)
+    after = tmp_path / "after.xlsx"
+    slim_xlsx(before, after, 4000, 85, True, tmp_path / "log.txt")
+
+    anchors_before, anchors_after = _anchors(before), _anchors(after)
+    assert [crop for _, crop in anchors_before] == [True, False]
+    # 표시 크기는 그대로이고, srcRect 는 이미지에 적용된 뒤 사라진다.
+    assert [ext for ext, _ in anchors_after] == [ext for ext, _ in anchors_before]
+    assert [crop for _, crop in anchors_after] == [False, False]
+    cropped = _media_image(after, "xl/media/image1.png")
+    assert cropped.size == (200, 200)
+    assert cropped.getcolors() == [(200 * 200, (0, 160, 0))]
+    assert _media_image(after, "xl/media/image2.png").size == (400, 200)
+    assert len(openpyxl.load_workbook(after).active._images) == 2
+
+
+def test_converted_bmp_stays_referenced(tmp_path):
+    src = _picture_workbook(tmp_path, [((120, 80), "B2", (120, 80)), ((300, 200), "F2", (150, 100))])
+
+    def _bmp_media(unpacked):
+        # 그림 2 를 BMP 로 바꾸고, 같은 이미지를 가리키는 VML 도 하나 둔다.
+        media = unpacked / "xl/media"
+        with Image.open(media / "image2.png") as im:
+            im.save(media / "image2.bmp")
+        (media / "image2.png").unlink()
+        replace_in(unpacked / "xl/drawings/_rels/drawing1.xml.rels", "/xl/media/image2.png", "/xl/media/image2.bmp")
+        replace_in(unpacked / "[Content_Types].xml", "<Default Extension=\"png\"",
+                   '<Default Extension="bmp" ContentType="image/bmp"/><Default Extension="png"')
+        add_part(unpacked, "xl/drawings/vmlDrawing1.vml",
+                 '<xml xmlns:v="urn:schemas-microsoft-com:vml"><v:shape id="_x0000_s1025">'
+                 '<v:imagedata src="../media/image2.bmp"/></v:shape></xml>')
+
+    unpacked = _unpacked(tmp_path, src, _bmp_media)
+    before = tmp_path / "before.xlsx"
+    rezip_max_compress(unpacked, before)
+    after = tmp_path / "after.xlsx"
+    slim_xlsx(before, after, 4000, 85, True, tmp_path / "log.txt")
+
+    media = {n for n in names(after) if n.startswith("xl/media/")}
+    assert "xl/media/image2.bmp" not in media
+    targets = {t.lstrip("/") for _, t, _ in relationships(after, "xl/drawings/_rels/drawing1.xml.rels").values()}
+    # 바뀐 이름이 관계, VML, [Content_Types].xml 에 함께 반영된다.
+    assert targets == media
+    (converted,) = media - {"xl/media/image1.png"}
+    assert f"../media/{converted.rsplit('/', 1)[1]}" in part(after, "xl/drawings/vmlDrawing1.vml")
+    defaults, overrides = content_types(after)
+    assert "bmp" not in defaults
+    assert {n.rsplit(".", 1)[1] for n in media} <= set(defaults)
+    assert not any(name.startswith("/xl/media/") for name in overrides)
+    assert _media_image(after, converted).size == (300, 200)
+    assert len(openpyxl.load_workbook(after).active._images) == 2
+
+
+def _photo_file(path, size, seed, **params):
+    w, h = size
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.dstack([x * 255 / w, y * 255 / h, (x + y) * 127 / (w + h) + 64])
+    noise = np.random.default_rng(seed).normal(0, 20, base.shape)
+    Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).save(path, **params)
+    return path
+
+
+def test_target_mode_fits_under_target_mb(tmp_path, monkeypatch):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "photos"
+    files = [_photo_file(tmp_path / "a.jpg", (1200, 900), 1, quality=95),
+             _photo_file(tmp_path / "b.jpg", (900, 600), 2, quality=95),
+             _photo_file(tmp_path / "c.png", (640, 480), 3)]
+    for path, anchor in zip(files, ("B2", "L2", "B40")):
+        ws.add_image(XlImage(str(path)), anchor)
+    src = tmp_path / "photos.xlsx"
+    wb.save(src)
+    target_mb = 0.5
+    assert src.stat().st_size > 3 * target_mb * 1024 * 1024
+
+    monkeypatch.setattr(sys, "argv", ["excel_image_slimmer_gui_v3", str(src), "--target-mb", str(target_mb)])
+    image_slimmer_main()
+
+    out = tmp_path / "photos_slim.xlsx"
+    assert out.stat().st_size <= target_mb * 1024 * 1024
+    # 형식이 바뀐 이미지도 관계와 콘텐츠 형식에서 그대로 찾을 수 있어야 한다.
+    media = {n for n in names(out) if n.startswith("xl/media/")}
+    targets = {t.lstrip("/") for _, t, _ in relationships(out, "xl/drawings/_rels/drawing1.xml.rels").values()}
+    assert targets == media and len(media) == 3
+    assert {n.rsplit(".", 1)[1] for n in media} <= set(content_types(out)[0])
+    assert values(out) == values(src)
+    assert len(openpyxl.load_workbook(out).active._images) == 3
+    assert "[TARGET] pass" in (tmp_path / "photos.log").read_text(encoding="utf-8")
+
+
+def test_sweep_results_are_sorted_and_marked_pareto(tmp_path):
+    wb = openpyxl.Workbook()
+    for path, anchor in ((_photo_file(tmp_path / "a.jpg", (800, 600), 1, quality=95), "B2"),
+                         (_photo_file(tmp_path / "b.png", (400, 300), 2), "L2")):
+        wb.active.add_image(XlImage(str(path)), anchor)
+    src = tmp_path / "photos.xlsx"
+    wb.save(src)
+    log = tmp_path / "sweep.log"
+
+    results = sweep_image_settings(src, log, edges=(200, 800), qualities=(50, 90), max_workers=1)
+
+    assert sorted((r.max_edge, r.quality) for r in results) == [(200, 50), (200, 90), (800, 50), (800, 90)]
+    assert [r.size for r in results] == sorted(r.size for r in results)
+    assert results[0].size < src.stat().st_size
+    assert all(0 < r.min_ssim <= r.ssim <= 1 for r in results)
+    by_pair = {(r.max_edge, r.quality): r for r in results}
+    assert by_pair[800, 90].ssim > by_pair[800, 50].ssim > by_pair[200, 50].ssim
+    # 파레토 표시: 더 작은 조합보다 SSIM 이 높은 조합만 남는다.
+    best = -1.0
+    for r in results:
+        assert r.pareto == (r.ssim > best)
+        best = max(best, r.ssim)
+    assert results[0].pareto
+    assert "[SWEEP] 2 image(s), 4 parameter set(s)" in log.read_text(encoding="utf-8")
+
+
+def test_pick_sweep_result_takes_smallest_above_min_ssim():
+    results = [SweepResult(400, 60, 100, 0.90, 0.85, 30.0), SweepResult(800, 60, 150, 0.97, 0.95, 36.0),
+               SweepResult(400, 90, 150, 0.98, 0.96, 38.0), SweepResult(800, 90, 200, 0.99, 0.98, 42.0)]
+    assert pick_sweep_result(results, 0.0) is results[0]
+    # 크기가 같으면 SSIM 이 높은 쪽을 고른다.
+    assert pick_sweep_result(results, 0.95) is results[2]
+    assert pick_sweep_result(results, 0.99) is results[3]
+    assert pick_sweep_result(results, 0.995) is None
+    assert pick_sweep_result([], 0.5) is None
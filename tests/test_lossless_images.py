@@ -0,0 +1,156 @@
+import io
+import time
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+import excel_png_lossless
+from excel_jpeg_lossless import HUFFMAN_MAX_PIXELS, jpeg_source_info, optimize_jpeg_lossless
+from excel_png_lossless import _filter_candidates, _read_chunks, optimize_png_lossless
+from excel_slimmer_precision_plus import JPEG_QUALITY_SAFE, recompress_images_with_sync
+
+
+def _photo(mode="RGB", size=(96, 64), noise=24):
+    rnd = np.random.default_rng(26)
+    h, w = size[1], size[0]
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.stack([x * 255 // w, y * 255 // h, (x + y) * 255 // (w + h)], axis=-1)
+    if noise:
+        base = base + rnd.integers(0, noise, size=base.shape)
+    im = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8), "RGB")
+    if mode == "RGBA":
+        im.putalpha(Image.fromarray((x * 255 // w).astype(np.uint8), "L"))
+    elif mode != "RGB":
+        im = im.convert(mode)
+    return im
+
+
+def _pixels(data):
+    with Image.open(io.BytesIO(data)) as im:
+        return im.mode, im.getpalette(), np.asarray(im).copy()
+
+
+def _jpeg(im, **params):
+    buf = io.BytesIO()
+    im.save(buf, "JPEG", **params)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("subsampling", [0, 2])
+def test_jpeg_lossless_keeps_pixels(subsampling):
+    exif = Image.Exif()
+    exif[0x010E] = "description " * 40  # ImageDescription
+    data = _jpeg(_photo(), quality=88, subsampling=subsampling, exif=exif, comment=b"c" * 200)
+
+    out = optimize_jpeg_lossless(data)
+    # 허프만 테이블까지 다시 쓴 결과는 메타데이터만 지운 결과보다 작다.
+    assert out is not None and len(out) < len(optimize_jpeg_lossless(data, huffman=False))
+    before, after = _pixels(data), _pixels(out)
+    assert before[0] == after[0]
+    assert np.array_equal(before[2], after[2])
+
+
+def test_jpeg_huffman_skipped_when_target_decides():
+    data = _jpeg(_photo(size=(320, 240)), quality=85, comment=b"c" * 200)
+    stripped = optimize_jpeg_lossless(data, huffman=False)
+    full = optimize_jpeg_lossless(data)
+    assert len(full) < len(stripped)
+    # 마커 정리만으로 target 이하이거나, 재부호화로도 target 에 못 미치면 재부호화하지 않는다.
+    assert optimize_jpeg_lossless(data, target=len(stripped)) == stripped
+    assert optimize_jpeg_lossless(data, target=len(stripped) // 2) == stripped
+    assert optimize_jpeg_lossless(data, target=len(full)) == full
+
+
+def test_jpeg_lossless_time_guard():
+    # 상한을 넘는 큰 사진은 순수 파이썬 허프만 재부호화 없이 마커만 정리하므로 빠르다.
+    big = _photo(size=(4000, 3000), noise=0)
+    assert big.width * big.height > HUFFMAN_MAX_PIXELS
+    data = _jpeg(big, quality=85, comment=b"c" * 200)
+    start = time.perf_counter()
+    out = optimize_jpeg_lossless(data)
+    assert time.perf_counter() - start < 0.5
+    assert out == optimize_jpeg_lossless(data, huffman=False)
+
+    # 상한 이하의 이미지는 재부호화해도 몇 초 안에 끝난다 (2MP 약 0.5초).
+    side = int(HUFFMAN_MAX_PIXELS ** 0.5)
+    data = _jpeg(_photo(size=(side, side)), quality=85)
+    start = time.perf_counter()
+    assert optimize_jpeg_lossless(data) is not None
+    assert time.perf_counter() - start < 5.0
+
+
+def _png(im, **params):
+    buf = io.BytesIO()
+    im.save(buf, "PNG", **params)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("numpy_ok", [True, False], ids=["numpy", "stdlib"])
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L", "P"])
+def test_png_lossless_keeps_pixels(mode, numpy_ok, monkeypatch):
+    monkeypatch.setattr(excel_png_lossless, "NUMPY_OK", numpy_ok)
+    info = PngInfo()
+    info.add_text("Comment", "text chunk " * 30)
+    data = _png(_photo(mode), compress_level=1, pnginfo=info)
+
+    out = optimize_png_lossless(data)
+    assert out is not None and len(out) < len(data)
+    before, after = _pixels(data), _pixels(out)
+    assert before[:2] == after[:2]
+    assert np.array_equal(before[2], after[2])
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L"])
+def test_png_filters_reselected_from_adaptive_rows(mode):
+    # Pillow 는 행마다 Sub/Up/Average/Paeth 중 하나를 고르므로, 되돌릴 수 있어야 필터를 다시 고를 수 있다.
+    im = _photo(mode, size=(97, 61))
+    data = _png(im)
+    chunks = _read_chunks(data)
+    raw = zlib.decompress(b"".join(body for ctype, body in chunks if ctype == b"IDAT"))
+    kinds = set(raw[::len(raw) // im.height])
+    assert kinds & {3, 4}
+
+    candidates = _filter_candidates(raw, chunks[0][1])
+    assert len(candidates) == 2
+    assert candidates[0][::len(candidates[0]) // im.height] == bytes(im.height)
+    assert np.array_equal(np.frombuffer(candidates[0], np.uint8).reshape(im.height, -1)[:, 1:].reshape(-1),
+                          np.asarray(im).reshape(-1))
+    out = optimize_png_lossless(data)
+    if out is not None:
+        assert np.array_equal(_pixels(out)[2], np.asarray(im))
+
+
+@pytest.mark.parametrize("quality", [30, 60, 75, 85, 95])
+@pytest.mark.parametrize("subsampling,expected", [(0, "4:4:4"), (1, "4:2:2"), (2, "4:2:0")])
+def test_jpeg_source_info_estimates_quality_and_sampling(quality, subsampling, expected):
+    data = _jpeg(_photo(), quality=quality, subsampling=subsampling)
+    estimated, sampling = jpeg_source_info(data)
+    # Pillow(libjpeg) 가 쓴 테이블이므로 IJG 품질로 거의 정확히 되돌아간다.
+    assert abs(estimated - quality) <= 1
+    assert sampling == expected
+
+
+def test_jpeg_source_info_gray_and_invalid():
+    assert jpeg_source_info(_jpeg(_photo("L"), quality=70)) == (70, "gray")
+    assert jpeg_source_info(b"not a jpeg") is None
+
+
+def test_safe_mode_skips_reencoding_low_quality_jpeg(tmp_path):
+    media = tmp_path / "xl" / "media"
+    media.mkdir(parents=True)
+    low = _jpeg(_photo(size=(160, 120)), quality=70, subsampling=2, comment=b"c" * 500)
+    high = _jpeg(_photo(size=(160, 120)), quality=95, subsampling=0)
+    (media / "low.jpeg").write_bytes(low)
+    (media / "high.jpeg").write_bytes(high)
+
+    recompress_images_with_sync(tmp_path, aggressive=False)
+
+    # 원본 품질이 안전 품질 이하인 4:2:0 JPEG 은 픽셀을 그대로 두고 무손실 최적화만 한다.
+    low_after = (media / "low.jpeg").read_bytes()
+    assert len(low_after) < len(low)
+    assert np.array_equal(_pixels(low_after)[2], _pixels(low)[2])
+    # 그 외에는 min(원본 품질, 안전 품질) 로 다시 인코딩한다.
+    assert jpeg_source_info((media / "high.jpeg").read_bytes())[0] == JPEG_QUALITY_SAFE
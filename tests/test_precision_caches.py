@@ -0,0 +1,124 @@
+import openpyxl
+
+from excel_slimmer_precision_plus import strip_external_link_cache, strip_pivot_cache_records
+from excel_xml_stream import NS_MAIN
+from xlsx_fixtures import (
+    NS_R, SHEET_RELS, add_part, add_relationship, content_types, names, part, relationships, replace_in, slim, values,
+)
+
+CT_PIVOT = "application/vnd.openxmlformats-officedocument.spreadsheetml.pivot"
+PIVOT_DEF = "xl/pivotCache/pivotCacheDefinition1.xml"
+PIVOT_RECORDS = "xl/pivotCache/pivotCacheRecords1.xml"
+
+
+def _source_workbook():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["k", "v"])
+    ws.append(["a", 1])
+    ws.append(["b", 2])
+    return wb
+
+
+def _add_pivot(unpacked):
+    """A1:B3 를 원본으로 하는 피벗 표(D1)와 캐시 정의/레코드 파트를 추가한다."""
+    add_part(unpacked, PIVOT_DEF, (
+        f'<pivotCacheDefinition xmlns="{NS_MAIN}" xmlns:r="{NS_R}" r:id="rId1" refreshOnLoad="0" recordCount="2">'
+        '<cacheSource type="worksheet"><worksheetSource ref="A1:B3" sheet="Sheet"/></cacheSource>'
+        '<cacheFields count="2">'
+        '<cacheField name="k" numFmtId="0"><sharedItems count="2"><s v="a"/><s v="b"/></sharedItems></cacheField>'
+        '<cacheField name="v" numFmtId="0"><sharedItems containsSemiMixedTypes="0" containsString="0" '
+        'containsNumber="1" containsInteger="1" minValue="1" maxValue="2"/></cacheField>'
+        '</cacheFields></pivotCacheDefinition>'
+    ), f"{CT_PIVOT}CacheDefinition+xml")
+    add_part(unpacked, PIVOT_RECORDS, (
+        f'<pivotCacheRecords xmlns="{NS_MAIN}" count="2">'
+        '<r><x v="0"/><n v="1"/></r><r><x v="1"/><n v="2"/></r></pivotCacheRecords>'
+    ), f"{CT_PIVOT}CacheRecords+xml")
+    add_part(unpacked, "xl/pivotTables/pivotTable1.xml", (
+        f'<pivotTableDefinition xmlns="{NS_MAIN}" name="PT" cacheId="1" dataCaption="Values" '
+        'updatedVersion="6" minRefreshableVersion="3" createdVersion="6" outline="1" outlineData="1">'
+        '<location ref="D1:E4" firstHeaderRow="1" firstDataRow="1" firstDataCol="1"/>'
+        '<pivotFields count="2"><pivotField axis="axisRow" showAll="0"><items count="3">'
+        '<item x="0"/><item x="1"/><item t="default"/></items></pivotField>'
+        '<pivotField dataField="1" showAll="0"/></pivotFields>'
+        '<rowFields count="1"><field x="0"/></rowFields>'
+        '<rowItems count="3"><i><x/></i><i><x v="1"/></i><i t="grand"><x/></i></rowItems>'
+        '<colItems count="1"><i/></colItems>'
+        '<dataFields count="1"><dataField name="Sum of v" fld="1" baseField="0" baseItem="0"/></dataFields>'
+        '</pivotTableDefinition>'
+    ), f"{CT_PIVOT}Table+xml")
+    add_relationship(unpacked, "xl/pivotCache/_rels/pivotCacheDefinition1.xml.rels", "rId1",
+                     f"{NS_R}/pivotCacheRecords", "pivotCacheRecords1.xml")
+    add_relationship(unpacked, "xl/pivotTables/_rels/pivotTable1.xml.rels", "rId1",
+                     f"{NS_R}/pivotCacheDefinition", "../pivotCache/pivotCacheDefinition1.xml")
+    add_relationship(unpacked, SHEET_RELS, "rId1", f"{NS_R}/pivotTable", "../pivotTables/pivotTable1.xml")
+    add_relationship(unpacked, "xl/_rels/workbook.xml.rels", "rId90", f"{NS_R}/pivotCacheDefinition",
+                     "pivotCache/pivotCacheDefinition1.xml")
+    replace_in(unpacked / "xl/workbook.xml", "</workbook>",
+               f'<pivotCaches><pivotCache xmlns:r="{NS_R}" cacheId="1" r:id="rId90"/></pivotCaches></workbook>')
+
+
+def test_strip_pivot_cache_records_keeps_pivot_table(tmp_path):
+    before, after = slim(tmp_path, _source_workbook(), [strip_pivot_cache_records], edit=_add_pivot)
+
+    assert PIVOT_RECORDS in names(before)
+    assert PIVOT_RECORDS not in names(after)
+    assert f"/{PIVOT_RECORDS}" not in content_types(after)[1]
+    assert relationships(after, "xl/pivotCache/_rels/pivotCacheDefinition1.xml.rels") == {}
+    definition = part(after, PIVOT_DEF)
+    assert 'saveData="0"' in definition and 'refreshOnLoad="1"' in definition
+    assert "r:id=" not in definition
+    # 피벗 표와 그 관계는 그대로 남는다.
+    for rels_name in (SHEET_RELS, "xl/pivotTables/_rels/pivotTable1.xml.rels", "xl/_rels/workbook.xml.rels"):
+        assert relationships(after, rels_name) == relationships(before, rels_name)
+
+    assert values(after) == values(before)
+    pivot = openpyxl.load_workbook(after).active._pivots[0]
+    assert pivot.name == "PT"
+    assert pivot.cache.refreshOnLoad and not pivot.cache.saveData
+    assert [f.name for f in pivot.cache.cacheFields] == ["k", "v"]
+
+
+EXTERNAL_LINK = "xl/externalLinks/externalLink1.xml"
+EXTERNAL_LINK_RELS = "xl/externalLinks/_rels/externalLink1.xml.rels"
+
+
+def _add_external_link(unpacked):
+    """다른 통합 문서(source.xlsx)의 Data 시트를 캐시 값과 함께 참조하는 외부 링크를 추가한다."""
+    rows = "".join(f'<row r="{r}"><cell r="A{r}"><v>{r * 10}</v></cell></row>' for r in (1, 2, 3))
+    add_part(unpacked, EXTERNAL_LINK, (
+        f'<externalLink xmlns="{NS_MAIN}" xmlns:r="{NS_R}"><externalBook r:id="rId1">'
+        '<sheetNames><sheetName val="Data"/></sheetNames>'
+        '<definedNames><definedName name="Src" refersTo="=Data!$A$1:$A$3"/></definedNames>'
+        f'<sheetDataSet><sheetData sheetId="0">{rows}</sheetData></sheetDataSet>'
+        '</externalBook></externalLink>'
+    ), "application/vnd.openxmlformats-officedocument.spreadsheetml.externalLink+xml")
+    add_relationship(unpacked, EXTERNAL_LINK_RELS, "rId1", f"{NS_R}/externalLinkPath", "source.xlsx", external=True)
+    add_relationship(unpacked, "xl/_rels/workbook.xml.rels", "rId91", f"{NS_R}/externalLink",
+                     "externalLinks/externalLink1.xml")
+    replace_in(unpacked / "xl/workbook.xml", "</sheets>",
+               f'</sheets><externalReferences><externalReference xmlns:r="{NS_R}" r:id="rId91"/>'
+               '</externalReferences>')
+
+
+def test_strip_external_link_cache_keeps_link_definition(tmp_path):
+    wb = openpyxl.Workbook()
+    wb.active["A1"] = "=SUM([1]Data!A1:A3)"
+    wb.active["B1"] = "local"
+
+    before, after = slim(tmp_path, wb, [strip_external_link_cache], edit=_add_external_link)
+
+    assert "<row" in part(before, EXTERNAL_LINK)
+    link = part(after, EXTERNAL_LINK)
+    assert "<row" not in link and "<cell" not in link
+    # 시트 목록, 이름 정의, 시트별 sheetData 요소는 그대로 남는다.
+    for kept in ('<sheetName val="Data"/>', 'name="Src"', 'sheetId="0"'):
+        assert kept in link
+    for rels_name in (EXTERNAL_LINK_RELS, "xl/_rels/workbook.xml.rels"):
+        assert relationships(after, rels_name) == relationships(before, rels_name)
+
+    assert values(after) == values(before)
+    book = openpyxl.load_workbook(after)._external_links[0].externalBook
+    assert book.sheetNames.sheetName == ["Data"]
+    assert book.sheetDataSet.sheetData[0].row == []
@@ -0,0 +1,61 @@
+import openpyxl
+from openpyxl.chart import BarChart, Reference
+
+from excel_slimmer_precision_plus import strip_chart_caches
+from xlsx_fixtures import add_part, add_relationship, content_types, names, part, relationships, replace_in, slim, values
+
+NS_CS = "http://schemas.microsoft.com/office/drawing/2012/chartStyle"
+REL_CHART_STYLE = "http://schemas.microsoft.com/office/2011/relationships/chartStyle"
+EXTERNAL_REF = "[1]Data!$A$1:$A$3"
+
+
+def _chart_workbook():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r in (1, 2, 3):
+        ws.append([r, r * 10])
+    for anchor in ("D1", "D20"):
+        chart = BarChart()
+        chart.add_data(Reference(ws, min_col=2, min_row=1, max_row=3))
+        chart.set_categories(Reference(ws, min_col=1, min_row=1, max_row=3))
+        ws.add_chart(chart, anchor)
+    return wb
+
+
+def _add_caches_and_styles(unpacked):
+    """두 차트의 참조에 numCache 를 넣고(chart2 의 값은 다른 통합 문서 참조), 같은 내용의 스타일 파트를 하나씩 붙인다."""
+    cache = ('<numCache><formatCode>General</formatCode><ptCount val="3"/>'
+             + "".join(f'<pt idx="{i}"><v>{i}</v></pt>' for i in range(3)) + "</numCache>")
+    for n in (1, 2):
+        chart = unpacked / f"xl/charts/chart{n}.xml"
+        if n == 2:
+            replace_in(chart, "<f>'Sheet'!$B$1:$B$3</f>", f"<f>{EXTERNAL_REF}</f>")
+        replace_in(chart, "</f></numRef>", f"</f>{cache}</numRef>", count=2)
+        add_part(unpacked, f"xl/charts/style{n}.xml", f'<cs:chartStyle xmlns:cs="{NS_CS}" id="201"/>',
+                 "application/vnd.ms-office.chartstyle+xml")
+        add_relationship(unpacked, f"xl/charts/_rels/chart{n}.xml.rels", "rId1", REL_CHART_STYLE, f"style{n}.xml")
+
+
+def test_strip_chart_caches_keeps_references(tmp_path):
+    before, after = slim(tmp_path, _chart_workbook(), [strip_chart_caches], edit=_add_caches_and_styles)
+
+    chart1 = part(after, "xl/charts/chart1.xml")
+    assert "numCache" not in chart1
+    assert "<f>'Sheet'!$B$1:$B$3</f>" in chart1
+    # 다른 통합 문서를 가리키는 참조의 캐시는 유일한 값이므로 남는다.
+    chart2 = part(after, "xl/charts/chart2.xml")
+    assert chart2.count("<numCache>") == 1
+    assert chart2.index(EXTERNAL_REF) < chart2.index("<numCache>")
+
+    # 같은 스타일 파트는 하나로 합쳐지고 관계/Override 가 함께 정리된다.
+    assert "xl/charts/style2.xml" not in names(after)
+    assert "/xl/charts/style2.xml" not in content_types(after)[1]
+    assert relationships(after, "xl/charts/_rels/chart2.xml.rels") == {"rId1": (REL_CHART_STYLE, "style1.xml", None)}
+    assert relationships(after, "xl/charts/_rels/chart1.xml.rels") == relationships(before, "xl/charts/_rels/chart1.xml.rels")
+    drawing_rels = "xl/drawings/_rels/drawing1.xml.rels"
+    assert relationships(after, drawing_rels) == relationships(before, drawing_rels)
+
+    assert values(after) == values(before)
+    charts = openpyxl.load_workbook(after).active._charts
+    assert [c.series[0].val.numRef.f for c in charts] == ["'Sheet'!$B$1:$B$3", EXTERNAL_REF]
+    assert charts[0].series[0].cat.numRef.f == "'Sheet'!$A$1:$A$3"
@@ -0,0 +1,55 @@
+import re
+
+import openpyxl
+from openpyxl.drawing.image import Image as XlImage
+from PIL import Image
+
+from excel_slimmer_precision_plus import purge_drawing_objects
+from xlsx_fixtures import SHEET_RELS, content_types, names, part, relationships, replace_in, slim, values
+
+DRAWING = "xl/drawings/drawing1.xml"
+DRAWING_RELS = "xl/drawings/_rels/drawing1.xml.rels"
+
+
+def _picture_workbook(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "pictures"
+    for i, (color, anchor) in enumerate((("red", "B2"), ("green", "F2"), ("blue", "J2")), start=1):
+        path = tmp_path / f"p{i}.png"
+        Image.new("RGB", (40, 30), color).save(path)
+        ws.add_image(XlImage(str(path)), anchor)
+    return wb
+
+
+def _hide_and_overlap(unpacked):
+    """그림 2 는 숨기고, 그림 3 은 크기 0 으로 만들고, 그림 1 과 같은 위치·내용의 복사본을 하나 더 둔다."""
+    drawing = unpacked / DRAWING
+    replace_in(drawing, 'name="Image 2" descr="Picture"', 'name="Image 2" descr="Picture" hidden="1"')
+    text = drawing.read_text(encoding="utf-8")
+    anchors = re.findall(r"<oneCellAnchor>.*?</oneCellAnchor>", text)
+    text = text.replace(anchors[2], anchors[2].replace('cx="381000" cy="285750"', 'cx="0" cy="0"'))
+    copy = anchors[0].replace('id="1" name="Image 1"', 'id="9" name="Image 9"')
+    drawing.write_text(text.replace("</wsDr>", copy + "</wsDr>"), encoding="utf-8")
+
+
+def test_purge_drawing_objects_keeps_visible_picture(tmp_path):
+    before, after = slim(tmp_path, _picture_workbook(tmp_path), [purge_drawing_objects], edit=_hide_and_overlap)
+
+    assert part(before, DRAWING).count("<oneCellAnchor>") == 4
+    drawing = part(after, DRAWING)
+    assert drawing.count("<oneCellAnchor>") == 1
+    assert 'name="Image 1"' in drawing
+    # 제거된 그림만 쓰던 관계와 이미지 파트가 함께 지워진다.
+    rels = relationships(after, DRAWING_RELS)
+    assert list(rels) == ["rId1"]
+    assert rels["rId1"] == relationships(before, DRAWING_RELS)["rId1"]
+    media = {n for n in names(after) if n.startswith("xl/media/")}
+    assert media == {rels["rId1"][1].lstrip("/")}
+    assert content_types(after)[0]["png"] == "image/png"
+    assert relationships(after, SHEET_RELS) == relationships(before, SHEET_RELS)
+
+    assert values(after) == values(before)
+    images = openpyxl.load_workbook(after).active._images
+    assert len(images) == 1
+    assert images[0].anchor._from.col == 1 and images[0].anchor._from.row == 1
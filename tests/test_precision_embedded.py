@@ -0,0 +1,58 @@
+import io
+import zipfile
+
+import numpy as np
+import openpyxl
+from openpyxl.drawing.image import Image as XlImage
+from PIL import Image
+
+from excel_slimmer_precision_plus import optimize_embedded_packages
+from xlsx_fixtures import NS_R, SHEET_RELS, add_part, add_relationship, content_types, part, relationships, slim, values
+
+EMBEDDED = "xl/embeddings/Microsoft_Excel_Worksheet.xlsx"
+CT_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _inner_workbook(tmp_path) -> bytes:
+    """압축하지 않은 PNG 그림 하나가 들어 있는 통합 문서 (포함된 개체용)."""
+    y, x = np.mgrid[0:240, 0:320]
+    png = tmp_path / "inner.png"
+    Image.fromarray(np.dstack([x % 256, y % 256, (x + y) % 256]).astype(np.uint8)).save(png, compress_level=0)
+    wb = openpyxl.Workbook()
+    wb.active["A1"] = "inner"
+    wb.active.add_image(XlImage(str(png)), "B2")
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def test_embedded_workbook_images_are_optimized_in_place(tmp_path):
+    inner = _inner_workbook(tmp_path)
+    wb = openpyxl.Workbook()
+    wb.active["A1"] = "outer"
+
+    def _embed(unpacked):
+        add_part(unpacked, EMBEDDED, inner, CT_XLSX)
+        add_relationship(unpacked, SHEET_RELS, "rId1", f"{NS_R}/package", "../embeddings/Microsoft_Excel_Worksheet.xlsx")
+
+    before, after = slim(tmp_path, wb, [lambda d: optimize_embedded_packages(d, aggressive=False)], edit=_embed)
+
+    with zipfile.ZipFile(after) as zf:
+        optimized = zf.read(EMBEDDED)
+    assert len(optimized) < len(inner)
+    # 같은 경로에 덮어쓰므로 바깥 패키지의 관계와 콘텐츠 형식은 그대로다.
+    assert relationships(after, SHEET_RELS) == relationships(before, SHEET_RELS)
+    assert content_types(after) == content_types(before)
+    assert values(after) == values(before)
+
+    inner_after = tmp_path / "inner_after.xlsx"
+    inner_after.write_bytes(optimized)
+    inner_before = tmp_path / "inner_before.xlsx"
+    inner_before.write_bytes(inner)
+    assert values(inner_after) == values(inner_before)
+    with zipfile.ZipFile(inner_after) as zf:
+        media = [n for n in zf.namelist() if n.startswith("xl/media/")]
+        assert len(media) == 1
+        with Image.open(io.BytesIO(zf.read(media[0]))) as im:
+            assert im.size == (320, 240)
+    assert media[0].rsplit("/", 1)[1] in part(inner_after, "xl/drawings/_rels/drawing1.xml.rels")
@@ -0,0 +1,37 @@
+import openpyxl
+from openpyxl.drawing.image import Image as XlImage
+from PIL import Image
+
+from excel_slimmer_precision_plus import dedupe_sheet_relationships
+from xlsx_fixtures import REL_HYPERLINK, SHEET, SHEET_RELS, part, relationships, slim, values
+
+URL_A = "https://example.com/a"
+URL_B = "https://example.com/b"
+
+
+def test_duplicate_hyperlink_relationships_are_merged(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for ref, url in (("A1", URL_A), ("A2", URL_B), ("A3", URL_A), ("A4", URL_A)):
+        ws[ref] = ref
+        ws[ref].hyperlink = url
+    Image.new("RGB", (20, 10), "red").save(tmp_path / "p.png")
+    ws.add_image(XlImage(str(tmp_path / "p.png")), "C2")
+
+    before, after = slim(tmp_path, wb, [dedupe_sheet_relationships])
+
+    rels_before, rels_after = relationships(before, SHEET_RELS), relationships(after, SHEET_RELS)
+    assert len(rels_before) == 5
+    assert sorted(rels_after) == ["rId1", "rId2", "rId3"]
+    hyperlinks = sorted(target for kind, target, mode in rels_after.values() if kind == REL_HYPERLINK)
+    assert hyperlinks == [URL_A, URL_B]
+    assert all(mode == "External" for kind, _, mode in rels_after.values() if kind == REL_HYPERLINK)
+    # 시트의 r:id 참조는 모두 남은 관계를 가리킨다.
+    sheet = part(after, SHEET)
+    for rid in rels_after:
+        assert f'r:id="{rid}"' in sheet
+
+    assert values(after) == values(before)
+    ws = openpyxl.load_workbook(after).active
+    assert [ws[ref].hyperlink.target for ref in ("A1", "A2", "A3", "A4")] == [URL_A, URL_B, URL_A, URL_A]
+    assert len(ws._images) == 1
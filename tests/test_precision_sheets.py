@@ -0,0 +1,131 @@
+import re
+
+import openpyxl
+import pytest
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import PatternFill
+from openpyxl.worksheet.datavalidation import DataValidation
+
+from excel_slimmer_precision_plus import (
+    consolidate_cf_dv, share_repeated_formulas, strip_formula_values, trim_used_range,
+)
+from xlsx_fixtures import SHEET, part, replace_in, slim, values
+
+
+def _add_phantom_range(unpacked):
+    """기본 서식만 가진 빈 셀/빈 행을 덧붙이고 dimension 을 그 끝까지 늘린다."""
+    sheet = unpacked / SHEET
+    replace_in(sheet, "</sheetData>", '<row r="40"><c r="A40"/><c r="B40" s="0"/></row><row r="41"/></sheetData>')
+    replace_in(sheet, '<dimension ref="A1:C30"/>', '<dimension ref="A1:C41"/>')
+
+
+def test_trim_used_range_keeps_visible_cells_and_rows(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = 1
+    ws["B3"] = "x"
+    ws.column_dimensions["A"].width = 12
+    ws.column_dimensions["B"].width = 12
+    ws["C30"].fill = PatternFill("solid", fgColor="FF0000")
+    ws.row_dimensions[25].height = 30
+
+    before, after = slim(tmp_path, wb, [trim_used_range], edit=_add_phantom_range)
+
+    xml = part(after, SHEET)
+    assert '<dimension ref="A1:C30"/>' in xml
+    assert 'r="40"' not in xml and 'r="41"' not in xml
+    assert '<cols><col width="12" customWidth="1" min="1" max="2"/></cols>' in xml
+    assert values(after) == values(before)
+    ws = openpyxl.load_workbook(after).active
+    assert ws["C30"].fill.fgColor.rgb == "00FF0000"
+    assert ws.row_dimensions[25].height == 30
+    # openpyxl 은 합쳐진 열 정의를 첫 열 하나로 읽고 min/max 로 범위를 준다.
+    cols = ws.column_dimensions["A"]
+    assert (cols.min, cols.max, cols.width) == (1, 2, 12)
+
+
+def test_cf_dv_fragments_merge_and_reanchor(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["B3"] = 5
+    fill = PatternFill("solid", fgColor="FFFF00")
+    # 복사·붙여넣기로 나뉜 것처럼 아래쪽 조각이 먼저 오고, 수식은 각 조각의 첫 행 기준이다.
+    ws.conditional_formatting.add("A6:A10", FormulaRule(formula=["$B6>0"], fill=fill))
+    ws.conditional_formatting.add("A1:A5", FormulaRule(formula=["$B1>0"], fill=fill))
+    # 규칙이 다른 조각은 합치지 않는다.
+    ws.conditional_formatting.add("A11:A12", FormulaRule(formula=["$B11<0"], fill=fill))
+    for sqref in ("C1:C5", "C6:C10"):
+        dv = DataValidation(type="list", formula1='"a,b,c"')
+        dv.add(sqref)
+        ws.add_data_validation(dv)
+
+    before, after = slim(tmp_path, wb, [consolidate_cf_dv])
+
+    ws = openpyxl.load_workbook(after).active
+    rules = {str(cf.sqref): [r.formula for r in cf.rules] for cf in ws.conditional_formatting}
+    assert rules == {"A1:A10": [["$B1>0"]], "A11:A12": [["$B11<0"]]}
+    dvs = ws.data_validations.dataValidation
+    assert [str(dv.sqref) for dv in dvs] == ["C1:C10"]
+    assert dvs[0].formula1 == '"a,b,c"'
+    assert values(after) == values(before)
+
+
+def test_shared_formulas_keep_cell_formulas(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["D1"] = "=SUM(B1:B2)"
+    ws["E1"] = "=B1"
+    ws["E2"] = "=B2"  # 최소 행 수보다 짧은 구간은 그대로 둔다
+    for r in range(1, 11):
+        ws.cell(r, 2, r)
+        ws.cell(r, 3, f"=B{r}*2+$A$1")
+        if r >= 3:
+            # 둘째 열의 구간은 3행부터 시작해 마스터 기준 셀이 첫 행이 아니다.
+            ws.cell(r, 4, f"=C{r}+D{r - 1}")
+
+    before, after = slim(tmp_path, wb, [share_repeated_formulas])
+
+    xml = part(after, SHEET)
+    assert re.search(r'<c r="C1"><f t="shared" ref="C1:C10" si="\d+">B1\*2\+\$A\$1</f>', xml)
+    assert re.search(r'<c r="C2"><f t="shared" si="\d+"/>', xml)
+    assert re.search(r'<c r="D3"><f t="shared" ref="D3:D10" si="\d+">', xml)
+    assert '<c r="E2"><f>B2</f>' in xml
+    assert values(after) == values(before)
+    # openpyxl 은 공유 수식 자식을 마스터에서 옮겨 계산한 수식으로 읽는다.
+    assert values(after)[("Sheet", "D7")] == "=C7+D6"
+
+
+CALC_PR = '<calcPr calcId="124519" fullCalcOnLoad="1"/>'
+
+
+@pytest.mark.parametrize("calc_pr", ['<calcPr calcId="124519"/>', ""], ids=["existing", "missing"])
+def test_strip_formula_values_sets_full_calc_on_load(tmp_path, calc_pr):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = 2
+    ws["B1"] = "=A1*2"
+    ws["C1"] = '=IF(A1>1,"big","small")'
+
+    def _cache_values(unpacked):
+        replace_in(unpacked / SHEET, "<f>A1*2</f><v></v>", "<f>A1*2</f><v>4</v>")
+        replace_in(unpacked / SHEET, '<c r="C1"><f>IF(A1&gt;1,"big","small")</f><v></v>',
+                   '<c r="C1" t="str"><f>IF(A1&gt;1,"big","small")</f><v>big</v>')
+        # calcPr 가 없으면 스키마 순서상 뒤에 오는 fileRecoveryPr 앞에 추가되어야 한다.
+        replace_in(unpacked / "xl/workbook.xml", CALC_PR, calc_pr + "<fileRecoveryPr/>")
+
+    before, after = slim(tmp_path, wb, [strip_formula_values], edit=_cache_values)
+
+    sheet = part(after, SHEET)
+    assert '<c r="B1"><f>A1*2</f></c>' in sheet
+    assert '<c r="C1"><f>' in sheet and ">big<" not in sheet
+    assert '<c r="A1" t="n"><v>2</v></c>' in sheet
+    workbook = part(after, "xl/workbook.xml")
+    assert re.search(r'<calcPr [^>]*fullCalcOnLoad="1"', workbook)
+    assert workbook.index("<calcPr") < workbook.index("<fileRecoveryPr")
+
+    assert values(after) == values(before)
+    cached = openpyxl.load_workbook(before, data_only=True).active
+    assert (cached["B1"].value, cached["C1"].value) == (4, "big")
+    stripped = openpyxl.load_workbook(after, data_only=True).active
+    assert (stripped["A1"].value, stripped["B1"].value, stripped["C1"].value) == (2, None, None)
+    assert openpyxl.load_workbook(after).calculation.fullCalcOnLoad
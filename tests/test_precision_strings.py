@@ -0,0 +1,76 @@
+import openpyxl
+
+from excel_slimmer_precision_plus import compact_shared_strings, convert_inline_strings
+from excel_xml_stream import NS_MAIN
+from xlsx_fixtures import (
+    NS_R, SHEET, add_part, add_relationship, content_types, names, part, relationships, replace_in, slim, values,
+)
+
+CT_SST = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+
+
+def _use_shared_strings(unpacked):
+    """sharedStrings.xml 을 만들고 A/B 열 셀을 미사용·중복 항목이 섞인 공유 문자열 참조로 바꾼다."""
+    items = ["<t>alpha</t>", "<t>unused</t>", "<t>alpha</t>",
+             "<r><rPr><b/></rPr><t>be</t></r><r><t>ta</t></r>", '<t xml:space="preserve"> gamma </t>']
+    sst = "".join(f"<si>{x}</si>" for x in items)
+    add_part(unpacked, "xl/sharedStrings.xml",
+             f'<sst xmlns="{NS_MAIN}" count="5" uniqueCount="5">{sst}</sst>', CT_SST)
+    add_relationship(unpacked, "xl/_rels/workbook.xml.rels", "rId99", f"{NS_R}/sharedStrings", "sharedStrings.xml")
+    for sheet, refs in (("sheet1", {"A1": 0, "A2": 2, "B1": 3}), ("sheet2", {"A1": 4, "A2": 2})):
+        path = unpacked / f"xl/worksheets/{sheet}.xml"
+        for ref, idx in refs.items():
+            replace_in(path, f'<c r="{ref}" t="inlineStr"><is><t>x</t></is></c>', f'<c r="{ref}" t="s"><v>{idx}</v></c>')
+
+
+def test_compact_shared_strings_drops_unused_and_duplicates(tmp_path):
+    wb = openpyxl.Workbook()
+    ws1 = wb.active
+    ws2 = wb.create_sheet("Second")
+    for ws, refs in ((ws1, ("A1", "A2", "B1")), (ws2, ("A1", "A2"))):
+        for ref in refs:
+            ws[ref] = "x"
+    ws1["C1"] = 7
+
+    before, after = slim(tmp_path, wb, [compact_shared_strings], edit=_use_shared_strings)
+
+    sst = part(after, "xl/sharedStrings.xml")
+    assert sst.count("<si>") == 3
+    assert 'count="5" uniqueCount="3"' in sst
+    assert "unused" not in sst
+    assert values(after) == values(before)
+    assert values(after)[("Second", "A1")] == " gamma "
+    assert '<c r="A2" t="s"><v>0</v></c>' in part(after, SHEET)
+
+
+def _add_rich_inline_cells(unpacked):
+    replace_in(unpacked / SHEET, "</row></sheetData>",
+               '</row><row r="2"><c r="A2" t="inlineStr"><is><t xml:space="preserve"> lead</t></is></c>'
+               '<c r="B2" t="inlineStr"><is><t>shared</t></is></c>'
+               '<c r="C2" t="inlineStr"><is><r><rPr><b/></rPr><t>ri</t></r><r><t>ch</t></r></is></c></row></sheetData>')
+
+
+def test_inline_strings_become_shared(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "shared"
+    ws["B1"] = "unique"
+    ws["C1"] = 3
+    wb.create_sheet("Other")["A1"] = "shared"
+
+    before, after = slim(tmp_path, wb, [convert_inline_strings, compact_shared_strings], edit=_add_rich_inline_cells)
+
+    assert "xl/sharedStrings.xml" not in names(before)
+    assert "inlineStr" not in part(after, SHEET)
+    assert "inlineStr" not in part(after, "xl/worksheets/sheet2.xml")
+    # 같은 문자열은 시트가 달라도 항목 하나를 같이 쓴다.
+    sst = part(after, "xl/sharedStrings.xml")
+    assert sst.count("<si>") == 4
+    assert sst.count(">shared<") == 1
+    assert values(after) == values(before)
+    assert values(after)[("Sheet", "A2")] == " lead"
+
+    # 새 파트는 관계와 콘텐츠 형식에 함께 등록된다.
+    rels = relationships(after, "xl/_rels/workbook.xml.rels").values()
+    assert (f"{NS_R}/sharedStrings", "sharedStrings.xml", None) in rels
+    assert content_types(after)[1]["/xl/sharedStrings.xml"] == CT_SST
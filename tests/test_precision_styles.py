@@ -0,0 +1,64 @@
+import re
+from copy import copy
+
+import openpyxl
+from lxml import etree
+from openpyxl.styles import Alignment, Font, PatternFill
+
+from excel_slimmer_precision_plus import compact_styles
+from excel_xml_stream import NS_MAIN
+from xlsx_fixtures import SHEET, part, slim, values
+
+_STYLE_ATTRS = ("font", "fill", "border", "number_format", "alignment", "protection")
+
+
+def _duplicate_styles(unpacked):
+    """A2 가 가리키는 셀 서식을 복제해 중복 xf 를 만들고, 쓰이지 않는 글꼴/xf 도 추가한다."""
+    ns = {"m": NS_MAIN}
+    styles_path = unpacked / "xl/styles.xml"
+    styles = etree.parse(str(styles_path))
+    sheet = unpacked / SHEET
+    xml = sheet.read_text(encoding="utf-8")
+    s = int(re.search(r'<c r="A2" s="(\d+)"', xml).group(1))
+
+    xfs = styles.find("m:cellXfs", ns)
+    xfs.append(etree.fromstring(etree.tostring(xfs[s])))
+    xfs.append(etree.fromstring(etree.tostring(xfs[0])))
+    xfs.set("count", str(len(xfs)))
+    fonts = styles.find("m:fonts", ns)
+    fonts.append(etree.fromstring(f'<font xmlns="{NS_MAIN}"><b/><sz val="30"/></font>'))
+    fonts.set("count", str(len(fonts)))
+    styles.write(str(styles_path), xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    sheet.write_text(xml.replace(f'<c r="A2" s="{s}"', f'<c r="A2" s="{len(xfs) - 2}"'), encoding="utf-8")
+
+
+def _styles(path):
+    ws = openpyxl.load_workbook(path).active
+    # openpyxl 의 StyleProxy 끼리는 비교되지 않으므로 복사해 실제 스타일 객체로 비교한다.
+    return {c.coordinate: tuple(copy(getattr(c, a)) for a in _STYLE_ATTRS) for row in ws.iter_rows() for c in row}
+
+
+def _count(path, table):
+    return int(re.search(rf'<{table} count="(\d+)"', part(path, "xl/styles.xml")).group(1))
+
+
+def test_compact_styles_keeps_cell_styles(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws["A1"] = "bold"
+    ws["A1"].font = Font(bold=True)
+    ws["A2"] = "bold too"
+    ws["A2"].font = Font(bold=True)
+    ws["B1"] = 1.5
+    ws["B1"].fill = PatternFill("solid", fgColor="FF0000")
+    ws["B1"].number_format = "0.00"
+    ws["C1"] = "wrap"
+    ws["C1"].alignment = Alignment(wrap_text=True)
+
+    before, after = slim(tmp_path, wb, [compact_styles], edit=_duplicate_styles)
+
+    assert _count(after, "cellXfs") < _count(before, "cellXfs")
+    assert _count(after, "fonts") < _count(before, "fonts")
+    assert _styles(after) == _styles(before)
+    assert values(after) == values(before)
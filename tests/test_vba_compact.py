@@ -0,0 +1,129 @@
+import os
+import random
+import struct
+import zipfile
+
+import openpyxl
+import pytest
+
+from excel_slimmer_precision_plus import compact_vba_part
+from excel_vba_compact import (
+    TYPE_ROOT, TYPE_STORAGE, TYPE_STREAM, VBA_PROJECT_STUB, CfbEntry, compress, decompress, read_cfb, write_cfb,
+)
+from xlsx_fixtures import add_part, add_relationship, content_types, relationships, slim, values
+
+
+def _inputs():
+    rnd = random.Random(37)
+    for n in (0, 1, 4095, 4096, 4097):
+        yield f"random-{n}", bytes(rnd.getrandbits(8) for _ in range(n))
+        yield f"text-{n}", (b"Attribute VB_Name = \"Module1\"\r\n" * (n // 30 + 1))[:n]
+    yield "incompressible-3-chunks", os.urandom(3 * 4096 + 17)
+
+
+@pytest.mark.parametrize("name,data", list(_inputs()))
+def test_ovba_round_trip(name, data):
+    packed = compress(data)
+    assert packed[0] == 0x01
+    assert decompress(packed) == data
+
+
+def _tree(entry):
+    return (entry.name, entry.kind, entry.data, sorted(_tree(ch) for ch in entry.children))
+
+
+def test_cfb_round_trip():
+    rnd = random.Random(26)
+    vba = CfbEntry("VBA", TYPE_STORAGE, children=[
+        CfbEntry("dir", TYPE_STREAM, compress(b"dir record " * 50)),
+        # 4096 바이트 이상은 일반 섹터, 미만은 미니 스트림에 저장된다.
+        CfbEntry("Module1", TYPE_STREAM, bytes(rnd.getrandbits(8) for _ in range(9000))),
+        CfbEntry("Sheet1", TYPE_STREAM, b"x" * 4095),
+        CfbEntry("_VBA_PROJECT", TYPE_STREAM, b"\xCC\x61\xFF\xFF\x00\x00\x00"),
+    ])
+    root = CfbEntry("Root Entry", TYPE_ROOT, children=[
+        vba,
+        CfbEntry("PROJECT", TYPE_STREAM, b'ID="{00000000-0000-0000-0000-000000000000}"\r\n'),
+        CfbEntry("PROJECTwm", TYPE_STREAM, b""),
+    ])
+    data = write_cfb(root)
+    assert len(data) % 512 == 0
+    assert _tree(read_cfb(data)) == _tree(root)
+    # 다시 쓴 결과도 같은 바이트여야 한다.
+    assert write_cfb(read_cfb(data)) == data
+
+
+MODULE_SOURCE = b'Attribute VB_Name = "Module1"\r\nSub Hello()\r\n    MsgBox "hi"\r\nEnd Sub\r\n'
+PCODE_SIZE = 700
+
+
+def _record(rec_id, body):
+    return struct.pack("<HI", rec_id, len(body)) + body
+
+
+def _vba_project() -> bytes:
+    """p-code 700 바이트 뒤에 압축 소스가 있는 Module1 과 __SRP_ 캐시를 가진 최소 VBA 프로젝트."""
+    rnd = random.Random(37)
+    dir_data = (_record(0x0019, b"Module1") + _record(0x001A, b"Module1")
+                + _record(0x0032, "Module1".encode("utf-16-le")) + _record(0x0031, struct.pack("<I", PCODE_SIZE))
+                + _record(0x002B, b"") + _record(0x0010, b""))
+    pcode = bytes(rnd.getrandbits(8) for _ in range(PCODE_SIZE))
+    root = CfbEntry("Root Entry", TYPE_ROOT, children=[
+        CfbEntry("VBA", TYPE_STORAGE, children=[
+            CfbEntry("dir", TYPE_STREAM, compress(dir_data)),
+            CfbEntry("Module1", TYPE_STREAM, pcode + compress(MODULE_SOURCE)),
+            CfbEntry("__SRP_0", TYPE_STREAM, bytes(rnd.getrandbits(8) for _ in range(6000))),
+            CfbEntry("_VBA_PROJECT", TYPE_STREAM, b"\xCC\x61\xB5\x00\x00\x01" + bytes(3000)),
+        ]),
+        CfbEntry("PROJECT", TYPE_STREAM, b'ID="{00000000-0000-0000-0000-000000000000}"\r\nModule=Module1\r\n'),
+    ])
+    return write_cfb(root)
+
+
+def _add_vba(unpacked, extra=()):
+    add_part(unpacked, "xl/vbaProject.bin", _vba_project(), "application/vnd.ms-office.vbaProject")
+    add_relationship(unpacked, "xl/_rels/workbook.xml.rels", "rId92",
+                     "http://schemas.microsoft.com/office/2006/relationships/vbaProject", "vbaProject.bin")
+    for name in extra:
+        add_part(unpacked, f"xl/{name}", b"signature")
+
+
+def test_compact_vba_part_keeps_module_source(tmp_path):
+    wb = openpyxl.Workbook()
+    wb.active["A1"] = "macro"
+
+    before, after = slim(tmp_path, wb, [compact_vba_part], edit=_add_vba)
+
+    with zipfile.ZipFile(before) as zf:
+        original = zf.read("xl/vbaProject.bin")
+    with zipfile.ZipFile(after) as zf:
+        compacted = zf.read("xl/vbaProject.bin")
+    assert len(compacted) < len(original)
+    vba = read_cfb(compacted).child("VBA")
+    assert vba.child("__SRP_0") is None
+    assert vba.child("_VBA_PROJECT").data == VBA_PROJECT_STUB
+    # 모듈 스트림은 압축된 소스로 시작하고, dir 의 MODULEOFFSET 은 0 이 된다.
+    assert decompress(vba.child("Module1").data) == MODULE_SOURCE
+    assert b"\x31\x00\x04\x00\x00\x00\x00\x00\x00\x00" in decompress(vba.child("dir").data)
+
+    rels = "xl/_rels/workbook.xml.rels"
+    assert relationships(after, rels) == relationships(before, rels)
+    assert content_types(after) == content_types(before)
+    assert values(after) == values(before)
+    archive = openpyxl.load_workbook(after, keep_vba=True).vba_archive
+    try:
+        assert "xl/vbaProject.bin" in archive.namelist()
+    finally:
+        archive.close()
+
+
+def test_compact_vba_part_skips_signed_projects(tmp_path):
+    wb = openpyxl.Workbook()
+    before, after = slim(tmp_path, wb, [compact_vba_part],
+                         edit=lambda d: _add_vba(d, extra=("vbaProjectSignature.bin",)))
+    with zipfile.ZipFile(before) as a, zipfile.ZipFile(after) as b:
+        assert a.read("xl/vbaProject.bin") == b.read("xl/vbaProject.bin")
+
+
+def test_compact_vba_part_without_project(tmp_path):
+    assert compact_vba_part(tmp_path) == 0
@@ -0,0 +1,122 @@
+import copy
+import io
+
+import pytest
+from lxml import etree
+
+from excel_xml_stream import NS_MAIN, NS_MC, NS_XSI, XML_DECLARATION, commit_rewrites, iter_units, rewrite_stream
+
+NS_AC = "http://schemas.microsoft.com/office/spreadsheetml/2009/9/ac"
+TAG_ROW = f"{{{NS_MAIN}}}row"
+
+
+def _rewrite(xml: str, **kwargs) -> bytes:
+    out = io.BytesIO()
+    rewrite_stream(io.BytesIO(xml.encode("utf-8")), out, **kwargs)
+    return out.getvalue()
+
+
+def _c14n(data: bytes) -> bytes:
+    return etree.tostring(etree.parse(io.BytesIO(data)), method="c14n")
+
+
+def _row(data: bytes, r: str) -> bytes:
+    start = data.index(f'<row r="{r}"'.encode())
+    return data[start:data.index(b"</row>", start) + len(b"</row>")]
+
+
+def test_identity_keeps_pis_comments_and_tails():
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<?mso-application progid="Excel.Sheet"?>\n<!-- head -->\n'
+        f'<worksheet xmlns="{NS_MAIN}">\n  <!-- before data -->\n  <dimension ref="A1"/>tail-dim\n'
+        '  <sheetData>\n    <row r="1"><c r="A1"><v>1</v></c></row>tail1&amp;\n    <?pi inside?>\n'
+        '    <!-- c --><row r="2"/>\n  </sheetData>\n  <?keep me?>\n</worksheet>\n<!-- trailer -->'
+    )
+    data = _rewrite(xml)
+    assert data.startswith(XML_DECLARATION + b'<?mso-application progid="Excel.Sheet"?><!-- head --><worksheet')
+    assert data.endswith(b"</worksheet><!-- trailer -->")
+    assert _c14n(data) == _c14n(xml.encode())
+    order = [b"<!-- before data -->", b"tail-dim", b'<row r="1">', b"tail1&amp;", b"<?pi inside?>",
+             b"<!-- c -->", b'<row r="2"/>', b"</sheetData>", b"<?keep me?>"]
+    positions = [data.index(token) for token in order]
+    assert positions == sorted(positions)
+
+
+def test_units_reuse_parent_prefixes_and_drop_unused_declarations():
+    xml = (
+        f'<worksheet xmlns="{NS_MAIN}" xmlns:x14ac="{NS_AC}" xmlns:mc="{NS_MC}" mc:Ignorable="x14ac"><sheetData>'
+        f'<row xmlns="{NS_MAIN}" xmlns:ac="{NS_AC}" xmlns:junk="urn:junk" r="1" ac:dyDescent="0.25">'
+        '<c r="A1"><v>1</v></c></row>'
+        '</sheetData></worksheet>'
+    )
+    data = _rewrite(xml)
+    # 같은 URI 는 상위 접두사로 통일되고, 쓰이지 않는 선언과 반복된 기본 선언은 사라진다.
+    assert _row(data, "1") == b'<row r="1" x14ac:dyDescent="0.25"><c r="A1"><v>1</v></c></row>'
+    assert b'mc:Ignorable="x14ac"' in data
+    row = etree.fromstring(data).find(f"{{{NS_MAIN}}}sheetData/{TAG_ROW}")
+    assert row.get(f"{{{NS_AC}}}dyDescent") == "0.25"
+
+
+def test_prefixes_referenced_from_attribute_values_are_kept():
+    xml = (
+        f'<worksheet xmlns="{NS_MAIN}" xmlns:mc="{NS_MC}">'
+        '<extLst xmlns:x15="urn:x15" xmlns:junk="urn:junk" mc:Ignorable="x15"/>'
+        '<mc:AlternateContent><mc:Choice xmlns:x14="urn:x14" Requires="x14"><controls/></mc:Choice></mc:AlternateContent>'
+        f'<typed xmlns:xsi="{NS_XSI}" xmlns:t="urn:types" xsi:type="t:Thing"/>'
+        '</worksheet>'
+    )
+    data = _rewrite(xml)
+    assert b'xmlns:x15="urn:x15"' in data
+    assert b'xmlns:x14="urn:x14"' in data
+    assert b'xmlns:t="urn:types"' in data
+    assert b"urn:junk" not in data
+    # 다시 읽었을 때 속성 값의 접두사가 같은 URI 로 풀려야 한다.
+    root = etree.fromstring(data)
+    typed = root.find(f"{{{NS_MAIN}}}typed")
+    assert typed.nsmap["t"] == "urn:types"
+    assert root.find(f"{{{NS_MAIN}}}extLst").nsmap["x15"] == "urn:x15"
+
+
+def test_transform_and_flush_replace_delete_and_append_units():
+    xml = (f'<worksheet xmlns="{NS_MAIN}"><sheetData>'
+           + "".join(f'<row r="{r}"><c r="A{r}"><v>{r}</v></c></row>' for r in (1, 2, 3))
+           + '</sheetData></worksheet>')
+    kept = []
+
+    def _transform(unit):
+        if unit.get("r") == "2":
+            return None
+        kept.append(copy.deepcopy(unit))
+        return unit
+
+    def _flush(elem):
+        if elem.tag != f"{{{NS_MAIN}}}sheetData":
+            return None
+        extra = copy.deepcopy(kept[0])
+        extra.set("r", "4")
+        return [extra]
+
+    data = _rewrite(xml, transform=_transform, flush=_flush)
+    rows = [row.get("r") for row in etree.fromstring(data).iter(TAG_ROW)]
+    assert rows == ["1", "3", "4"]
+    assert [unit.get("r") for unit in iter_units(io.BytesIO(data))] == ["1", "3", "4"]
+
+
+def test_commit_rewrites_replaces_all_or_nothing(tmp_path):
+    a, b = tmp_path / "a.xml", tmp_path / "b.xml"
+    a.write_text("old a")
+    b.write_text("old b")
+
+    def _fail(dst):
+        dst.write_text("partial")
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        commit_rewrites([(a, lambda dst: dst.write_text("new a")), (b, _fail)])
+    assert (a.read_text(), b.read_text()) == ("old a", "old b")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.xml", "b.xml"]
+
+    commit_rewrites([(a, lambda dst: dst.write_text("new a")), (b, lambda dst: dst.write_text("new b"))])
+    assert (a.read_text(), b.read_text()) == ("new a", "new b")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.xml", "b.xml"]
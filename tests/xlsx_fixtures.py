@@ -0,0 +1,98 @@
+"""테스트용 통합 문서 도우미.
+
+openpyxl 로 만든 통합 문서를 풀어 XML 을 조금 고친 뒤(편집 함수) 단계를 적용하고,
+적용 전/후 파일을 openpyxl 과 ZIP 으로 다시 읽어 비교한다.
+"""
+import shutil
+import zipfile
+from pathlib import Path
+
+import openpyxl
+from lxml import etree
+
+from excel_slimmer_precision_plus import rezip_max_compress, unzip_to_temp
+from excel_xml_stream import NS_CT, NS_PKG_REL
+
+SHEET = "xl/worksheets/sheet1.xml"
+SHEET_RELS = "xl/worksheets/_rels/sheet1.xml.rels"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL_HYPERLINK = f"{NS_R}/hyperlink"
+
+
+def slim(tmp_path: Path, wb, steps, edit=None) -> tuple[Path, Path]:
+    """통합 문서(openpyxl Workbook 또는 파일 경로)를 풀어 (편집 후) 단계를 적용한다. 반환값: (적용 전, 적용 후) 파일"""
+    src = tmp_path / "src.xlsx"
+    if isinstance(wb, Path):
+        shutil.copy2(wb, src)
+    else:
+        wb.save(src)
+    unpacked = unzip_to_temp(src, tmp_path)
+    if edit is not None:
+        edit(unpacked)
+    before = tmp_path / "before.xlsx"
+    rezip_max_compress(unpacked, before)
+    for step in steps:
+        step(unpacked)
+    after = tmp_path / "after.xlsx"
+    rezip_max_compress(unpacked, after)
+    return before, after
+
+
+def part(path: Path, name: str) -> str:
+    with zipfile.ZipFile(path) as zf:
+        return zf.read(name).decode("utf-8")
+
+
+def names(path: Path) -> set[str]:
+    with zipfile.ZipFile(path) as zf:
+        return set(zf.namelist())
+
+
+def values(path: Path) -> dict:
+    """모든 시트의 값(수식은 수식 문자열). 키: (시트 이름, 셀 주소)"""
+    wb = openpyxl.load_workbook(path)
+    return {(ws.title, c.coordinate): c.value
+            for ws in wb.worksheets for row in ws.iter_rows() for c in row if c.value is not None}
+
+
+def relationships(path: Path, name: str) -> dict[str, tuple]:
+    """.rels 파트의 관계. 반환값: {Id: (Type, Target, TargetMode)}"""
+    root = etree.fromstring(part(path, name).encode())
+    return {rel.get("Id"): (rel.get("Type"), rel.get("Target"), rel.get("TargetMode"))
+            for rel in root.iterchildren(f"{{{NS_PKG_REL}}}Relationship")}
+
+
+def content_types(path: Path) -> tuple[dict, dict]:
+    """[Content_Types].xml. 반환값: ({확장자: 형식}, {파트 이름: 형식})"""
+    root = etree.fromstring(part(path, "[Content_Types].xml").encode())
+    defaults = {el.get("Extension").lower(): el.get("ContentType") for el in root.iterchildren(f"{{{NS_CT}}}Default")}
+    overrides = {el.get("PartName"): el.get("ContentType") for el in root.iterchildren(f"{{{NS_CT}}}Override")}
+    return defaults, overrides
+
+
+def replace_in(path: Path, old: str, new: str, count: int = 1) -> None:
+    """파트 텍스트에서 old 를 new 로 바꾼다 (old 가 정확히 count 번 있어야 한다)."""
+    text = path.read_text(encoding="utf-8")
+    assert text.count(old) == count, (path.name, old)
+    path.write_text(text.replace(old, new), encoding="utf-8")
+
+
+def add_part(unpacked: Path, name: str, xml: str | bytes, content_type: str | None = None) -> None:
+    """파트를 쓰고, 형식이 주어지면 [Content_Types].xml 에 Override 를 추가한다."""
+    target = unpacked / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(xml if isinstance(xml, bytes) else xml.encode("utf-8"))
+    if content_type is not None:
+        replace_in(unpacked / "[Content_Types].xml", "</Types>",
+                   f'<Override PartName="/{name}" ContentType="{content_type}"/></Types>')
+
+
+def add_relationship(unpacked: Path, rels_name: str, rid: str, rel_type: str, target: str, external: bool = False) -> None:
+    """.rels 파트에 관계를 추가한다 (파트가 없으면 새로 만든다)."""
+    rels = unpacked / rels_name
+    if not rels.exists():
+        rels.parent.mkdir(parents=True, exist_ok=True)
+        rels.write_text(f'<Relationships xmlns="{NS_PKG_REL}"></Relationships>', encoding="utf-8")
+    mode = ' TargetMode="External"' if external else ""
+    replace_in(rels, "</Relationships>",
+               f'<Relationship Id="{rid}" Type="{rel_type}" Target="{target}"{mode}/></Relationships>')